@@ -0,0 +1,32 @@
+# coding: utf-8
+""" Lazy submodule loading for the package `__init__` modules.
+
+    Importing a package only defines its names; each submodule (and its heavy dependencies, such as
+    matplotlib or yfinance) is imported the first time it is accessed as an attribute.
+"""
+from __future__ import annotations
+
+import importlib
+import typing
+
+
+def submodules(package: str, names: typing.List[str]) -> typing.Tuple[typing.Callable[[str], typing.Any], typing.Callable[[], typing.List[str]]]:
+    """ Builds the module level `__getattr__` and `__dir__` of a package exposing `names` lazily.
+
+        Args:
+            package (str): `__name__` of the package.
+            names (List[str]): Submodules to expose, usually the package's `__all__`.
+
+        Returns:
+            (Tuple[Callable, Callable]) The `__getattr__` and `__dir__` functions.
+    """
+    def __getattr__(name: str) -> typing.Any:
+        if name in names:
+            # import_module also binds the submodule on the package, so this runs once per name
+            return importlib.import_module(f'.{name}', package)
+        raise AttributeError(f'module {package!r} has no attribute {name!r}')
+
+    def __dir__() -> typing.List[str]:
+        return sorted(set(vars(importlib.import_module(package))) | set(names))
+
+    return __getattr__, __dir__
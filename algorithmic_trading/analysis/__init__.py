@@ -1,6 +1,14 @@
 # coding: utf-8
+import typing
 
-from . import visualization
+from .. import _lazy
 
+if typing.TYPE_CHECKING:
+    from . import visualization
 
-__all__ = ['visualization']
+
+__all__ = [
+    'visualization',
+]
+
+__getattr__, __dir__ = _lazy.submodules(__name__, __all__)
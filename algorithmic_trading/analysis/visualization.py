@@ -5,18 +5,25 @@ from __future__ import annotations
 from decimal import Decimal
 import typing
 
-import matplotlib.pyplot as plt
 import pandas as pd
 
 from ..indicators import momentum
 
 
-def plot_portfolio_returns(portfolio_returns: typing.List[Decimal], figsize: typing.Tuple[int, int] = (16, 9)) -> None:
+def _pyplot() -> typing.Any:
+    """ Imports matplotlib on first use, so importing this module does not pay for it. """
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_portfolio_returns(portfolio_returns: typing.Union[typing.List[Decimal], pd.Series], figsize: typing.Tuple[int, int] = (16, 9)) -> None:
     """ Plots the portfolio returns.
 
         Args:
-            portfolio_returns (typing.List[Decimal]): The portfolio returns.
+            portfolio_returns (Union[typing.List[Decimal], pd.Series]): The portfolio returns, e.g.
+                `Portfolio.history.equity_curve()`.
     """
+    plt = _pyplot()
     plt.figure(figsize=figsize)
     plt.plot(portfolio_returns)
     plt.title('Portfolio Returns')
@@ -33,6 +40,7 @@ def plot_portfolio_returns_vs_benchmark(portfolio_returns: typing.List[Decimal],
             portfolio_returns (typing.List[Decimal]): The portfolio returns.
             benchmark_returns (typing.List[Decimal]): The benchmark returns.
     """
+    plt = _pyplot()
     plt.figure(figsize=figsize)
     plt.plot(portfolio_returns, label='Portfolio Returns')
     plt.plot(benchmark_returns, label='Benchmark Returns')
@@ -57,6 +65,7 @@ def plot_position_details_from_dataframe(position_df: pd.DataFrame,
         Returns:
             Plots the position details from the dataframe.
     """
+    plt = _pyplot()
     fig, axs = plt.subplots(len(position_df.columns), figsize=figsize, sharex=True)
 
     fig.suptitle('Position Details')
@@ -85,6 +94,7 @@ def plot_position_macd(position_df: pd.DataFrame,
         Returns:
             Plots the position macd details.
     """
+    plt = _pyplot()
     macd_df = momentum.macd(position_df)
     fig, axs = plt.subplots(len(macd_df.columns), figsize=figsize, sharex=True)
 
@@ -114,6 +124,7 @@ def plot_position_rsi(position_df: pd.DataFrame,
         Returns:
             Plots the position rsi details.
     """
+    plt = _pyplot()
     rsi_df = momentum.rsi(position_df)
     fig, axs = plt.subplots(len(rsi_df.columns), figsize=figsize, sharex=True)
 
@@ -0,0 +1,16 @@
+# coding: utf-8
+import typing
+
+from .. import _lazy
+
+if typing.TYPE_CHECKING:
+    from . import sweep
+    from . import vectorized
+
+
+__all__ = [
+    'sweep',
+    'vectorized',
+]
+
+__getattr__, __dir__ = _lazy.submodules(__name__, __all__)
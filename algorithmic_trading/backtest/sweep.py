@@ -0,0 +1,220 @@
+# coding: utf-8
+""" Parallel parameter sweeps over strategy functions.
+
+    A strategy is a module level (picklable) function taking one ticker's dataframe plus keyword
+    parameters and returning its target weights, e.g.
+
+        def macd_crossover(df, a, b, c):
+            macd_df = momentum.macd(df, a, b, c)
+            return (macd_df['macd'] > macd_df['signal']).astype(float)
+
+    `sweep` evaluates every combination of a parameter grid for every ticker on a process pool.
+    The price arrays are copied once into shared memory and every worker builds its dataframes on
+    top of that buffer, so nothing but the parameters and the scores travel between processes.
+    Each combination is backtested with `vectorized.backtest_weights`, scored with
+    `key_performance.performance_summary` and yielded as soon as it finishes.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+import os
+from pathlib import Path
+import typing
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from . import vectorized
+from ..indicators import key_performance
+
+
+Strategy = typing.Callable[..., Series]
+Params = typing.Dict[str, typing.Any]
+
+
+class _SweepContext:
+    """ Per process state: the shared dataframes and the backtest settings. """
+
+    data: typing.Dict[str, DataFrame] = {}
+    settings: typing.Dict[str, typing.Any] = {}
+    shared_memory: typing.List[SharedMemory] = []
+
+
+def _attach(values_name: str,
+            dates_name: str,
+            shape: typing.Tuple[int, int],
+            columns: typing.List[str],
+            layout: typing.Dict[str, typing.Tuple[int, int]],
+            settings: typing.Dict[str, typing.Any]) -> None:
+    """ Worker initializer: maps the shared price block and builds a dataframe view per ticker. """
+    values_memory = SharedMemory(name=values_name)
+    dates_memory = SharedMemory(name=dates_name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=values_memory.buf)
+    dates = np.ndarray((shape[0],), dtype=np.int64, buffer=dates_memory.buf)
+
+    _SweepContext.shared_memory = [values_memory, dates_memory]
+    _SweepContext.settings = settings
+    _SweepContext.data = {
+        ticker: DataFrame(values[start:stop],
+                          index=pd.DatetimeIndex(dates[start:stop].astype('datetime64[ns]'), name='date'),
+                          columns=columns,
+                          copy=False)
+        for ticker, (start, stop) in layout.items()
+    }
+
+
+def _evaluate(task: typing.Tuple[str, Params]) -> typing.Dict[str, typing.Any]:
+    """ Backtests and scores one (ticker, parameters) combination. """
+    ticker, params = task
+    settings = _SweepContext.settings
+    df = _SweepContext.data[ticker]
+
+    weights = settings['strategy'](df, **params)
+    result = vectorized.backtest_weights(df[['adj_close']].set_axis([ticker], axis=1),
+                                         DataFrame({ticker: weights}),
+                                         starting_cash=settings['starting_cash'],
+                                         commission_rate=settings['commission_rate'],
+                                         fill_lag=settings['fill_lag'])
+
+    summary = key_performance.performance_summary({ticker: result.returns.to_frame()},
+                                                  rf=settings['rf'],
+                                                  period=settings['period'])
+
+    return {'ticker': ticker, 'params': params, **{key: float(value) for key, value in summary.loc[ticker].items()}}
+
+
+def _key(ticker: str, params: Params) -> str:
+    return json.dumps([ticker, params], sort_keys=True)
+
+
+def _to_json_value(value: typing.Any) -> typing.Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def load_results(path: typing.Union[str, Path]) -> DataFrame:
+    """ Loads the results written by `sweep` into a dataframe.
+
+        Args:
+            path (Union[str, Path]): JSON lines file passed as `results_path` to `sweep`.
+
+        Returns:
+            (DataFrame) One row per evaluated combination, with one column per parameter and metric.
+    """
+    with open(path) as file:
+        rows = [json.loads(line) for line in file if line.strip()]
+
+    return DataFrame([{'ticker': row['ticker'], **row['params'], **row['metrics']} for row in rows])
+
+
+def sweep(data: typing.Dict[str, DataFrame],
+          strategy: Strategy,
+          grid: typing.Dict[str, typing.Sequence[typing.Any]],
+          starting_cash: float = 10_000.0,
+          commission_rate: float = 0.0,
+          fill_lag: int = 1,
+          rf: float = 0.03,
+          period: typing.Optional[str] = None,
+          processes: typing.Optional[int] = None,
+          chunksize: int = 16,
+          results_path: typing.Optional[typing.Union[str, Path]] = None) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+    """ Evaluates every combination of the parameter grid for every ticker.
+
+        Args:
+            data (Dict[str, DataFrame]): Dataframes by ticker, e.g. from `FinancialPuller.get_daily_for_tickers`.
+                Columns - ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+            strategy (Strategy): Module level function `strategy(df, **params)` returning the target weights.
+            grid (Dict[str, Sequence[Any]]): Values to try for each parameter of the strategy.
+            starting_cash (float): Starting cash of each backtest. Default is 10,000.
+            commission_rate (float): Commission as a fraction of the traded value. Default is 0.
+            fill_lag (int): Number of bars between a signal and its fill. Default is 1.
+            rf (float): Risk free rate used by the Sharpe and Sortino ratios. Default is 0.03.
+            period (Optional[str]): Period of the stock prices. Default is 'day'.
+            processes (Optional[int]): Number of worker processes. Default is the number of CPUs,
+                0 evaluates everything in the calling process.
+            chunksize (int): Number of combinations sent to a worker at a time. Default is 16.
+            results_path (Optional[Union[str, Path]]): JSON lines file every result is appended to as soon
+                as it is available. Combinations already in the file are skipped, so an interrupted
+                sweep resumes where it stopped.
+
+        Yields:
+            (Dict[str, Any]) {'ticker', 'params', 'cagr', 'volatility', 'sharpe_ratio', 'sortino_ratio',
+                'maximum_drawdown', 'calmar_ratio'} for each newly evaluated combination, in completion order.
+    """
+    names = list(grid)
+    combinations = [dict(zip(names, map(_to_json_value, values))) for values in itertools.product(*grid.values())]
+
+    done = set()
+    if results_path is not None and Path(results_path).exists():
+        with open(results_path) as file:
+            done = {_key(row['ticker'], row['params']) for row in (json.loads(line) for line in file if line.strip())}
+
+    tasks = [(ticker, params) for ticker in data for params in combinations if _key(ticker, params) not in done]
+    if not tasks:
+        return
+
+    columns = list(next(iter(data.values())).columns)
+    settings = {
+        'strategy': strategy,
+        'starting_cash': starting_cash,
+        'commission_rate': commission_rate,
+        'fill_lag': fill_lag,
+        'rf': rf,
+        'period': period,
+    }
+
+    layout = {}
+    offset = 0
+    for ticker, df in data.items():
+        layout[ticker] = (offset, offset + len(df))
+        offset += len(df)
+    shape = (offset, len(columns))
+
+    values_memory = SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 8))
+    dates_memory = SharedMemory(create=True, size=max(1, shape[0] * 8))
+    results_file = open(results_path, 'a') if results_path is not None else None
+
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=values_memory.buf)
+        dates = np.ndarray((shape[0],), dtype=np.int64, buffer=dates_memory.buf)
+        for ticker, (start, stop) in layout.items():
+            values[start:stop] = data[ticker][columns].to_numpy(dtype=np.float64)
+            dates[start:stop] = pd.DatetimeIndex(data[ticker].index).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        del values, dates
+
+        initargs = (values_memory.name, dates_memory.name, shape, columns, layout, settings)
+        processes = os.cpu_count() if processes is None else processes
+
+        if processes == 0:
+            _attach(*initargs)
+            results = map(_evaluate, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(processes, initializer=_attach, initargs=initargs)
+            results = pool.imap_unordered(_evaluate, tasks, chunksize=chunksize)
+
+        try:
+            for result in results:
+                if results_file is not None:
+                    metrics = {key: value for key, value in result.items() if key not in ('ticker', 'params')}
+                    results_file.write(json.dumps({'ticker': result['ticker'], 'params': result['params'], 'metrics': metrics}) + '\n')
+                    results_file.flush()
+                yield result
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            else:
+                _SweepContext.data = {}
+                for memory in _SweepContext.shared_memory:
+                    memory.close()
+                _SweepContext.shared_memory = []
+    finally:
+        if results_file is not None:
+            results_file.close()
+        for memory in (values_memory, dates_memory):
+            memory.close()
+            memory.unlink()
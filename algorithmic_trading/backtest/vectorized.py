@@ -0,0 +1,222 @@
+# coding: utf-8
+""" Vectorized signal-to-equity backtesting.
+
+    Instead of recording one `Transaction` at a time on a `Portfolio`, the whole history is
+    simulated with array operations over a (dates x tickers) block: positions, trades, cash,
+    commissions and the equity curve are each computed in a handful of NumPy passes. The result
+    can be exported to a `Portfolio` with its transactions populated for the existing reporting.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import datetime as dt
+from decimal import Decimal
+import typing
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from ..entities import portfolio
+from ..utils import types
+
+
+@dataclass
+class BacktestResult:
+    """ Result of a vectorized backtest.
+
+        Attributes:
+            prices (DataFrame): Dates x tickers prices used to fill and mark the positions.
+            positions (DataFrame): Dates x tickers shares held at the end of each bar.
+            trades (DataFrame): Dates x tickers shares traded on each bar (negative for sells).
+            commissions (Series): Commissions paid on each bar.
+            cash (Series): Cash at the end of each bar.
+            equity (Series): Cash plus the market value of the positions at the end of each bar.
+            starting_cash (float): Starting cash of the backtest.
+    """
+    prices: DataFrame
+    positions: DataFrame
+    trades: DataFrame
+    commissions: Series
+    cash: Series
+    equity: Series
+    starting_cash: float
+
+    @property
+    def returns(self) -> Series:
+        """ Bar to bar returns of the equity curve, as a Series named 'return' like the KPI functions expect. """
+        equity = pd.concat([Series([self.starting_cash]), self.equity.reset_index(drop=True)], ignore_index=True)
+        return Series(equity.pct_change().to_numpy()[1:], index=self.equity.index, name='return')
+
+    def to_portfolio(self, name: str, description: typing.Optional[str] = None) -> portfolio.Portfolio:
+        """ Exports the backtest as a `Portfolio` with its positions and transactions populated.
+
+            Args:
+                name (str): Name of the portfolio.
+                description (Optional[str]): Description of the portfolio.
+
+            Returns:
+                (Portfolio) Portfolio as it stands at the end of the backtest.
+        """
+        dates = self.trades.index
+        tickers = self.trades.columns
+        trades = self.trades.to_numpy()
+        prices = self.prices.to_numpy()
+
+        transactions: typing.Dict[types.TickerType, typing.List[portfolio.Transaction]] = {}
+        for row, column in zip(*np.nonzero(trades)):
+            shares = trades[row, column]
+            transaction = portfolio.Transaction(
+                ticker=tickers[column],
+                shares=_to_decimal(abs(shares)),
+                price=_to_decimal(prices[row, column]),
+                datetime=_to_datetime(dates[row]),
+                transaction_type=portfolio.TransactionType.BUY if shares > 0 else portfolio.TransactionType.SELL,
+            )
+            transactions.setdefault(transaction.ticker, []).append(transaction)
+
+        last_date = _to_datetime(dates[-1])
+        last_prices = self.prices.ffill().iloc[-1]
+        positions = {
+            ticker: portfolio.Position(ticker=ticker,
+                                       shares=_to_decimal(shares),
+                                       current_price=_to_decimal(last_prices[ticker]),
+                                       current_datetime=last_date)
+            for ticker, shares in self.positions.iloc[-1].items() if shares != 0
+        }
+
+        return portfolio.Portfolio(name=name,
+                                   description=description,
+                                   start_date=_to_datetime(dates[0]).date(),
+                                   end_date=last_date.date(),
+                                   starting_cash=_to_decimal(self.starting_cash),
+                                   available_cash=_to_decimal(self.cash.iloc[-1]),
+                                   positions=positions,
+                                   transactions=transactions)
+
+
+def _to_decimal(value: float) -> Decimal:
+    return Decimal(repr(float(value)))
+
+
+def _to_datetime(value: typing.Any) -> dt.datetime:
+    return pd.Timestamp(value).to_pydatetime()
+
+
+def _lag(targets: DataFrame, prices: DataFrame, fill_lag: int) -> np.ndarray:
+    """ Aligns the targets with the prices and delays them by `fill_lag` bars. """
+    if fill_lag < 0:
+        raise ValueError(f'Invalid fill_lag: {fill_lag}')
+
+    return targets.reindex(index=prices.index, columns=prices.columns).shift(fill_lag).to_numpy(dtype=np.float64, copy=True)
+
+
+def _commissions(trades: np.ndarray, prices: np.ndarray, commission: float, commission_rate: float) -> np.ndarray:
+    """ Per bar commissions for a per share fee plus a fee proportional to the traded value. """
+    traded_shares = np.abs(trades)
+    return (traded_shares * commission + traded_shares * np.nan_to_num(prices) * commission_rate).sum(axis=1)
+
+
+def backtest_positions(prices: DataFrame,
+                       positions: DataFrame,
+                       starting_cash: float,
+                       commission: float = 0.0,
+                       commission_rate: float = 0.0,
+                       fill_lag: int = 0) -> BacktestResult:
+    """ Backtests target positions given in shares.
+
+        The target for a bar is filled at that bar's price `fill_lag` bars later. A NaN target keeps
+        the previous position, and so does a bar where the ticker has no price (e.g. before listing).
+
+        Args:
+            prices (DataFrame): Dates x tickers fill prices, e.g. the 'adj_close' block of `indicators.panel.to_panel`.
+            positions (DataFrame): Dates x tickers target positions in shares (negative for shorts).
+            starting_cash (float): Starting cash.
+            commission (float): Commission per share traded. Default is 0.
+            commission_rate (float): Commission as a fraction of the traded value. Default is 0.
+            fill_lag (int): Number of bars between a target and its fill. Default is 0.
+
+        Returns:
+            (BacktestResult) Positions, trades, cash and equity for every bar.
+    """
+    price_values = prices.to_numpy(dtype=np.float64)
+    targets = _lag(positions, prices, fill_lag)
+    targets[np.isnan(price_values)] = np.nan
+
+    held = DataFrame(targets).ffill().fillna(0).to_numpy()
+    trades = np.diff(held, axis=0, prepend=0)
+
+    commissions = _commissions(trades, price_values, commission, commission_rate)
+    cash = starting_cash - np.cumsum((trades * np.nan_to_num(price_values)).sum(axis=1) + commissions)
+    marks = prices.ffill().fillna(0).to_numpy()
+    equity = cash + (held * marks).sum(axis=1)
+
+    return BacktestResult(prices=prices,
+                          positions=DataFrame(held, index=prices.index, columns=prices.columns),
+                          trades=DataFrame(trades, index=prices.index, columns=prices.columns),
+                          commissions=Series(commissions, index=prices.index, name='commissions'),
+                          cash=Series(cash, index=prices.index, name='cash'),
+                          equity=Series(equity, index=prices.index, name='equity'),
+                          starting_cash=starting_cash)
+
+
+def backtest_weights(prices: DataFrame,
+                     weights: DataFrame,
+                     starting_cash: float,
+                     commission_rate: float = 0.0,
+                     fill_lag: int = 0) -> BacktestResult:
+    """ Backtests target weights (fractions of equity), rebalanced on every bar.
+
+        Signals such as +1/0/-1 can be passed as weights once scaled by the caller (e.g. divided by the
+        number of active signals). The equity curve compounds the weighted returns and charges the
+        commission on the turnover needed to go from the drifted weights back to the target weights,
+        so the whole history is one cumulative product. Shares, trades and cash are then derived from it.
+
+        Args:
+            prices (DataFrame): Dates x tickers fill prices, e.g. the 'adj_close' block of `indicators.panel.to_panel`.
+            weights (DataFrame): Dates x tickers target weights. NaN keeps the previous weight.
+            starting_cash (float): Starting cash.
+            commission_rate (float): Commission as a fraction of the traded value. Default is 0.
+            fill_lag (int): Number of bars between a target and its fill. Default is 0.
+
+        Returns:
+            (BacktestResult) Positions, trades, cash and equity for every bar.
+    """
+    price_values = prices.to_numpy(dtype=np.float64)
+    has_price = ~np.isnan(price_values)
+
+    target_weights = DataFrame(_lag(weights, prices, fill_lag)).ffill().fillna(0).to_numpy(copy=True)
+    target_weights[~has_price] = 0
+
+    marks = prices.ffill().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        asset_returns = np.nan_to_num(marks[1:] / marks[:-1] - 1)
+
+    previous_weights = target_weights[:-1]
+    portfolio_returns = (previous_weights * asset_returns).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drifted_weights = np.nan_to_num(previous_weights * (1 + asset_returns) / (1 + portfolio_returns)[:, None])
+
+    turnover = np.concatenate([np.abs(target_weights[:1]).sum(axis=1),
+                               np.abs(target_weights[1:] - drifted_weights).sum(axis=1)])
+    growth = np.concatenate([[1.0], 1 + portfolio_returns]) * (1 - commission_rate * turnover)
+    equity = starting_cash * np.cumprod(growth)
+
+    pre_trade_equity = equity / (1 - commission_rate * turnover)
+    commissions = pre_trade_equity - equity
+
+    marks = np.nan_to_num(marks)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        held = np.nan_to_num(target_weights * equity[:, None] / marks, posinf=0, neginf=0)
+    trades = np.diff(held, axis=0, prepend=0)
+    cash = equity - (held * marks).sum(axis=1)
+
+    fill_prices = DataFrame(marks, index=prices.index, columns=prices.columns)
+
+    return BacktestResult(prices=fill_prices,
+                          positions=DataFrame(held, index=prices.index, columns=prices.columns),
+                          trades=DataFrame(trades, index=prices.index, columns=prices.columns),
+                          commissions=Series(commissions, index=prices.index, name='commissions'),
+                          cash=Series(cash, index=prices.index, name='cash'),
+                          equity=Series(equity, index=prices.index, name='equity'),
+                          starting_cash=starting_cash)
@@ -1,8 +1,20 @@
 # coding: utf-8
+import typing
 
-from . import portfolio
+from .. import _lazy
+
+if typing.TYPE_CHECKING:
+    from . import fast_ledger
+    from . import history
+    from . import portfolio
+    from . import stock_dataframe
 
 
 __all__ = [
+    'fast_ledger',
+    'history',
     'portfolio',
+    'stock_dataframe',
 ]
+
+__getattr__, __dir__ = _lazy.submodules(__name__, __all__)
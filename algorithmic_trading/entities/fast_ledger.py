@@ -0,0 +1,537 @@
+# coding: utf-8
+""" Fixed-point ledger backend for high frequency simulations.
+
+    `FixedPointLedger` follows the buy/sell semantics of `portfolio.Portfolio`, but stores shares and
+    prices as scaled int64 (`SHARE_DECIMALS` and `PRICE_DECIMALS` decimal places) in per-ticker
+    columnar arrays, and its transactions in growable int64 columns instead of one `Transaction`
+    per trade. Cash amounts are shares times prices, so they are exact integers at
+    `SHARE_DECIMALS + PRICE_DECIMALS` decimal places. Values that do not fit the scale are rejected
+    rather than rounded, so a ledger converts losslessly to and from the `Decimal` dataclasses.
+
+    `replay` is the fast path: a whole tape costs a few array passes. The scalar `buy` and `sell` pay
+    the Python call and `Decimal` conversion overhead on every trade, so they are only modestly faster
+    than `Portfolio.buy` and `Portfolio.sell`; `buy_scaled` and `sell_scaled` skip the conversions for
+    callers that already hold scaled integers.
+
+        ledger = FixedPointLedger.from_portfolio(portfolio)
+        ledger.replay(tickers, shares, prices, is_buy)  # a whole trade tape in a few array passes
+        portfolio = ledger.to_portfolio()
+"""
+from __future__ import annotations
+
+import datetime as dt
+from decimal import Decimal
+import typing
+
+import numpy as np
+import pandas as pd
+
+from . import portfolio
+from ..utils import types
+
+
+SHARE_DECIMALS = 4
+PRICE_DECIMALS = 4
+CASH_DECIMALS = SHARE_DECIMALS + PRICE_DECIMALS
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+_EPOCH = dt.datetime(1970, 1, 1)
+_MICROSECOND = dt.timedelta(microseconds=1)
+_INITIAL_CAPACITY = 1024
+
+
+def to_scaled(value: typing.Union[Decimal, int, str], decimals: int) -> int:
+    """ Converts a value to an integer number of 10**-decimals units.
+
+        Args:
+            value (Union[Decimal, int, str]): Value to convert. Floats are not accepted, as their
+                binary expansion is rarely exact at the scale; use `Decimal(str(value))` first.
+            decimals (int): Number of decimal places of the scale.
+
+        Returns:
+            (int) Scaled value.
+    """
+    # Called for every scalar trade, so the common Decimal and int cases avoid any intermediate Decimal
+    kind = type(value)
+    if kind is Decimal:
+        scaled = value.scaleb(decimals)
+        integer = int(scaled)
+        if integer != scaled:
+            raise ValueError(f'{value} has more than {decimals} decimal places')
+    elif kind is int:
+        integer = value * 10**decimals
+    elif isinstance(value, float):
+        raise ValueError(f'Floats are not exact, convert {value} to a Decimal first')
+    else:
+        return to_scaled(Decimal(value), decimals)
+
+    if not -_INT64_MAX <= integer <= _INT64_MAX:
+        raise ValueError(f'{value} does not fit in an int64 at {decimals} decimal places')
+
+    return integer
+
+
+def from_scaled(value: int, decimals: int) -> Decimal:
+    """ Converts an integer number of 10**-decimals units back to a Decimal. """
+    return Decimal(int(value)).scaleb(-decimals)
+
+
+def to_scaled_array(values: typing.Any, decimals: int) -> np.ndarray:
+    """ Converts an array of floats to scaled int64, checking that nothing is lost beyond float noise.
+
+        Args:
+            values (Any): Array like of floats or integers.
+            decimals (int): Number of decimal places of the scale.
+
+        Returns:
+            (np.ndarray) Scaled int64 values.
+    """
+    scaled = np.asarray(values, dtype=np.float64) * 10**decimals
+    rounded = np.rint(scaled)
+    if not np.all(np.isfinite(rounded)) or np.any(np.abs(rounded) >= 2**63):
+        raise ValueError(f'Values do not fit in an int64 at {decimals} decimal places')
+    if np.any(np.abs(scaled - rounded) > 1e-6 * np.maximum(1.0, np.abs(scaled))):
+        raise ValueError(f'Values have more than {decimals} decimal places')
+
+    return rounded.astype(np.int64)
+
+
+def _to_micros(datetime: dt.datetime) -> int:
+    return (datetime - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int) -> dt.datetime:
+    return _EPOCH + dt.timedelta(microseconds=int(micros))
+
+
+def _checked_products(shares: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """ Element-wise int64 products, raising instead of silently overflowing. """
+    if np.any(np.abs(shares.astype(np.float64) * prices.astype(np.float64)) >= 2**62):
+        raise ValueError('Trade value does not fit in an int64')
+    return shares * prices
+
+
+def _exact_sum(values: np.ndarray) -> int:
+    """ Sum of int64 values as a Python integer, without int64 overflow. """
+    if np.abs(values.astype(np.float64)).sum() < 2**62:
+        return int(values.sum())
+    return sum(int(value) for value in values)
+
+
+class FixedPointLedger:
+    """ Portfolio ledger on scaled int64 columns.
+
+        Args:
+            name (str): Name of the portfolio.
+            description (Optional[str]): Description of the portfolio.
+            start_date (date): Start date of the portfolio.
+            end_date (Optional[date]): End date of the portfolio (if applicable).
+            starting_cash (Decimal): Starting cash of the portfolio to invest.
+            available_cash (Optional[Decimal]): Available cash. Default is the starting cash.
+
+        Attributes:
+            tickers (List[types.TickerType]): Tickers seen by the ledger, in column order.
+            shares (np.ndarray): Scaled shares held, by column.
+            prices (np.ndarray): Scaled current price, by column.
+            is_open (np.ndarray): Whether each column is a position of the portfolio.
+    """
+
+    __slots__ = (
+        'name',
+        'description',
+        'start_date',
+        'end_date',
+        'starting_cash',
+        'available_cash',
+        'tickers',
+        'shares',
+        'prices',
+        'is_open',
+        '_columns',
+        '_opened_at',
+        '_log',
+        '_log_size',
+        '_pending',
+    )
+
+    _LOG_FIELDS = ('column', 'shares', 'price', 'datetime', 'is_buy')
+
+    def __init__(self,
+                 name: str,
+                 description: typing.Optional[str],
+                 start_date: dt.date,
+                 end_date: typing.Optional[dt.date],
+                 starting_cash: Decimal,
+                 available_cash: typing.Optional[Decimal] = None):
+        self.name = name
+        self.description = description
+        self.start_date = start_date
+        self.end_date = end_date
+        self.starting_cash = to_scaled(starting_cash, CASH_DECIMALS)
+        self.available_cash = to_scaled(starting_cash if available_cash is None else available_cash, CASH_DECIMALS)
+
+        self.tickers: typing.List[types.TickerType] = []
+        self._columns: typing.Dict[types.TickerType, int] = {}
+        self.shares = np.zeros(0, dtype=np.int64)
+        self.prices = np.zeros(0, dtype=np.int64)
+        self.is_open = np.zeros(0, dtype=bool)
+        self._opened_at = np.zeros(0, dtype=np.int64)
+
+        self._log = {field: np.zeros(_INITIAL_CAPACITY, dtype=np.int64) for field in self._LOG_FIELDS}
+        self._log_size = 0
+        # Rows of the scalar trades, written to the columns in one pass when the log is read
+        self._pending: typing.List[typing.Tuple[int, int, int, int, bool]] = []
+
+    def _column(self, ticker: types.TickerType) -> int:
+        """ Column of the ticker, added if it has not been seen yet. """
+        column = self._columns.get(ticker)
+        if column is None:
+            column = self._add_tickers([ticker])[0]
+        return column
+
+    def _add_tickers(self, tickers: typing.Iterable[types.TickerType]) -> typing.List[int]:
+        new = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self._columns]
+        if new:
+            for ticker in new:
+                self._columns[ticker] = len(self.tickers)
+                self.tickers.append(ticker)
+
+            self.shares = np.concatenate([self.shares, np.zeros(len(new), dtype=np.int64)])
+            self.prices = np.concatenate([self.prices, np.zeros(len(new), dtype=np.int64)])
+            self.is_open = np.concatenate([self.is_open, np.zeros(len(new), dtype=bool)])
+            self._opened_at = np.concatenate([self._opened_at, np.zeros(len(new), dtype=np.int64)])
+
+        return [self._columns[ticker] for ticker in tickers]
+
+    def _reserve(self, count: int) -> None:
+        """ Grows the transaction columns geometrically so `count` more rows fit. """
+        needed = self._log_size + count
+        capacity = len(self._log['column'])
+        if needed <= capacity:
+            return
+
+        while capacity < needed:
+            capacity *= 2
+        for field, column in self._log.items():
+            grown = np.zeros(capacity, dtype=np.int64)
+            grown[:self._log_size] = column[:self._log_size]
+            self._log[field] = grown
+
+    def _record(self, column: int, shares: int, price: int, micros: int, is_buy: bool) -> None:
+        self._pending.append((column, shares, price, micros, is_buy))
+
+    def _flush(self) -> None:
+        """ Writes the pending rows of the scalar trades to the transaction columns. """
+        if not self._pending:
+            return
+
+        count = len(self._pending)
+        self._reserve(count)
+        for field, values in zip(self._LOG_FIELDS, zip(*self._pending)):
+            self._log[field][self._log_size:self._log_size + count] = np.fromiter(values, dtype=np.int64, count=count)
+        self._log_size += count
+        self._pending.clear()
+
+    def buy(self, ticker: types.TickerType,
+            shares: Decimal,
+            purchase_price: Decimal,
+            current_price: Decimal) -> None:
+        """ Buys the given number of shares for the given ticker, as `Portfolio.buy`.
+
+            Args:
+                ticker (types.TickerType): Ticker symbol to buy.
+                shares (Decimal): Number of shares to buy.
+                purchase_price (Decimal): Purchase price.
+                current_price (Decimal): Current price.
+        """
+        scaled_purchase_price = to_scaled(purchase_price, PRICE_DECIMALS)
+        # Trades usually fill at the current price, which then only needs converting once
+        if current_price is purchase_price:
+            scaled_current_price = scaled_purchase_price
+        else:
+            scaled_current_price = to_scaled(current_price, PRICE_DECIMALS)
+
+        self.buy_scaled(ticker, to_scaled(shares, SHARE_DECIMALS), scaled_purchase_price, scaled_current_price)
+
+    def buy_scaled(self, ticker: types.TickerType, shares: int, purchase_price: int, current_price: int) -> None:
+        """ `buy` with the shares and prices already scaled, skipping the `Decimal` conversions. """
+        column = self._column(ticker)
+        micros = _to_micros(dt.datetime.now())
+
+        if not self.is_open[column]:
+            self.is_open[column] = True
+            self.shares[column] = 0
+            self._opened_at[column] = micros
+
+        self.shares[column] += shares
+        self.prices[column] = current_price
+
+        self._record(column, shares, purchase_price, micros, True)
+        self.available_cash -= shares * current_price
+
+    def sell(self, ticker: types.TickerType, shares: Decimal) -> None:
+        """ Sells the given number of shares for the given ticker, as `Portfolio.sell`.
+
+            Args:
+                ticker (types.TickerType): Ticker symbol to sell.
+                shares (Decimal): Number of shares to sell.
+        """
+        self.sell_scaled(ticker, to_scaled(shares, SHARE_DECIMALS))
+
+    def sell_scaled(self, ticker: types.TickerType, shares: int) -> None:
+        """ `sell` with the shares already scaled, skipping the `Decimal` conversion. """
+        column = self._columns.get(ticker)
+        if column is None or not self.is_open[column]:
+            raise ValueError(f'Position for ticker {ticker} does not exist in the portfolio')
+
+        price = int(self.prices[column])
+        self.shares[column] -= shares
+        self.available_cash += shares * price
+        self._record(column, shares, price, _to_micros(dt.datetime.now()), False)
+
+        if self.shares[column] == 0:
+            self.is_open[column] = False
+
+    def replay(self,
+               tickers: typing.Sequence[types.TickerType],
+               shares: typing.Any,
+               prices: typing.Any,
+               is_buy: typing.Any,
+               datetimes: typing.Optional[typing.Any] = None,
+               scaled: bool = False) -> None:
+        """ Applies a tape of trades in order, with array passes instead of a call per trade.
+
+            Each trade first marks its ticker at the trade price, then buys or sells at that price, so the
+            result equals calling `buy(ticker, shares, price, price)` or `update_prices({ticker: price})`
+            and `sell(ticker, shares)` on a `Portfolio` for every trade. The tape is validated before
+            anything is applied: selling a ticker without a position raises and leaves the ledger unchanged.
+
+            Args:
+                tickers (Sequence[types.TickerType]): Ticker of each trade.
+                shares (Any): Shares of each trade (positive).
+                prices (Any): Price of each trade.
+                is_buy (Any): True for buys, False for sells.
+                datetimes (Optional[Any]): Datetime of each trade, as datetime64 values. Default is now.
+                scaled (bool): Whether the shares and prices are already scaled int64. Default converts floats.
+        """
+        tickers = np.asarray(tickers)
+        count = len(tickers)
+        if not count:
+            return
+
+        if scaled:
+            shares = np.asarray(shares, dtype=np.int64)
+            prices = np.asarray(prices, dtype=np.int64)
+        else:
+            shares = to_scaled_array(shares, SHARE_DECIMALS)
+            prices = to_scaled_array(prices, PRICE_DECIMALS)
+        is_buy = np.asarray(is_buy, dtype=bool)
+
+        if datetimes is None:
+            micros = np.full(count, _to_micros(dt.datetime.now()), dtype=np.int64)
+        else:
+            micros = np.asarray(datetimes, dtype='datetime64[us]').astype(np.int64)
+
+        inverse, unique_tickers = pd.factorize(tickers)
+        columns = np.asarray(self._add_tickers(list(unique_tickers)), dtype=np.int64)[inverse]
+        signed = np.where(is_buy, shares, -shares)
+
+        # Holdings and open state after every trade, per ticker, continuing from the current ledger
+        order = np.argsort(columns, kind='stable')
+        sorted_columns = columns[order]
+        first_of_column = np.concatenate([[True], sorted_columns[1:] != sorted_columns[:-1]])
+        run_starts = np.flatnonzero(first_of_column)
+        run_ids = np.cumsum(first_of_column) - 1
+
+        cumulative = np.cumsum(signed[order])
+        offsets = cumulative[run_starts] - signed[order][run_starts]
+        holdings_after = cumulative - offsets[run_ids] + self.shares[sorted_columns] * self.is_open[sorted_columns]
+
+        open_after = is_buy[order] | (holdings_after != 0)
+        open_before = np.concatenate([[False], open_after[:-1]])
+        open_before[run_starts] = self.is_open[sorted_columns[run_starts]]
+
+        invalid = ~is_buy[order] & ~open_before
+        if invalid.any():
+            ticker = self.tickers[sorted_columns[np.argmax(invalid)]]
+            raise ValueError(f'Position for ticker {ticker} does not exist in the portfolio')
+
+        products = _checked_products(signed, prices)
+        self.available_cash -= _exact_sum(products)
+
+        last_rows = np.flatnonzero(np.concatenate([sorted_columns[1:] != sorted_columns[:-1], [True]]))
+        touched = sorted_columns[last_rows]
+        self.shares[touched] = holdings_after[last_rows]
+        self.prices[touched] = prices[order][last_rows]
+        self.is_open[touched] = open_after[last_rows]
+
+        opening = is_buy[order] & ~open_before
+        if opening.any():
+            opening_rows = np.flatnonzero(opening)
+            last_opening = np.full(len(self.tickers), -1, dtype=np.int64)
+            np.maximum.at(last_opening, sorted_columns[opening_rows], opening_rows)
+            reopened = np.flatnonzero(last_opening >= 0)
+            self._opened_at[reopened] = micros[order][last_opening[reopened]]
+
+        self._flush()
+        self._reserve(count)
+        rows = slice(self._log_size, self._log_size + count)
+        self._log['column'][rows] = columns
+        self._log['shares'][rows] = shares
+        self._log['price'][rows] = prices
+        self._log['datetime'][rows] = micros
+        self._log['is_buy'][rows] = is_buy
+        self._log_size += count
+
+    def transactions(self) -> typing.Dict[str, np.ndarray]:
+        """ Transaction columns ('ticker', 'shares', 'price', 'datetime', 'is_buy'), scaled, in trade order. """
+        self._flush()
+        log = {field: column[:self._log_size] for field, column in self._log.items()}
+        return {
+            'ticker': np.asarray(self.tickers, dtype=object)[log['column']] if self.tickers else np.empty(0, dtype=object),
+            'shares': log['shares'],
+            'price': log['price'],
+            'datetime': log['datetime'].astype('datetime64[us]'),
+            'is_buy': log['is_buy'].astype(bool),
+        }
+
+    @property
+    def position_value(self) -> Decimal:
+        """ Calculates the position value of the portfolio.
+
+            Returns:
+                (Decimal) Position value.
+        """
+        return from_scaled(_exact_sum(_checked_products(self.shares[self.is_open], self.prices[self.is_open])), CASH_DECIMALS)
+
+    @property
+    def total_value(self) -> Decimal:
+        """ Calculates the total value of the portfolio.
+
+            Returns:
+                (Decimal) Total value.
+        """
+        return self.position_value + from_scaled(self.available_cash, CASH_DECIMALS)
+
+    @property
+    def total_return(self) -> Decimal:
+        """ Calculates the total return for the portfolio.
+
+            Returns:
+                (Decimal) Portfolio return.
+        """
+        return self.total_value - from_scaled(self.starting_cash, CASH_DECIMALS)
+
+    @property
+    def return_percentage(self) -> Decimal:
+        """ Calculates the return percentage for the portfolio.
+
+            Returns:
+                (Decimal) Portfolio return percentage.
+        """
+        return self.total_return / from_scaled(self.starting_cash, CASH_DECIMALS)
+
+    @property
+    def total_positions(self) -> int:
+        """ Calculates the total number of positions in the portfolio.
+
+            Returns:
+                (int) Number of positions.
+        """
+        return int(self.is_open.sum())
+
+    @property
+    def position_allocations(self) -> typing.Dict[types.TickerType, Decimal]:
+        """ Calculates the position allocation for the portfolio.
+
+            Returns:
+                (Dict[types.TickerType, Decimal]) Position allocation.
+        """
+        columns = np.flatnonzero(self.is_open)
+        values = _checked_products(self.shares[columns], self.prices[columns])
+        return {self.tickers[column]: from_scaled(value, CASH_DECIMALS) for column, value in zip(columns, values)}
+
+    @property
+    def position_allocation_percentages(self) -> typing.Dict[types.TickerType, Decimal]:
+        """ Calculates the position allocation percentage for the portfolio.
+
+            Returns:
+                (Dict[types.TickerType, Decimal]) Position allocation percentage.
+        """
+        position_allocations = self.position_allocations
+        total_allocation = Decimal(sum(position_allocations.values()))
+
+        return {ticker: allocation / total_allocation for ticker, allocation in position_allocations.items()}
+
+    def to_portfolio(self) -> portfolio.Portfolio:
+        """ Converts the ledger to the `Decimal` dataclasses.
+
+            Returns:
+                (Portfolio) Portfolio with the same positions, cash and transactions.
+        """
+        columns = np.flatnonzero(self.is_open)
+        positions = {
+            self.tickers[column]: portfolio.Position(ticker=self.tickers[column],
+                                                     shares=from_scaled(self.shares[column], SHARE_DECIMALS),
+                                                     current_price=from_scaled(self.prices[column], PRICE_DECIMALS),
+                                                     current_datetime=_from_micros(self._opened_at[column]))
+            for column in columns
+        }
+
+        transactions: typing.Dict[types.TickerType, typing.List[portfolio.Transaction]] = {}
+        self._flush()
+        log = {field: column[:self._log_size].tolist() for field, column in self._log.items()}
+        for column, shares, price, micros, is_buy in zip(*(log[field] for field in self._LOG_FIELDS)):
+            ticker = self.tickers[column]
+            transaction = portfolio.Transaction(ticker=ticker,
+                                                shares=from_scaled(shares, SHARE_DECIMALS),
+                                                price=from_scaled(price, PRICE_DECIMALS),
+                                                datetime=_from_micros(micros),
+                                                transaction_type=portfolio.TransactionType.BUY if is_buy else portfolio.TransactionType.SELL)
+            transactions.setdefault(ticker, []).append(transaction)
+
+        return portfolio.Portfolio(name=self.name,
+                                   description=self.description,
+                                   start_date=self.start_date,
+                                   end_date=self.end_date,
+                                   starting_cash=from_scaled(self.starting_cash, CASH_DECIMALS),
+                                   available_cash=from_scaled(self.available_cash, CASH_DECIMALS),
+                                   positions=positions,
+                                   transactions=transactions)
+
+    @classmethod
+    def from_portfolio(cls, source: portfolio.Portfolio) -> FixedPointLedger:
+        """ Converts a `Portfolio` to a ledger.
+
+            Args:
+                source (Portfolio): Portfolio whose shares and prices fit the ledger scales.
+                    Datetimes must be naive, like the ones `Portfolio.buy` records.
+
+            Returns:
+                (FixedPointLedger) Ledger with the same positions, cash and transactions.
+        """
+        ledger = cls(name=source.name,
+                     description=source.description,
+                     start_date=source.start_date,
+                     end_date=source.end_date,
+                     starting_cash=source.starting_cash,
+                     available_cash=source.available_cash)
+
+        ledger._add_tickers(list(source.transactions) + list(source.positions))
+        for ticker, position in source.positions.items():
+            column = ledger._columns[ticker]
+            ledger.shares[column] = to_scaled(position.shares, SHARE_DECIMALS)
+            ledger.prices[column] = to_scaled(position.current_price, PRICE_DECIMALS)
+            ledger.is_open[column] = True
+            ledger._opened_at[column] = _to_micros(position.current_datetime)
+
+        for ticker, transactions in source.transactions.items():
+            column = ledger._columns[ticker]
+            for transaction in transactions:
+                ledger._record(column,
+                               to_scaled(transaction.shares, SHARE_DECIMALS),
+                               to_scaled(transaction.price, PRICE_DECIMALS),
+                               _to_micros(transaction.datetime),
+                               transaction.transaction_type == portfolio.TransactionType.BUY)
+
+        return ledger
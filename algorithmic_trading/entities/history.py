@@ -0,0 +1,170 @@
+# coding: utf-8
+""" Preallocated history of a portfolio's cash, value and holdings.
+
+    `PortfolioHistory` records one row per timestamp into NumPy buffers that grow geometrically
+    (rows as timestamps are added, columns as new tickers are held), so recording a bar writes a
+    few floats instead of appending Python objects to lists. The recorded history is exposed as
+    arrays or dataframes that feed `key_performance` and the `analysis.visualization` plots.
+
+        portfolio.record(date)                          # once per bar, after trading
+        key_performance.sharpe_ratio(portfolio.history.returns(), rf=0.03)
+"""
+from __future__ import annotations
+
+import datetime as dt
+import typing
+
+import numpy as np
+from pandas import DataFrame, Series
+import pandas as pd
+
+from ..utils import types
+
+
+_INITIAL_ROWS = 256
+_INITIAL_COLUMNS = 16
+
+
+class PortfolioHistory:
+    """ Growable columnar recorder of a portfolio over time.
+
+        Args:
+            capacity (int): Number of rows to preallocate. Default is 256.
+            tickers (Optional[Sequence[types.TickerType]]): Tickers to preallocate columns for.
+
+        Attributes:
+            tickers (List[types.TickerType]): Tickers held at any recorded timestamp, in column order.
+    """
+
+    def __init__(self, capacity: int = _INITIAL_ROWS, tickers: typing.Optional[typing.Sequence[types.TickerType]] = None):
+        if capacity < 1:
+            raise ValueError(f'Invalid capacity: {capacity}')
+
+        self.tickers: typing.List[types.TickerType] = []
+        self._columns: typing.Dict[types.TickerType, int] = {}
+        self._size = 0
+
+        self._dates = np.zeros(capacity, dtype=np.int64)
+        self._cash = np.zeros(capacity, dtype=np.float64)
+        self._total_value = np.zeros(capacity, dtype=np.float64)
+        self._shares = np.zeros((capacity, max(_INITIAL_COLUMNS, len(tickers or []))), dtype=np.float64)
+
+        for ticker in tickers or []:
+            self._column(ticker)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _column(self, ticker: types.TickerType) -> int:
+        """ Column of the ticker, growing the holdings buffer if it has not been seen yet. """
+        column = self._columns.get(ticker)
+        if column is None:
+            column = len(self.tickers)
+            if column == self._shares.shape[1]:
+                grown = np.zeros((self._shares.shape[0], 2 * column), dtype=np.float64)
+                grown[:self._size, :column] = self._shares[:self._size]
+                self._shares = grown
+
+            self._columns[ticker] = column
+            self.tickers.append(ticker)
+
+        return column
+
+    def _next_row(self) -> int:
+        """ Index of the row to write, doubling the row buffers when they are full. """
+        row = self._size
+        if row == len(self._dates):
+            capacity = 2 * row
+            self._dates = np.resize(self._dates, capacity)
+            self._cash = np.resize(self._cash, capacity)
+            self._total_value = np.resize(self._total_value, capacity)
+
+            grown = np.zeros((capacity, self._shares.shape[1]), dtype=np.float64)
+            grown[:row] = self._shares[:row]
+            self._shares = grown
+
+        self._shares[row] = 0
+        self._size += 1
+        return row
+
+    def record(self, portfolio: typing.Any, timestamp: typing.Optional[types.DateType] = None) -> None:
+        """ Records the portfolio's cash, total value and shares held.
+
+            Args:
+                portfolio (Portfolio): Portfolio to record.
+                timestamp (Optional[types.DateType]): Timestamp of the row. Default is now.
+        """
+        self.record_values(timestamp,
+                           portfolio.available_cash,
+                           portfolio.total_value,
+                           {ticker: position.shares for ticker, position in portfolio.positions.items()})
+
+    def record_values(self,
+                      timestamp: typing.Optional[types.DateType],
+                      cash: typing.Any,
+                      total_value: typing.Any,
+                      shares: typing.Mapping[types.TickerType, typing.Any]) -> None:
+        """ Records one row from raw values, for callers that do not keep a `Portfolio`.
+
+            Args:
+                timestamp (Optional[types.DateType]): Timestamp of the row. Default is now.
+                cash (Any): Available cash.
+                total_value (Any): Cash plus the value of the positions.
+                shares (Mapping[types.TickerType, Any]): Shares held by ticker.
+        """
+        columns = [self._column(ticker) for ticker in shares]
+        row = self._next_row()
+
+        self._dates[row] = np.datetime64(timestamp or dt.datetime.now(), 'ns').astype(np.int64)
+        self._cash[row] = cash
+        self._total_value[row] = total_value
+        if columns:
+            self._shares[row, columns] = np.fromiter(shares.values(), dtype=np.float64, count=len(columns))
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """ Recorded timestamps. """
+        return pd.DatetimeIndex(self._dates[:self._size].astype('datetime64[ns]'), name='date')
+
+    @property
+    def cash(self) -> np.ndarray:
+        """ Recorded cash, as a view of the buffer. """
+        return self._cash[:self._size]
+
+    @property
+    def total_value(self) -> np.ndarray:
+        """ Recorded total value, as a view of the buffer. """
+        return self._total_value[:self._size]
+
+    @property
+    def shares(self) -> np.ndarray:
+        """ Recorded shares (timestamps x tickers), as a view of the buffer. """
+        return self._shares[:self._size, :len(self.tickers)]
+
+    def equity_curve(self) -> Series:
+        """ Total value by timestamp, named 'adj_close' so it can be passed to the KPI functions as a price. """
+        return Series(self.total_value, index=self.dates, name='adj_close', copy=False)
+
+    def returns(self) -> DataFrame:
+        """ Timestamp to timestamp returns of the total value.
+
+            Returns:
+                (DataFrame) Columns - ['return'], the layout `key_performance` accepts.
+        """
+        total_value = self.total_value
+        returns = np.full(len(total_value), np.nan)
+        returns[1:] = total_value[1:] / total_value[:-1] - 1
+
+        return DataFrame({'return': returns}, index=self.dates)
+
+    def to_frame(self) -> DataFrame:
+        """ Whole history in one dataframe.
+
+            Returns:
+                (DataFrame) Columns - ['cash', 'total_value'] followed by the shares held of each ticker.
+        """
+        frame = DataFrame(self.shares, index=self.dates, columns=self.tickers, copy=False)
+        frame.insert(0, 'total_value', self.total_value)
+        frame.insert(0, 'cash', self.cash)
+
+        return frame
@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
 import typing
 
+from . import history as portfolio_history
 from ..utils import types
 
+if typing.TYPE_CHECKING:
+    from pandas import Series
+
 
 class TransactionType(Enum):
     """ Transaction type enum to hold the transaction type information
@@ -69,6 +73,12 @@ class Position:
 class Portfolio:
     """ Portfolio dataclass to hold the portfolio information
 
+        The position value is computed once, then maintained incrementally by `buy`, `sell` and
+        `update_prices`, so the value and return properties cost O(1). Positions changed directly
+        (rather than through these methods) must be followed by `invalidate_position_value`.
+        A portfolio owns its positions and transaction lists: they are copied on construction, so copies
+        made with `dataclasses.replace` or `copy.copy` trade independently of the original.
+
         Attributes:
             name (str): Name of the portfolio.
             description (Optional[str]): Description of the portfolio
@@ -86,6 +96,7 @@ class Portfolio:
             total_positions (int): Total number of positions in the portfolio
             position_allocations (Dict[str, Decimal]): Position allocation of the portfolio
             position_allocation_percentages (Dict[str, Decimal]): Position allocation percentage of the portfolio
+            history (Optional[PortfolioHistory]): Cash, value and holdings recorded with `record`, not a field
     """
     name: str
     description: typing.Optional[str]
@@ -96,6 +107,22 @@ class Portfolio:
     positions: typing.Dict[types.TickerType, Position]
     transactions: typing.Dict[types.TickerType, typing.List[Transaction]]
 
+    def __post_init__(self):
+        self.positions = {ticker: replace(position) for ticker, position in self.positions.items()}
+        self.transactions = {ticker: list(transactions) for ticker, transactions in self.transactions.items()}
+        # Plain attributes rather than fields, so `asdict`, `replace` and comparisons ignore them.
+        # The position value is None until it is first read, and whenever it must be recomputed
+        self._position_value: typing.Optional[Decimal] = None
+        self.history: typing.Optional[portfolio_history.PortfolioHistory] = None
+
+    def __copy__(self) -> Portfolio:
+        # Goes through `__post_init__`, so the copy does not share the positions the original trades on
+        return replace(self)
+
+    def invalidate_position_value(self) -> None:
+        """ Makes the position value be recomputed on its next read, after positions were changed directly. """
+        self._position_value = None
+
     def buy(self, ticker: types.TickerType,
             shares: Decimal,
             purchase_price: Decimal,
@@ -117,9 +144,15 @@ class Portfolio:
                                 current_datetime=datetime.now())
 
             self.positions[ticker] = position
+            change = position.value
         else:
+            previous_value = position.value
             position.shares += shares
             position.current_price = current_price
+            change = position.value - previous_value
+
+        if self._position_value is not None:
+            self._position_value += change
 
         transaction = Transaction(ticker=ticker,
                                   shares=shares,
@@ -144,6 +177,8 @@ class Portfolio:
 
         position.shares -= shares
         self.available_cash += shares * position.current_price
+        if self._position_value is not None:
+            self._position_value -= shares * position.current_price
 
         transaction = Transaction(ticker=ticker,
                                   shares=shares,
@@ -156,6 +191,43 @@ class Portfolio:
         if position.shares == 0:
             del self.positions[ticker]
 
+    def update_prices(self,
+                      prices: typing.Union[typing.Mapping[types.TickerType, typing.Any], Series],
+                      current_datetime: typing.Optional[datetime] = None) -> None:
+        """ Marks the held positions to market in one call.
+
+            Args:
+                prices (Union[Mapping[types.TickerType, Any], Series]): Current price by ticker, e.g. a row of
+                    a dates x tickers price frame. Tickers that are not held and missing (NaN) prices are ignored.
+                current_datetime (Optional[datetime]): Datetime of the prices, set on the updated positions.
+        """
+        change = Decimal(0)
+        for ticker, price in prices.items():
+            position = self.positions.get(ticker)
+            if position is None or price != price:
+                continue
+
+            price = price if isinstance(price, Decimal) else Decimal(str(price))
+            change += position.shares * (price - position.current_price)
+
+            position.current_price = price
+            if current_datetime is not None:
+                position.current_datetime = current_datetime
+
+        if self._position_value is not None:
+            self._position_value += change
+
+    def record(self, timestamp: typing.Optional[types.DateType] = None) -> None:
+        """ Records the current cash, total value and shares held in `history`, creating it on first use.
+
+            Args:
+                timestamp (Optional[types.DateType]): Timestamp of the record. Default is now.
+        """
+        if self.history is None:
+            self.history = portfolio_history.PortfolioHistory()
+
+        self.history.record(self, timestamp)
+
     def _add_transaction(self, transaction: Transaction) -> None:
         """ Adds the given transaction to the portfolio.
         
@@ -174,7 +246,9 @@ class Portfolio:
             Returns:
                 (Decimal) Position value.
         """
-        return sum([position.current_price * position.shares for position in self.positions.values()])
+        if self._position_value is None:
+            self._position_value = sum((position.value for position in self.positions.values()), Decimal(0))
+        return self._position_value
 
     @property
     def total_value(self) -> Decimal:
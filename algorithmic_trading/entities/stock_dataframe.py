@@ -0,0 +1,166 @@
+# coding: utf-8
+""" Validated, compact container of one ticker's price bars.
+
+    A `StockDataFrame` checks the OHLCV schema once, when it is built, and keeps each column as a
+    contiguous NumPy array in the chosen dtype (float32 halves the memory of a large universe).
+    The series most indicators and KPIs derive from the prices (returns, log returns, previous
+    close) are computed on first use and cached, so running many of them on the same ticker does
+    the work once. The `momentum` and `key_performance` functions accept it wherever they accept
+    a DataFrame.
+
+        stocks = StockDataFrame.from_dict(puller.get_daily_for_tickers(tickers), dtype=np.float32)
+        summary = {ticker: key_performance.sharpe_ratio(stock) for ticker, stock in stocks.items()}
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+from pandas import DataFrame
+
+from ..utils import finance
+from ..utils import types
+
+
+COLUMNS: typing.List[str] = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+
+_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+
+class StockDataFrame:
+    """ One ticker's bars, validated once and stored column by column.
+
+        Args:
+            data (DataFrame): Bars indexed by date. Columns - ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+            dtype (Union[type, str]): Dtype the columns are stored in, float32 or float64. Default is float64.
+            columns (Optional[List[str]]): Columns to keep and require. Default is every OHLCV column.
+            ticker (Optional[types.TickerType]): Ticker of the bars.
+
+        Attributes:
+            index (pd.Index): Dates of the bars, unique and increasing.
+            columns (List[str]): Stored columns.
+            ticker (Optional[types.TickerType]): Ticker of the bars.
+    """
+
+    __slots__ = ('index', 'columns', 'ticker', 'dtype', '_values', '_cache')
+
+    def __init__(self,
+                 data: DataFrame,
+                 dtype: typing.Union[type, str] = np.float64,
+                 columns: typing.Optional[typing.List[str]] = None,
+                 ticker: typing.Optional[types.TickerType] = None):
+        dtype = np.dtype(dtype)
+        if dtype not in _DTYPES:
+            raise ValueError(f'Invalid dtype: {dtype}, expected float32 or float64')
+
+        columns = list(columns or COLUMNS)
+        missing = [column for column in columns if column not in data.columns]
+        if missing:
+            raise ValueError(f'Missing columns: {missing}')
+        if not data.index.is_unique or not data.index.is_monotonic_increasing:
+            raise ValueError('The index must be unique and increasing')
+
+        self.index = data.index
+        self.columns = columns
+        self.ticker = ticker
+        self.dtype = dtype
+        # The columns are owned copies, read only so that the cached series stay consistent with them
+        self._values: typing.Dict[str, np.ndarray] = {}
+        for column in columns:
+            values = data[column].to_numpy(dtype=dtype, copy=True)
+            values.flags.writeable = False
+            self._values[column] = values
+        self._cache: typing.Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_dict(cls,
+                  data: typing.Dict[types.TickerType, DataFrame],
+                  dtype: typing.Union[type, str] = np.float64,
+                  columns: typing.Optional[typing.List[str]] = None) -> typing.Dict[types.TickerType, StockDataFrame]:
+        """ Builds the containers of the dataframes returned by a `FinancialPuller`.
+
+            Args:
+                data (Dict[TickerType, DataFrame]): Dataframes by ticker.
+                dtype (Union[type, str]): Dtype the columns are stored in, float32 or float64. Default is float64.
+                columns (Optional[List[str]]): Columns to keep and require. Default is every OHLCV column.
+
+            Returns:
+                (Dict[TickerType, StockDataFrame]) Containers by ticker.
+        """
+        return {ticker: cls(df, dtype, columns, ticker) for ticker, df in data.items()}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._values
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """ Stored column (read only). """
+        try:
+            return self._values[column]
+        except KeyError:
+            raise KeyError(f'Column not stored: {column}') from None
+
+    def __repr__(self) -> str:
+        return f'StockDataFrame(ticker={self.ticker!r}, bars={len(self)}, columns={self.columns}, dtype={self.dtype})'
+
+    @property
+    def nbytes(self) -> int:
+        """ Memory of the stored columns and of the cached series. """
+        return sum(values.nbytes for values in self._values.values()) + sum(values.nbytes for values in self._cache.values())
+
+    def _cached(self, name: str, compute: typing.Callable[[], np.ndarray]) -> np.ndarray:
+        values = self._cache.get(name)
+        if values is None:
+            values = compute()
+            values.flags.writeable = False
+            self._cache[name] = values
+
+        return values
+
+    @property
+    def previous_close(self) -> np.ndarray:
+        """ Adjusted close of the previous bar, NaN for the first one (float64, cached). """
+        def compute() -> np.ndarray:
+            adj_close = self['adj_close']
+            previous = np.empty(len(adj_close))
+            if len(adj_close):
+                previous[0] = np.nan
+                previous[1:] = adj_close[:-1]
+            return previous
+
+        return self._cached('previous_close', compute)
+
+    @property
+    def returns(self) -> np.ndarray:
+        """ Bar to bar return of the adjusted close, 0 where undefined as in
+            `utils.finance.get_return_from_adj_close` (float64, cached).
+        """
+        return self._cached('returns', lambda: finance.get_return_array_from_adj_close(np.asarray(self['adj_close'], dtype=np.float64)))
+
+    @property
+    def log_returns(self) -> np.ndarray:
+        """ Bar to bar log return of the adjusted close, 0 where undefined (float64, cached). """
+        def compute() -> np.ndarray:
+            log_returns = np.log1p(self.returns)
+            log_returns[np.isnan(log_returns)] = 0
+            return log_returns
+
+        return self._cached('log_returns', compute)
+
+    def clear_cache(self) -> None:
+        """ Drops the cached series, e.g. to free their memory. """
+        self._cache.clear()
+
+    def to_frame(self) -> DataFrame:
+        """ Copy of the stored columns as a dataframe.
+
+            Returns:
+                (DataFrame) Bars indexed by date with the stored columns.
+        """
+        return DataFrame(self._values, index=self.index, copy=True)
+
+
+PriceData = typing.Union[DataFrame, StockDataFrame]
+
@@ -1,11 +1,32 @@
 # coding: utf-8
+import typing
 
-from . import key_performance
-from . import momentum
+from .. import _lazy
 
+if typing.TYPE_CHECKING:
+    from . import arrays
+    from . import covariance
+    from . import graph
+    from . import key_performance
+    from . import memoize
+    from . import momentum
+    from . import panel
+    from . import renko
+    from . import rolling_performance
+    from . import streaming
 
 
 __all__ = [
+    'arrays',
+    'covariance',
+    'graph',
     'key_performance',
+    'memoize',
     'momentum',
+    'panel',
+    'renko',
+    'rolling_performance',
+    'streaming',
 ]
+
+__getattr__, __dir__ = _lazy.submodules(__name__, __all__)
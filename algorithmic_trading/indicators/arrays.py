@@ -0,0 +1,389 @@
+# coding: utf-8
+""" NumPy array versions of the indicators in `momentum` and the KPIs in `key_performance`.
+
+    Every function takes 1-D float64 arrays (anything else is converted once, contiguous float64
+    input is used as is) and returns only its output arrays, without the intermediate columns
+    the DataFrame versions used to add to a copy of their input. Functions with array outputs
+    accept `out=`, caller-provided float64 buffers of the input's length that the results are
+    written into, so a loop over many tickers can reuse the same memory:
+
+        buffers = tuple(np.empty(len(close)) for _ in range(4))
+        ma_fast, ma_slow, macd, signal = arrays.macd(close, out=buffers)
+
+    The exponential and rolling windows run through the same pandas kernels as the DataFrame
+    versions (wrapping the arrays without copying them), so both give the same values. The
+    DataFrame functions in `momentum` and `key_performance` are thin wrappers over these.
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+from pandas import Series
+
+
+Array = np.ndarray
+Buffers = typing.Optional[typing.Sequence[Array]]
+
+
+def as_array(values: typing.Any) -> Array:
+    """ Contiguous float64 view of the values, copied only when they are not already. """
+    if isinstance(values, Series):
+        values = values.to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _buffers(out: Buffers, count: int, length: int) -> typing.List[Array]:
+    """ The caller's output buffers, or new ones. """
+    if out is None:
+        return [np.empty(length) for _ in range(count)]
+
+    if len(out) != count:
+        raise ValueError(f'Expected {count} output buffers, got {len(out)}')
+    for buffer in out:
+        if buffer.shape != (length,) or buffer.dtype != np.float64:
+            raise ValueError(f'Output buffers must be float64 arrays of shape ({length},)')
+
+    return list(out)
+
+
+def _shift(values: Array, out: Array) -> Array:
+    """ Values shifted one step later, NaN first, like `Series.shift(1)`. """
+    out[0] = np.nan
+    out[1:] = values[:-1]
+    return out
+
+
+def ewm_mean(values: Array, span: typing.Optional[float] = None, alpha: typing.Optional[float] = None,
+             min_periods: int = 0, out: typing.Optional[Array] = None) -> Array:
+    """ Exponentially weighted mean, same as `Series.ewm(span=span, alpha=alpha, min_periods=min_periods).mean()`.
+
+        Args:
+            values (Array): Input values.
+            span (Optional[float]): Span of the weights, given instead of `alpha`.
+            alpha (Optional[float]): Smoothing factor, given instead of `span`.
+            min_periods (int): Number of values needed before a mean is given. Default is 0.
+            out (Optional[Array]): Buffer to write the means into.
+
+        Returns:
+            (Array) Means.
+    """
+    values = as_array(values)
+    means = Series(values, copy=False).ewm(span=span, alpha=alpha, min_periods=min_periods).mean().to_numpy()
+    if out is None:
+        return means
+
+    np.copyto(out, means)
+    return out
+
+
+def rma(values: Array, n: int = 14, out: typing.Optional[Array] = None) -> Array:
+    """ Moving average used in RSI, the exponentially weighted mean with alpha = 1 / n. """
+    return ewm_mean(values, alpha=1/n, min_periods=n, out=out)
+
+
+def macd(adj_close: Array, a: int = 12, b: int = 26, c: int = 9, out: Buffers = None) -> typing.Tuple[Array, ...]:
+    """ Moving Average Convergence Divergence
+
+        Args:
+            adj_close (Array): Adjusted close prices.
+            out (Optional[Sequence[Array]]): 4 buffers to write the outputs into.
+
+        Returns:
+            (Tuple[Array, ...]) ma_fast, ma_slow, macd, signal
+    """
+    adj_close = as_array(adj_close)
+    ma_fast, ma_slow, macd_, signal = _buffers(out, 4, len(adj_close))
+
+    ewm_mean(adj_close, span=a, min_periods=a, out=ma_fast)
+    ewm_mean(adj_close, span=b, min_periods=b, out=ma_slow)
+    np.subtract(ma_fast, ma_slow, out=macd_)
+    ewm_mean(macd_, span=c, min_periods=c, out=signal)
+
+    return ma_fast, ma_slow, macd_, signal
+
+
+def rsi(adj_close: Array, n: int = 14, out: Buffers = None, previous_close: typing.Optional[Array] = None) -> typing.Tuple[Array, ...]:
+    """ Relative Strength Index
+
+        Args:
+            adj_close (Array): Adjusted close prices.
+            out (Optional[Sequence[Array]]): 6 buffers to write the outputs into.
+            previous_close (Optional[Array]): Adjusted close prices shifted by one bar, if already known.
+
+        Returns:
+            (Tuple[Array, ...]) gain, loss, avg_gain, avg_loss, relative_strength, rsi
+    """
+    adj_close = as_array(adj_close)
+    gain, loss, avg_gain, avg_loss, relative_strength, rsi_ = _buffers(out, 6, len(adj_close))
+    if not len(adj_close):
+        return gain, loss, avg_gain, avg_loss, relative_strength, rsi_
+
+    # The change is held in `relative_strength` until it is needed
+    change = relative_strength
+    np.subtract(adj_close, _shift(adj_close, change) if previous_close is None else previous_close, out=change)
+    np.fmax(change, 0, out=gain)
+    np.fmax(np.negative(change, out=loss), 0, out=loss)
+
+    rma(gain, n, out=avg_gain)
+    rma(loss, n, out=avg_loss)
+    np.divide(avg_gain, avg_loss, out=relative_strength)
+
+    np.add(1, relative_strength, out=rsi_)
+    np.divide(100, rsi_, out=rsi_)
+    np.subtract(100, rsi_, out=rsi_)
+
+    return gain, loss, avg_gain, avg_loss, relative_strength, rsi_
+
+
+def true_range(high: Array, low: Array, adj_close: Array, out: typing.Optional[Array] = None,
+               previous_close: typing.Optional[Array] = None) -> Array:
+    """ True range: the largest of high - low, high - previous close and low - previous close.
+
+        Args:
+            high (Array): High prices.
+            low (Array): Low prices.
+            adj_close (Array): Adjusted close prices.
+            out (Optional[Array]): Buffer to write the true range into.
+            previous_close (Optional[Array]): Adjusted close prices shifted by one bar, if already known.
+
+        Returns:
+            (Array) True range, NaN if any of the three is NaN.
+    """
+    high, low, adj_close = as_array(high), as_array(low), as_array(adj_close)
+    (true_range_,) = _buffers(None if out is None else (out,), 1, len(high))
+    if not len(high):
+        return true_range_
+
+    if previous_close is None:
+        previous_close = _shift(adj_close, np.empty(len(adj_close)))
+
+    scratch = np.empty(len(high))
+    np.subtract(high, low, out=true_range_)
+    np.maximum(true_range_, np.subtract(high, previous_close, out=scratch), out=true_range_)
+    np.maximum(true_range_, np.subtract(low, previous_close, out=scratch), out=true_range_)
+
+    return true_range_
+
+
+def average_true_range(high: Array, low: Array, adj_close: Array, n: int = 14, out: typing.Optional[Array] = None,
+                       previous_close: typing.Optional[Array] = None) -> Array:
+    """ Average True Range
+
+        Args:
+            high (Array): High prices.
+            low (Array): Low prices.
+            adj_close (Array): Adjusted close prices.
+            out (Optional[Array]): Buffer to write the ATR into.
+            previous_close (Optional[Array]): Adjusted close prices shifted by one bar, if already known.
+
+        Returns:
+            (Array) ATR values
+    """
+    return ewm_mean(true_range(high, low, adj_close, out=out, previous_close=previous_close), span=n, min_periods=n, out=out)
+
+
+def bbands(adj_close: Array, n: int = 14, out: Buffers = None) -> typing.Tuple[Array, ...]:
+    """ Bollinger Bands
+
+        Args:
+            adj_close (Array): Adjusted close prices.
+            out (Optional[Sequence[Array]]): 4 buffers to write the outputs into.
+
+        Returns:
+            (Tuple[Array, ...]) middle_band, upper_band, lower_band, bollinger_band_width
+    """
+    adj_close = as_array(adj_close)
+    middle_band, upper_band, lower_band, bollinger_band_width = _buffers(out, 4, len(adj_close))
+
+    rolling = Series(adj_close, copy=False).rolling(n)
+    np.copyto(middle_band, rolling.mean().to_numpy())
+
+    # Twice the standard deviation is held in `bollinger_band_width` until the bands are set
+    two_std = bollinger_band_width
+    np.multiply(2, rolling.std(ddof=0).to_numpy(), out=two_std)
+    np.add(middle_band, two_std, out=upper_band)
+    np.subtract(middle_band, two_std, out=lower_band)
+    np.subtract(upper_band, lower_band, out=bollinger_band_width)
+
+    return middle_band, upper_band, lower_band, bollinger_band_width
+
+
+def adx(high: Array, low: Array, adj_close: Array, n: int = 20, out: Buffers = None,
+        previous_close: typing.Optional[Array] = None) -> typing.Tuple[Array, ...]:
+    """ Average Directional Index
+
+        Args:
+            high (Array): High prices.
+            low (Array): Low prices.
+            adj_close (Array): Adjusted close prices.
+            out (Optional[Sequence[Array]]): 8 buffers to write the outputs into.
+            previous_close (Optional[Array]): Adjusted close prices shifted by one bar, if already known.
+
+        Returns:
+            (Tuple[Array, ...]) avg_true_range, up_move, down_move, plus_down_move, minus_down_move,
+                plus_directional_indicator, minus_directional_indicator, adx
+    """
+    high, low, adj_close = as_array(high), as_array(low), as_array(adj_close)
+    outputs = _buffers(out, 8, len(high))
+    (avg_true_range, up_move, down_move, plus_down_move, minus_down_move,
+     plus_directional_indicator, minus_directional_indicator, adx_) = outputs
+    if not len(high):
+        return tuple(outputs)
+
+    average_true_range(high, low, adj_close, n, out=avg_true_range, previous_close=previous_close)
+    np.subtract(high, _shift(high, up_move), out=up_move)
+    np.subtract(_shift(low, down_move), low, out=down_move)
+    np.copyto(plus_down_move, np.where((up_move >= down_move) & (up_move > 0), up_move, 0))
+    np.copyto(minus_down_move, np.where((down_move >= up_move) & (down_move > 0), down_move, 0))
+
+    # The directional movement over the ATR is held in `adx` before it is smoothed
+    ewm_mean(np.divide(plus_down_move, avg_true_range, out=adx_), span=n, min_periods=n, out=plus_directional_indicator)
+    np.multiply(100, plus_directional_indicator, out=plus_directional_indicator)
+    ewm_mean(np.divide(minus_down_move, avg_true_range, out=adx_), span=n, min_periods=n, out=minus_directional_indicator)
+    np.multiply(100, minus_directional_indicator, out=minus_directional_indicator)
+
+    ewm_mean(np.add(plus_directional_indicator, minus_directional_indicator, out=adx_), span=n, min_periods=n, out=adx_)
+    np.divide(100 * np.abs(plus_directional_indicator - minus_directional_indicator), adx_, out=adx_)
+
+    return tuple(outputs)
+
+
+def cum_return(returns: Array, out: typing.Optional[Array] = None) -> Array:
+    """ Cumulative return, `(1 + returns).cumprod()` where NaN returns stay NaN and are skipped.
+
+        Args:
+            returns (Array): Period returns.
+            out (Optional[Array]): Buffer to write the cumulative return into.
+
+        Returns:
+            (Array) Cumulative return.
+    """
+    returns = as_array(returns)
+    (cumulative,) = _buffers(None if out is None else (out,), 1, len(returns))
+
+    missing = np.isnan(returns)
+    np.add(1, returns, out=cumulative)
+    cumulative[missing] = 1
+    np.multiply.accumulate(cumulative, out=cumulative)
+    cumulative[missing] = np.nan
+
+    return cumulative
+
+
+def cagr(returns: Array, num_periods: float) -> float:
+    """ Compound Annual Growth Rate
+
+        Args:
+            returns (Array): Period returns.
+            num_periods (float): Number of periods per year.
+
+        Returns:
+            (float) CAGR
+    """
+    returns = as_array(returns)
+    if not len(returns):
+        return np.nan
+
+    n = len(returns) / num_periods
+    return cum_return(returns)[-1]**(1/n) - 1
+
+
+def volatility(returns: Array, num_periods: float) -> float:
+    """ Annualized standard deviation of the returns, NaN returns skipped.
+
+        Args:
+            returns (Array): Period returns.
+            num_periods (float): Number of periods per year.
+
+        Returns:
+            (float) Volatility
+    """
+    return _std(as_array(returns)) * np.sqrt(num_periods)
+
+
+def downside_volatility(returns: Array, num_periods: float) -> float:
+    """ Annualized standard deviation of the negative returns, as used by the Sortino ratio.
+
+        Args:
+            returns (Array): Period returns.
+            num_periods (float): Number of periods per year.
+
+        Returns:
+            (float) Downside volatility
+    """
+    returns = as_array(returns)
+    return _std(returns[returns < 0]) * np.sqrt(num_periods)
+
+
+def _std(values: Array) -> float:
+    """ Sample standard deviation with NaN skipped, NaN for fewer than two values, like `Series.std()`. """
+    values = values[~np.isnan(values)] if np.isnan(values).any() else values
+    if len(values) < 2:
+        return np.nan
+
+    return float(np.std(values, ddof=1))
+
+
+def sharpe_ratio(returns: Array, num_periods: float, rf: float = 0.03) -> float:
+    """ Sharpe Ratio
+
+        Args:
+            returns (Array): Period returns.
+            num_periods (float): Number of periods per year.
+            rf (float): Risk free rate. Default is 0.03.
+
+        Returns:
+            (float) Ratio
+    """
+    return (cagr(returns, num_periods) - rf) / volatility(returns, num_periods)
+
+
+def sortino_ratio(returns: Array, num_periods: float, rf: float = 0.03) -> float:
+    """ Sortino Ratio
+
+        Args:
+            returns (Array): Period returns.
+            num_periods (float): Number of periods per year.
+            rf (float): Risk free rate. Default is 0.03.
+
+        Returns:
+            (float) Ratio
+    """
+    return (cagr(returns, num_periods) - rf) / downside_volatility(returns, num_periods)
+
+
+def maximum_drawdown(returns: Array) -> float:
+    """ Maximum Drawdown, the largest fall of the cumulative return from its running max.
+
+        Args:
+            returns (Array): Period returns.
+
+        Returns:
+            (float) Max drawdown
+    """
+    cumulative = cum_return(returns)
+    if not len(cumulative):
+        return np.nan
+
+    # `fmax` skips NaN like `Series.cummax()`, the drawdown is then computed in place
+    roll_max = np.fmax.accumulate(cumulative)
+    drawdown = np.subtract(roll_max, cumulative, out=cumulative)
+    np.divide(drawdown, roll_max, out=drawdown)
+
+    if np.isnan(drawdown).all():
+        return np.nan
+    return float(np.nanmax(drawdown))
+
+
+def calmar_ratio(returns: Array, num_periods: float) -> float:
+    """ Calmar Ratio
+
+        Args:
+            returns (Array): Period returns.
+            num_periods (float): Number of periods per year.
+
+        Returns:
+            (float) Ratio
+    """
+    return cagr(returns, num_periods) / maximum_drawdown(returns)
@@ -0,0 +1,351 @@
+# coding: utf-8
+""" Incremental covariance and correlation of the returns of a universe of tickers.
+
+    The engines keep the pairwise weighted sums behind the covariance matrix (weights, sums,
+    sums of squares and of cross products over the bars where both tickers have a return), so
+    a new bar of returns costs O(N^2) instead of recomputing `DataFrame.cov()` over the full
+    history. A ticker that is not listed yet (or has no return on a bar) simply has a NaN
+    return: each pair only uses the bars both tickers were observed on, as pandas does.
+
+    `EwmCovariance` matches `returns.ewm(...).cov()` / `.corr()` and `RollingCovariance` matches
+    `returns.rolling(window).cov()` / `.corr()`. Histories are absorbed in blocks of bars with
+    matrix products, then bars are added one at a time with `update`.
+
+        engine = EwmCovariance.from_returns(covariance.returns_panel(puller.get_daily_for_tickers(tickers)), span=60)
+        engine.update({'AAPL': 0.012, 'MSFT': -0.003})
+        engine.portfolio_volatility(portfolio)
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import abc
+import typing
+
+import numpy as np
+from pandas import DataFrame, Series
+
+from .key_performance import _num_periods
+from . import panel
+from ..utils import finance
+from ..utils import types
+
+if typing.TYPE_CHECKING:
+    from ..entities.portfolio import Portfolio
+
+
+_BLOCK = 64
+
+
+def returns_panel(data: typing.Dict[str, DataFrame]) -> DataFrame:
+    """ Dates x tickers returns of the dataframes returned by a `FinancialPuller`.
+
+        Args:
+            data (Dict[str, DataFrame]): Dataframes by ticker. Columns - ['return'] or ['adj_close']
+
+        Returns:
+            (DataFrame) Returns from `utils.finance.get_return_from_adj_close`, NaN on the dates a ticker has no bar
+                (e.g. before it was listed).
+    """
+    returns = {
+        ticker: df if 'return' in df.columns else finance.get_return_from_adj_close(df[['adj_close']])
+        for ticker, df in data.items()
+    }
+    return panel.to_panel(returns, ['return'])['return'] if returns else DataFrame()
+
+
+class CovarianceEngine(ABC):
+    """ Base class of the incremental covariance engines.
+
+        Args:
+            tickers (List[TickerType]): Universe, in the order of the matrices.
+            min_periods (int): Bars both tickers of a pair must have been observed on for their covariance. Default is 1.
+
+        Attributes:
+            tickers (List[TickerType]): Universe, in the order of the matrices.
+            bars (int): Number of bars consumed.
+    """
+
+    def __init__(self, tickers: typing.List[types.TickerType], min_periods: int = 1):
+        if len(set(tickers)) != len(tickers):
+            raise ValueError('The tickers must be unique')
+
+        self.tickers = list(tickers)
+        self.min_periods = max(min_periods, 1)
+        self.bars = 0
+
+        n = len(self.tickers)
+        self._positions = {ticker: position for position, ticker in enumerate(self.tickers)}
+        # Pairwise sums over the bars both tickers were observed on, row ticker i and column ticker j:
+        # count and weights are symmetric, `_sum` / `_sum_sq` hold the (weighted) sums of ticker i's returns
+        self._count = np.zeros((n, n))
+        self._weight = np.zeros((n, n))
+        self._weight_sq = np.zeros((n, n))
+        self._sum = np.zeros((n, n))
+        self._sum_sq = np.zeros((n, n))
+        self._sum_prod = np.zeros((n, n))
+
+    @abstractmethod
+    def _add(self, values: np.ndarray) -> None:
+        """ Consumes a (bars x tickers) block of returns, NaN where a ticker has none. """
+
+    def update(self, returns: typing.Mapping[types.TickerType, float]) -> None:
+        """ Consumes the returns of one new bar.
+
+            Args:
+                returns (Mapping[TickerType, float]): Returns by ticker. Tickers missing or NaN have no return on this bar,
+                    tickers outside of the universe are ignored.
+        """
+        values = np.full((1, len(self.tickers)), np.nan)
+        for ticker, value in returns.items():
+            position = self._positions.get(ticker)
+            if position is not None:
+                values[0, position] = value
+
+        self._add(values)
+
+    def extend(self, returns: DataFrame) -> None:
+        """ Consumes the bars of a returns panel, in blocks.
+
+            Args:
+                returns (DataFrame): Dates x tickers returns, e.g. from `returns_panel`. Tickers of the universe missing
+                    from the columns have no return on these bars.
+        """
+        values = returns.reindex(columns=self.tickers).to_numpy(dtype=np.float64)
+        for start in range(0, len(values), _BLOCK):
+            self._add(values[start:start + _BLOCK])
+
+    @classmethod
+    def from_returns(cls, returns: DataFrame, **params: typing.Any) -> CovarianceEngine:
+        """ Creates an engine over the columns of a returns panel and seeds it with its bars.
+
+            Args:
+                returns (DataFrame): Dates x tickers returns, e.g. from `returns_panel`.
+                params: Parameters of the engine.
+
+            Returns:
+                The seeded engine.
+        """
+        engine = cls(list(returns.columns), **params)
+        engine.extend(returns)
+        return engine
+
+    def _accumulate(self, values: np.ndarray, observed: np.ndarray, weights: np.ndarray, sign: float = 1.0) -> None:
+        """ Adds (or removes) the weighted pairwise sums of a block of bars with matrix products. """
+        weighted_values = values * weights[:, None]
+        weighted_observed = observed * weights[:, None]
+
+        self._count += sign * (observed.T @ observed)
+        self._sum += sign * (weighted_values.T @ observed)
+        self._sum_sq += sign * ((weighted_values * values).T @ observed)
+        self._sum_prod += sign * (weighted_values.T @ values)
+        self._weight += sign * (weighted_observed.T @ observed)
+        self._weight_sq += sign * ((weighted_observed * weights[:, None]).T @ observed)
+
+    def _moments(self) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ Biased pairwise covariances and variances, the bias correction and the valid pairs. """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self._sum / self._weight
+            covariance = self._sum_prod / self._weight - mean * mean.T
+            variance = np.maximum(self._sum_sq / self._weight - mean * mean, 0)
+
+            squared_weight = self._weight * self._weight
+            correction = squared_weight / (squared_weight - self._weight_sq)
+
+        valid = self._count >= self.min_periods
+        return covariance, variance, correction, valid
+
+    def covariance(self, period: typing.Optional[str] = None) -> DataFrame:
+        """ Annualized covariance matrix.
+
+            Args:
+                period (Optional[str]): Period of the bars. Default is 'day'.
+
+            Returns:
+                (DataFrame) Tickers x tickers covariances, NaN for the pairs without enough common bars.
+        """
+        covariance, _, correction, valid = self._moments()
+        with np.errstate(invalid='ignore'):
+            values = np.where(valid & (correction > 0) & np.isfinite(correction), covariance * correction, np.nan)
+
+        return DataFrame(values * _num_periods(period), index=self.tickers, columns=self.tickers)
+
+    def volatility(self, period: typing.Optional[str] = None) -> Series:
+        """ Annualized volatility of each ticker, as in `key_performance.volatility`.
+
+            Args:
+                period (Optional[str]): Period of the bars. Default is 'day'.
+
+            Returns:
+                (Series) Volatility by ticker, NaN for the tickers without enough bars.
+        """
+        return Series(np.sqrt(np.diag(self.covariance(period).to_numpy())), index=self.tickers, name='volatility')
+
+    def correlation(self) -> DataFrame:
+        """ Correlation matrix.
+
+            Returns:
+                (DataFrame) Tickers x tickers correlations, NaN for the pairs without enough common bars
+                    or with a constant return.
+        """
+        covariance, variance, _, valid = self._moments()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = covariance / np.sqrt(variance * variance.T)
+
+        values = np.where(valid, np.clip(values, -1, 1), np.nan)
+        return DataFrame(values, index=self.tickers, columns=self.tickers)
+
+    def _weights(self, portfolio: typing.Union[Portfolio, typing.Mapping[types.TickerType, float]]) -> np.ndarray:
+        """ Allocation of the portfolio aligned on the universe. """
+        allocations = portfolio if isinstance(portfolio, abc.Mapping) else portfolio.position_allocation_percentages
+
+        missing = [ticker for ticker in allocations if ticker not in self._positions]
+        if missing:
+            raise ValueError(f'Tickers not in the universe: {missing}')
+
+        weights = np.zeros(len(self.tickers))
+        for ticker, allocation in allocations.items():
+            weights[self._positions[ticker]] = float(allocation)
+
+        return weights
+
+    def portfolio_variance(self,
+                           portfolio: typing.Union[Portfolio, typing.Mapping[types.TickerType, float]],
+                           period: typing.Optional[str] = None) -> float:
+        """ Annualized variance of the returns of a portfolio's current allocation.
+
+            Args:
+                portfolio (Union[Portfolio, Mapping[TickerType, float]]): Portfolio, weighted by its
+                    `position_allocation_percentages`, or weights by ticker.
+                period (Optional[str]): Period of the bars. Default is 'day'.
+
+            Returns:
+                (float) Variance, NaN if a held ticker lacks the bars for its covariances.
+        """
+        weights = self._weights(portfolio)
+        held = np.flatnonzero(weights)
+        covariance = self.covariance(period).to_numpy()[np.ix_(held, held)]
+
+        return float(weights[held] @ covariance @ weights[held])
+
+    def portfolio_volatility(self,
+                             portfolio: typing.Union[Portfolio, typing.Mapping[types.TickerType, float]],
+                             period: typing.Optional[str] = None) -> float:
+        """ Annualized volatility of the returns of a portfolio's current allocation.
+
+            Args:
+                portfolio (Union[Portfolio, Mapping[TickerType, float]]): Portfolio, weighted by its
+                    `position_allocation_percentages`, or weights by ticker.
+                period (Optional[str]): Period of the bars. Default is 'day'.
+
+            Returns:
+                (float) Volatility, NaN if a held ticker lacks the bars for its covariances.
+        """
+        return float(np.sqrt(self.portfolio_variance(portfolio, period)))
+
+
+class EwmCovariance(CovarianceEngine):
+    """ Exponentially weighted covariance, matching `DataFrame.ewm(...).cov()` (adjust=True, ignore_na=False).
+
+        Args:
+            tickers (List[TickerType]): Universe, in the order of the matrices.
+            span (Optional[float]): Decay in terms of span. Exactly one of `span`, `halflife` and `alpha` is required.
+            halflife (Optional[float]): Decay in terms of half-life.
+            alpha (Optional[float]): Smoothing factor, 0 < alpha <= 1.
+            min_periods (int): Bars both tickers of a pair must have been observed on for their covariance. Default is 1.
+    """
+
+    def __init__(self,
+                 tickers: typing.List[types.TickerType],
+                 span: typing.Optional[float] = None,
+                 halflife: typing.Optional[float] = None,
+                 alpha: typing.Optional[float] = None,
+                 min_periods: int = 1):
+        if sum(param is not None for param in (span, halflife, alpha)) != 1:
+            raise ValueError('Exactly one of span, halflife and alpha is required')
+
+        if span is not None:
+            if span < 1:
+                raise ValueError(f'Invalid span: {span}')
+            alpha = 2 / (span + 1)
+        elif halflife is not None:
+            if halflife <= 0:
+                raise ValueError(f'Invalid halflife: {halflife}')
+            alpha = 1 - np.exp(np.log(0.5) / halflife)
+        elif not 0 < alpha <= 1:
+            raise ValueError(f'Invalid alpha: {alpha}')
+
+        super().__init__(tickers, min_periods)
+        self.alpha = float(alpha)
+
+    def _add(self, values: np.ndarray) -> None:
+        bars = len(values)
+        if not bars:
+            return
+
+        # Decaying every bar, observed or not, is what `ignore_na=False` does
+        decay = 1 - self.alpha
+        weights = decay ** np.arange(bars - 1, -1, -1, dtype=np.float64)
+        for name in ('_weight', '_sum', '_sum_sq', '_sum_prod'):
+            getattr(self, name).__imul__(decay ** bars)
+        self._weight_sq *= decay ** (2 * bars)
+
+        observed = ~np.isnan(values)
+        self._accumulate(np.where(observed, values, 0), observed.astype(np.float64), weights)
+        self.bars += bars
+
+
+class RollingCovariance(CovarianceEngine):
+    """ Covariance over the last `window` bars, matching `DataFrame.rolling(window).cov()`.
+
+        The bars of the window are kept in a ring buffer: each new bar adds its products and removes those of the bar
+        leaving the window. The sums are rebuilt from the buffer every `window` bars so rounding errors cannot build up.
+
+        Args:
+            tickers (List[TickerType]): Universe, in the order of the matrices.
+            window (int): Number of bars in the window.
+            min_periods (Optional[int]): Bars both tickers of a pair must have been observed on in the window for their
+                covariance. Default is `window`.
+    """
+
+    def __init__(self, tickers: typing.List[types.TickerType], window: int, min_periods: typing.Optional[int] = None):
+        if window < 1:
+            raise ValueError(f'Invalid window: {window}')
+
+        super().__init__(tickers, window if min_periods is None else min_periods)
+        self.window = window
+        self._buffer = np.full((window, len(self.tickers)), np.nan)
+        self._since_rebuild = 0
+
+    def _add(self, values: np.ndarray) -> None:
+        for start in range(0, len(values), self.window):
+            self._add_block(values[start:start + self.window])
+
+    def _add_block(self, values: np.ndarray) -> None:
+        bars = len(values)
+        if not bars:
+            return
+
+        slots = (self.bars + np.arange(bars)) % self.window
+        leaving = self._buffer[slots]
+        self._buffer[slots] = values
+        self.bars += bars
+        self._since_rebuild += bars
+
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+            return
+
+        ones = np.ones(bars)
+        leaving_observed = ~np.isnan(leaving)
+        self._accumulate(np.where(leaving_observed, leaving, 0), leaving_observed.astype(np.float64), ones, sign=-1.0)
+        observed = ~np.isnan(values)
+        self._accumulate(np.where(observed, values, 0), observed.astype(np.float64), ones)
+
+    def _rebuild(self) -> None:
+        """ Recomputes the sums from the bars in the window. """
+        for name in ('_count', '_weight', '_weight_sq', '_sum', '_sum_sq', '_sum_prod'):
+            getattr(self, name).fill(0)
+
+        observed = ~np.isnan(self._buffer)
+        self._accumulate(np.where(observed, self._buffer, 0), observed.astype(np.float64), np.ones(self.window))
+        self._since_rebuild = 0
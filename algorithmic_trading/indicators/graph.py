@@ -0,0 +1,253 @@
+# coding: utf-8
+""" Indicator computation graph.
+
+    Requesting several indicators through an `IndicatorGraph` builds a dependency graph of the
+    intermediates they are made of (previous close, true range, EWMs, rolling moments, ...).
+    Nodes are keyed by their operation and inputs, so an intermediate shared by several indicators,
+    or by several parameter sets of the same indicator, is evaluated once. The outputs match the
+    functions in `momentum`.
+
+        graph = IndicatorGraph()
+        graph.add('macd')
+        graph.add('rsi', n=14)
+        graph.add('adx', n=14)
+        graph.add('average_true_range', n=14)   # shares the true range and ATR with adx
+        results = graph.evaluate(df)            # {'macd': DataFrame, 'rsi': DataFrame, ...}
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import typing
+
+import numpy as np
+from pandas import DataFrame, Series
+
+
+NodeKey = typing.Tuple[typing.Any, ...]
+
+
+@dataclass(frozen=True)
+class _Node:
+    """ One operation of the graph and the keys of the nodes it consumes. """
+    key: NodeKey
+    func: typing.Callable[..., Series]
+    dependencies: typing.Tuple[NodeKey, ...]
+
+
+def _where_positive(condition: Series, values: Series) -> Series:
+    return Series(np.where(condition, values, 0), index=values.index)
+
+
+class IndicatorGraph:
+    """ Plans and evaluates a set of indicators over one ticker's dataframe.
+
+        Attributes:
+            outputs (Dict[str, Dict[str, NodeKey]]): Output columns of each requested indicator, by label.
+    """
+
+    INDICATORS: typing.List[str] = ['macd', 'rsi', 'average_true_range', 'bbands', 'adx']
+
+    def __init__(self):
+        self._nodes: typing.Dict[NodeKey, _Node] = {}
+        self.outputs: typing.Dict[str, typing.Dict[str, NodeKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _node(self, key: NodeKey, func: typing.Callable[..., Series], *dependencies: NodeKey) -> NodeKey:
+        """ Adds the node unless an identical one already exists, and returns its key. """
+        if key not in self._nodes:
+            self._nodes[key] = _Node(key, func, dependencies)
+        return key
+
+    def _column(self, name: str) -> NodeKey:
+        return self._node(('column', name), None)
+
+    def _previous(self, name: str) -> NodeKey:
+        column = self._column(name)
+        return self._node(('previous', name), lambda series: series.shift(1), column)
+
+    def _ewm(self, source: NodeKey, span: int) -> NodeKey:
+        return self._node(('ewm', source, span), lambda series: series.ewm(span=span, min_periods=span).mean(), source)
+
+    def _rma(self, source: NodeKey, n: int) -> NodeKey:
+        return self._node(('rma', source, n), lambda series: series.ewm(alpha=1/n, min_periods=n).mean(), source)
+
+    def _binary(self, operation: str, left: NodeKey, right: NodeKey) -> NodeKey:
+        functions = {
+            'subtract': lambda a, b: a - b,
+            'add': lambda a, b: a + b,
+            'divide': lambda a, b: a / b,
+        }
+        return self._node((operation, left, right), functions[operation], left, right)
+
+    def _change(self) -> NodeKey:
+        return self._binary('subtract', self._column('adj_close'), self._previous('adj_close'))
+
+    def _true_range(self) -> NodeKey:
+        def true_range(high: Series, low: Series, previous_close: Series) -> Series:
+            return np.maximum(np.maximum(high - low, high - previous_close), low - previous_close)
+
+        return self._node(('true_range',), true_range, self._column('high'), self._column('low'), self._previous('adj_close'))
+
+    def _rolling_mean(self, source: NodeKey, n: int) -> NodeKey:
+        return self._node(('rolling_mean', source, n), lambda series: series.rolling(n).mean(), source)
+
+    def _rolling_std(self, source: NodeKey, n: int) -> NodeKey:
+        return self._node(('rolling_std', source, n), lambda series: series.rolling(n).std(ddof=0), source)
+
+    def _macd(self, a: int = 12, b: int = 26, c: int = 9) -> typing.Dict[str, NodeKey]:
+        close = self._column('adj_close')
+        ma_fast = self._ewm(close, a)
+        ma_slow = self._ewm(close, b)
+        macd = self._binary('subtract', ma_fast, ma_slow)
+
+        return {'ma_fast': ma_fast, 'ma_slow': ma_slow, 'macd': macd, 'signal': self._ewm(macd, c)}
+
+    def _rsi(self, n: int = 14) -> typing.Dict[str, NodeKey]:
+        change = self._change()
+        gain = self._node(('gain', change), lambda series: _where_positive(series >= 0, series), change)
+        loss = self._node(('loss', change), lambda series: _where_positive(series < 0, -1 * series), change)
+        avg_gain = self._rma(gain, n)
+        avg_loss = self._rma(loss, n)
+        relative_strength = self._binary('divide', avg_gain, avg_loss)
+        rsi = self._node(('rsi', relative_strength), lambda series: 100 - (100 / (1 + series)), relative_strength)
+
+        return {
+            'gain': gain,
+            'loss': loss,
+            'avg_gain': avg_gain,
+            'avg_loss': avg_loss,
+            'relative_strength': relative_strength,
+            'rsi': rsi,
+        }
+
+    def _average_true_range(self, n: int = 14) -> typing.Dict[str, NodeKey]:
+        return {'atr': self._ewm(self._true_range(), n)}
+
+    def _bbands(self, n: int = 14) -> typing.Dict[str, NodeKey]:
+        middle_band = self._rolling_mean(self._column('adj_close'), n)
+        std = self._rolling_std(self._column('adj_close'), n)
+        width = self._node(('double', std), lambda series: 2 * series, std)
+        upper_band = self._binary('add', middle_band, width)
+        lower_band = self._binary('subtract', middle_band, width)
+
+        return {
+            'middle_band': middle_band,
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'bollinger_band_width': self._binary('subtract', upper_band, lower_band),
+        }
+
+    def _adx(self, n: int = 20) -> typing.Dict[str, NodeKey]:
+        avg_true_range = self._average_true_range(n)['atr']
+        up_move = self._binary('subtract', self._column('high'), self._previous('high'))
+        down_move = self._binary('subtract', self._previous('low'), self._column('low'))
+
+        plus_down_move = self._node(('plus_down_move', up_move, down_move),
+                                    lambda up, down: _where_positive((up >= down) & (up > 0), up),
+                                    up_move, down_move)
+        minus_down_move = self._node(('minus_down_move', up_move, down_move),
+                                     lambda up, down: _where_positive((down >= up) & (down > 0), down),
+                                     up_move, down_move)
+
+        def directional_indicator(move: NodeKey) -> NodeKey:
+            smoothed = self._ewm(self._binary('divide', move, avg_true_range), n)
+            return self._node(('percent', smoothed), lambda series: 100 * series, smoothed)
+
+        plus_directional_indicator = directional_indicator(plus_down_move)
+        minus_directional_indicator = directional_indicator(minus_down_move)
+        total = self._ewm(self._binary('add', plus_directional_indicator, minus_directional_indicator), n)
+        adx = self._node(('adx', plus_directional_indicator, minus_directional_indicator, total),
+                         lambda plus, minus, total: 100 * abs(plus - minus) / total,
+                         plus_directional_indicator, minus_directional_indicator, total)
+
+        return {
+            'avg_true_range': avg_true_range,
+            'up_move': up_move,
+            'down_move': down_move,
+            'plus_down_move': plus_down_move,
+            'minus_down_move': minus_down_move,
+            'plus_directional_indicator': plus_directional_indicator,
+            'minus_directional_indicator': minus_directional_indicator,
+            'adx': adx,
+        }
+
+    def add(self, indicator: str, label: typing.Optional[str] = None, **params: int) -> str:
+        """ Requests an indicator.
+
+            Args:
+                indicator (str): One of `INDICATORS`.
+                label (Optional[str]): Key of the indicator in the evaluated results. Default is the indicator name.
+                params: Parameters of the indicator, as in the `momentum` function.
+
+            Returns:
+                (str) Label of the indicator.
+        """
+        if indicator not in self.INDICATORS:
+            raise ValueError(f'Invalid indicator: {indicator}')
+
+        label = label or indicator
+        if label in self.outputs:
+            raise ValueError(f'Label {label} has already been requested')
+
+        self.outputs[label] = getattr(self, f'_{indicator}')(**params)
+        return label
+
+    def evaluate(self, df: DataFrame) -> typing.Dict[str, typing.Union[DataFrame, Series]]:
+        """ Evaluates every requested indicator, computing each node of the graph once.
+
+            Args:
+                df (DataFrame): Columns - the price columns used by the requested indicators,
+                    ['high', 'low', 'adj_close'] at most.
+
+            Returns:
+                (Dict[str, Union[DataFrame, Series]]) Results by label, in the layout of the `momentum`
+                    functions (a Series for 'average_true_range', DataFrames otherwise).
+        """
+        requested = {key for outputs in self.outputs.values() for key in outputs.values()}
+
+        # Intermediates are released once their last consumer has been evaluated
+        remaining_uses: typing.Dict[NodeKey, int] = {}
+        for node in self._nodes.values():
+            for dependency in node.dependencies:
+                remaining_uses[dependency] = remaining_uses.get(dependency, 0) + 1
+
+        values: typing.Dict[NodeKey, Series] = {}
+        for key, node in self._nodes.items():
+            if node.func is None:
+                values[key] = df[key[1]]
+                continue
+
+            values[key] = node.func(*(values[dependency] for dependency in node.dependencies))
+
+            for dependency in node.dependencies:
+                remaining_uses[dependency] -= 1
+                if not remaining_uses[dependency] and dependency not in requested:
+                    del values[dependency]
+
+        results = {}
+        for label, outputs in self.outputs.items():
+            if list(outputs) == ['atr']:
+                results[label] = values[outputs['atr']].rename('atr')
+            else:
+                results[label] = DataFrame({column: values[key] for column, key in outputs.items()}, index=df.index)
+
+        return results
+
+
+def compute(df: DataFrame, requests: typing.Dict[str, typing.Dict[str, int]]) -> typing.Dict[str, typing.Union[DataFrame, Series]]:
+    """ Computes several indicators over one dataframe, sharing their intermediates.
+
+        Args:
+            df (DataFrame): Columns - ['high', 'low', 'adj_close']
+            requests (Dict[str, Dict[str, int]]): Parameters by indicator name, e.g. {'macd': {}, 'rsi': {'n': 14}}.
+
+        Returns:
+            (Dict[str, Union[DataFrame, Series]]) Results by indicator name.
+    """
+    graph = IndicatorGraph()
+    for indicator, params in requests.items():
+        graph.add(indicator, **params)
+
+    return graph.evaluate(df)
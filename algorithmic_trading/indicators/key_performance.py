@@ -2,153 +2,221 @@
 from __future__ import annotations
 
 import typing
+import warnings
 
 from pandas import DataFrame, Series
 import numpy as np
+import pandas as pd
 
-from ..pullers.finance.financial_puller import FinancialPuller
+from . import arrays
 from .. import utils
+from ..entities.stock_dataframe import PriceData, StockDataFrame
 
 
 _PERIOD_TO_NUM_PERIODS = {
     'day': utils.finance.TRADING_DAYS_PER_YEAR,
+    'week': utils.finance.TRADING_WEEKS_PER_YEAR,
     'month': utils.finance.TRADING_MONTHS_PER_YEAR,
 }
 
 
-def cagr(df: DataFrame, period: typing.Optional[str] = None) -> float:
-    """ Calculates the Compound Annual Growth Rate (CAGR) for the given dataframe.
-
-        Args:
-            df (DataFrame): Columns - ['adj_close']
-            period (Optional[str]): Period of the stock prices. Default is 'day'.
-
-        Returns:
-            Calculated CAGR value for the df.
-    """
-    new_df = df.copy()
-
+def _num_periods(period: typing.Optional[str] = None) -> int:
+    """ Number of periods per year of the period name, 'day' by default. """
     period = period or 'day'
     num_periods = _PERIOD_TO_NUM_PERIODS.get(period)
     if num_periods is None:
         raise ValueError(f'Invalid period: {period}')
 
-    n = len(df) / num_periods
+    return num_periods
 
-    df_columns = set(new_df.columns)
-    if 'return' not in df_columns:
-        new_df = utils.finance.get_return_from_adj_close(new_df)
 
-    new_df['cum_return'] = (1 + new_df['return']).cumprod()
+def _returns(df: PriceData) -> np.ndarray:
+    """ The cached returns of a `StockDataFrame`, or else the 'return' column of the dataframe or the
+        returns of its 'adj_close' column, as a float64 array.
+    """
+    if isinstance(df, StockDataFrame):
+        return df.returns
+    if 'return' in df.columns:
+        return arrays.as_array(df['return'])
 
-    cagr = (new_df['cum_return'][-1])**(1/n) - 1
-    return cagr
+    return utils.finance.get_return_array_from_adj_close(arrays.as_array(df['adj_close']))
 
 
-def volatility(df: DataFrame, period: typing.Optional[str] = None) -> float:
-    """ Calculates the volatility for the given dataframe.
+def cagr(df: PriceData, period: typing.Optional[str] = None) -> float:
+    """ Calculates the Compound Annual Growth Rate (CAGR) for the given dataframe.
 
         Args:
-            df (DataFrame): Columns - ['adj_close']
+            df (PriceData): Columns - ['adj_close']
             period (Optional[str]): Period of the stock prices. Default is 'day'.
 
         Returns:
-            Calculated volatility value for the df.
+            Calculated CAGR value for the df.
     """
-    new_df = df.copy()
+    return arrays.cagr(_returns(df), _num_periods(period))
 
-    period = period or 'day'
-    num_periods = _PERIOD_TO_NUM_PERIODS.get(period)
-    if num_periods is None:
-        raise ValueError(f'Invalid period: {period}')
 
-    df_columns = set(new_df.columns)
-    if 'return' not in df_columns:
-        new_df = utils.finance.get_return_from_adj_close(new_df)
+def volatility(df: PriceData, period: typing.Optional[str] = None) -> float:
+    """ Calculates the volatility for the given dataframe.
 
-    volatility = new_df['return'].std() * np.sqrt(num_periods)
-    return volatility
+        Args:
+            df (PriceData): Columns - ['adj_close']
+            period (Optional[str]): Period of the stock prices. Default is 'day'.
+
+        Returns:
+            Calculated volatility value for the df.
+    """
+    return arrays.volatility(_returns(df), _num_periods(period))
 
 
-def sharpe_ratio(df: DataFrame, rf: float = 0.03) -> float:
+def sharpe_ratio(df: PriceData, rf: float = 0.03) -> float:
     """ Calculates the Sharpe Ratio for the given dataframe.
 
         Args:
-            df (DataFrame): Columns - ['adj_close']
+            df (PriceData): Columns - ['adj_close']
 
         Returns:
             Calculated ratio value for the df.
     """
-    new_df = df.copy()
+    returns = _returns(df)
 
-    ratio = (cagr(new_df) - rf) / volatility(df)
+    return (arrays.cagr(returns, _num_periods()) - rf) / arrays.volatility(returns, _num_periods())
 
-    return ratio
 
-
-def sortino_ratio(df: DataFrame, rf: float = 0.03, period: typing.Optional[str] = None) -> float:
+def sortino_ratio(df: PriceData, rf: float = 0.03, period: typing.Optional[str] = None) -> float:
     """ Calculates the Sortino Ratio for the given dataframe.
 
         Args:
-            df (DataFrame): Columns - ['adj_close']
+            df (PriceData): Columns - ['adj_close']
             rf (float):
             period (Optional[str]): Period of the stock prices. Default is 'day'.
 
         Returns:
             Calculated ratio value for the df.
     """
-    new_df = df.copy()
+    returns = _returns(df)
 
-    period = period or 'day'
-    num_periods = _PERIOD_TO_NUM_PERIODS.get(period)
-    if num_periods is None:
-        raise ValueError(f'Invalid period: {period}')
+    return (arrays.cagr(returns, _num_periods()) - rf) / arrays.downside_volatility(returns, _num_periods(period))
 
-    df_columns = set(new_df.columns)
-    if 'return' not in df_columns:
-        new_df = utils.finance.get_return_from_adj_close(new_df)
 
-    neg_return = np.where(new_df['return'] > 0, 0, new_df['return'])
-    neg_volatility = Series(neg_return[neg_return != 0]).std() * np.sqrt(num_periods)
+def maximum_drawdown(df: PriceData) -> float:
+    """ Calculates the Maximum Drawdown for the given dataframe.
 
-    ratio = (cagr(new_df) - rf) / neg_volatility
+        Args:
+            df (PriceData): Columns - ['return'] or ['adj_close']
 
-    return ratio
+        Returns:
+            Calculated Max Drawdown value for the df.
+    """
+    return arrays.maximum_drawdown(_returns(df))
 
 
-def maximum_drawdown(df: DataFrame) -> float:
-    """ Calculates the Maximum Drawdown for the given dataframe.
+def calmar_ratio(df: PriceData) -> float:
+    """ Calculates the Calmar Ratio for the given dataframe.
 
         Args:
-            df (DataFrame): Columns - ['return'] or ['adj_close']
+            df (PriceData): Columns - ['adj_close']
 
         Returns:
-            Calculated Max Drawdown value for the df.
+            Calculated ratio value for the df.
     """
-    new_df = df.copy()
+    returns = _returns(df)
 
-    df_columns = set(new_df.columns)
-    if 'return' not in df_columns:
-        new_df = utils.finance.get_return_from_adj_close(new_df)
+    return arrays.cagr(returns, _num_periods()) / arrays.maximum_drawdown(returns)
 
-    new_df['cum_return'] = (1 + new_df['return']).cumprod()
-    new_df['cum_roll_max'] = new_df['cum_return'].cummax()
-    new_df['drawdown'] = new_df['cum_roll_max'] - new_df['cum_return']
 
-    drawdown = (new_df['drawdown'] / new_df['cum_roll_max']).max()
+def _returns_from_prices(prices: DataFrame) -> DataFrame:
+    """ Vectorized `utils.finance.get_return_from_adj_close` for a dates x tickers block.
 
-    return drawdown
+        Each ticker's return is taken against its previous valid price, so NaN padded rows
+        (e.g. before a listing date) behave as if they were dropped, and the first valid row
+        of each ticker has a return of 0.
 
+        Args:
+            prices (DataFrame): Dates x tickers adjusted close prices.
 
-def calmar_ratio(df: DataFrame) -> float:
-    """ Calculates the Calmar Ratio for the given dataframe.
+        Returns:
+            (DataFrame) Dates x tickers returns, NaN where the price is NaN.
+    """
+    values = prices.to_numpy(dtype=np.float64)
+    previous = prices.ffill().shift(1).to_numpy(dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values / previous - 1
+
+    returns[np.isnan(previous)] = 0
+    returns[np.isnan(values)] = np.nan
+
+    return DataFrame(returns, index=prices.index, columns=prices.columns)
+
+
+def _returns_panel(data: typing.Union[DataFrame, typing.Dict[str, PriceData]]) -> DataFrame:
+    """ Builds the dates x tickers returns block used by `performance_summary`. """
+    if isinstance(data, DataFrame):
+        return _returns_from_prices(data)
+
+    returns = {ticker: Series(df.returns, index=df.index) for ticker, df in data.items() if isinstance(df, StockDataFrame)}
+    returns.update({ticker: df['return'] for ticker, df in data.items() if ticker not in returns and 'return' in df.columns})
+    prices = {ticker: df['adj_close'] for ticker, df in data.items() if ticker not in returns}
+
+    frames = []
+    if prices:
+        frames.append(_returns_from_prices(pd.concat(prices, axis=1).sort_index()))
+    if returns:
+        frames.append(pd.concat(returns, axis=1))
+
+    return pd.concat(frames, axis=1).sort_index()[list(data)]
+
+
+def performance_summary(data: typing.Union[DataFrame, typing.Dict[str, PriceData]],
+                        rf: float = 0.03,
+                        period: typing.Optional[str] = None) -> DataFrame:
+    """ Calculates CAGR, volatility, Sharpe, Sortino, max drawdown and Calmar for many tickers at once.
+
+        Equivalent to calling each KPI function above per ticker, but the returns, the cumulative
+        return and its running max are computed once for the whole universe instead of once per metric.
+        Unlike `sharpe_ratio` and `sortino_ratio`, the CAGR used by the ratios honors `period`.
 
         Args:
-            df (DataFrame): Columns - ['adj_close']
+            data (Union[DataFrame, Dict[str, PriceData]]): Either a dates x tickers block of adjusted
+                close prices (NaN padded for tickers with different listing dates), or dataframes by
+                ticker with Columns - ['return'] or ['adj_close'], or `StockDataFrame`s by ticker
+            rf (float): Risk free rate used by the Sharpe and Sortino ratios. Default is 0.03.
+            period (Optional[str]): Period of the stock prices. Default is 'day'.
 
         Returns:
-            Calculated ratio value for the df.
+            (DataFrame) Index - ticker, Columns - [
+                'cagr', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'maximum_drawdown', 'calmar_ratio',
+            ]
     """
-    new_df = df.copy()
+    period = period or 'day'
+    num_periods = _PERIOD_TO_NUM_PERIODS.get(period)
+    if num_periods is None:
+        raise ValueError(f'Invalid period: {period}')
 
-    return cagr(new_df) / maximum_drawdown(new_df)
+    returns = _returns_panel(data)
+    values = returns.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=0) / num_periods
+
+    cum_return = np.cumprod(np.where(valid, 1 + values, 1), axis=0)
+    cum_roll_max = np.maximum.accumulate(cum_return, axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        cagr = cum_return[-1]**(1/n) - 1
+        volatility = np.nanstd(values, axis=0, ddof=1) * np.sqrt(num_periods)
+        neg_volatility = np.nanstd(np.where(values < 0, values, np.nan), axis=0, ddof=1) * np.sqrt(num_periods)
+        drawdown = ((cum_roll_max - cum_return) / cum_roll_max).max(axis=0)
+
+        summary = DataFrame({
+            'cagr': cagr,
+            'volatility': volatility,
+            'sharpe_ratio': (cagr - rf) / volatility,
+            'sortino_ratio': (cagr - rf) / neg_volatility,
+            'maximum_drawdown': drawdown,
+            'calmar_ratio': cagr / drawdown,
+        }, index=returns.columns)
+
+    summary.index.name = 'ticker'
+    return summary
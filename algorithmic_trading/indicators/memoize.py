@@ -0,0 +1,308 @@
+# coding: utf-8
+""" Content-addressed memoization of the indicator and KPI functions.
+
+    Results are keyed by a fingerprint of the input frame (index and values) plus the function
+    name and its bound parameters, so the same history with the same parameters is computed once,
+    no matter which object it comes from. Entries live in an in-memory LRU bounded by an
+    approximate byte budget, with an optional on-disk tier that survives restarts.
+
+    When a frame only grew by a few appended rows since a previous call, the indicators with a
+    streaming counterpart in `streaming` are extended over the new rows instead of being recomputed:
+    the streaming state is restored from the cached output with array operations (not by replaying
+    the history) and kept for the next extension. Larger appends are recomputed by the batch function.
+
+        cache = memoize.enable()        # wraps the momentum and key_performance functions
+        momentum.macd(df)               # miss
+        momentum.macd(df.copy())        # hit
+        cache.stats                     # CacheStats(hits=1, misses=1, ...)
+        memoize.disable()
+
+    Cached results are shared between callers and should be treated as read-only.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import functools
+import hashlib
+import inspect
+from pathlib import Path
+import pickle
+import sys
+import typing
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from . import key_performance
+from . import momentum
+from . import streaming
+
+
+_STREAMING_INDICATORS: typing.Dict[str, typing.Type[streaming.StreamingIndicator]] = {
+    'macd': streaming.StreamingMACD,
+    'rsi': streaming.StreamingRSI,
+    'average_true_range': streaming.StreamingAverageTrueRange,
+    'bbands': streaming.StreamingBBands,
+    'adx': streaming.StreamingADX,
+}
+
+_MAX_APPENDED_ROWS = 16
+
+_KPI_FUNCTIONS: typing.List[str] = [
+    'cagr',
+    'volatility',
+    'sharpe_ratio',
+    'sortino_ratio',
+    'maximum_drawdown',
+    'calmar_ratio',
+    'performance_summary',
+]
+
+
+@dataclass
+class CacheStats:
+    """ Hit and miss counters of a `MemoCache`.
+
+        Attributes:
+            hits (int): Results served from memory.
+            disk_hits (int): Results served from the on-disk tier.
+            extensions (int): Results extended from a previous result over appended rows.
+            misses (int): Results computed from scratch.
+            evictions (int): Entries evicted from memory to stay within the byte budget.
+    """
+    hits: int = 0
+    disk_hits: int = 0
+    extensions: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of the calls that did not compute from scratch. """
+        calls = self.hits + self.disk_hits + self.extensions + self.misses
+        return (calls - self.misses) / calls if calls else 0.0
+
+
+@dataclass
+class _Lineage:
+    """ Last result of a function for a history, used to detect appended rows. """
+    length: int
+    prefix: str
+    key: str
+    state: typing.Optional[streaming.StreamingIndicator] = None
+
+
+def _row_hashes(data: typing.Union[DataFrame, Series]) -> typing.Any:
+    return pd.util.hash_pandas_object(data, index=True).to_numpy()
+
+
+def _digest(*parts: typing.Any) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else repr(part).encode())
+    return hasher.hexdigest()
+
+
+def _nbytes(value: typing.Any) -> int:
+    # Shallow sizes from the dtypes, as `memory_usage(deep=False)` reports them but without building a Series
+    if isinstance(value, DataFrame):
+        return int(value.index.nbytes + len(value) * sum(dtype.itemsize for dtype in value.dtypes))
+    if isinstance(value, Series):
+        return int(value.index.nbytes + len(value) * value.dtype.itemsize)
+    return sys.getsizeof(value)
+
+
+class MemoCache:
+    """ LRU memoization cache for functions taking a frame as their first argument.
+
+        Args:
+            max_bytes (int): Approximate memory budget of the cached results. Default is 256 MB.
+            disk_dir (Optional[Union[str, Path]]): Directory of the on-disk tier. Default is memory only.
+
+        Attributes:
+            stats (CacheStats): Hit and miss counters.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, disk_dir: typing.Optional[typing.Union[str, Path]] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, typing.Tuple[typing.Any, int]] = OrderedDict()
+        self._lineages: typing.Dict[str, _Lineage] = {}
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """ Approximate number of bytes held in memory. """
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """ Empties the in-memory tier and resets the statistics. The on-disk tier is kept. """
+        self._entries.clear()
+        self._lineages.clear()
+        self._size = 0
+        self.stats = CacheStats()
+
+    def _get(self, key: str) -> typing.Tuple[bool, typing.Any]:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return True, self._entries[key][0]
+
+        if self.disk_dir is not None:
+            path = self.disk_dir / f'{key}.pkl'
+            if path.exists():
+                with open(path, 'rb') as file:
+                    value = pickle.load(file)
+                self.stats.disk_hits += 1
+                self._put(key, value, persist=False)
+                return True, value
+
+        return False, None
+
+    def _put(self, key: str, value: typing.Any, persist: bool = True) -> None:
+        nbytes = _nbytes(value)
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+
+        self._entries[key] = (value, nbytes)
+        self._size += nbytes
+
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            evicted_key, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self._size -= evicted_bytes
+            self.stats.evictions += 1
+            self._lineages = {name: lineage for name, lineage in self._lineages.items() if lineage.key != evicted_key}
+
+        if persist and self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.disk_dir / f'{key}.pkl', 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _extend(self,
+                lineage: typing.Optional[_Lineage],
+                row_hashes: typing.Any,
+                indicator: typing.Optional[typing.Type[streaming.StreamingIndicator]],
+                data: DataFrame,
+                params: typing.Dict[str, typing.Any]) -> typing.Tuple[bool, typing.Any, typing.Optional[streaming.StreamingIndicator]]:
+        """ Extends the previous result of the lineage if `data` is its input with rows appended. """
+        if indicator is None or lineage is None or lineage.key not in self._entries or len(data) <= lineage.length:
+            return False, None, None
+
+        # Feeding rows one at a time only beats the vectorized batch function for a few rows
+        if len(data) - lineage.length > _MAX_APPENDED_ROWS:
+            return False, None, None
+
+        if _digest(row_hashes[:lineage.length].tobytes()) != lineage.prefix:
+            return False, None, None
+
+        previous = self._entries[lineage.key][0]
+        state = lineage.state or indicator.from_batch(data.iloc[:lineage.length], previous, **params)
+        extension = state._extend_values(data.iloc[lineage.length:])
+
+        # The outputs are all float columns, so the rows are stacked without going through `pd.concat`
+        values = np.concatenate([previous.to_numpy(dtype=np.float64), extension])
+        if isinstance(previous, Series):
+            result = Series(values, index=data.index, name=previous.name)
+        else:
+            result = DataFrame(values, index=data.index, columns=previous.columns)
+
+        return True, result, state
+
+    def wrap(self, func: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+        """ Wraps a function whose first argument is a DataFrame or Series with the cache.
+
+            Args:
+                func (Callable): Function to memoize, e.g. `momentum.macd`.
+
+            Returns:
+                (Callable) Memoized function with the same signature.
+        """
+        signature = inspect.signature(func)
+        name = f'{func.__module__}.{func.__qualname__}'
+        indicator = _STREAMING_INDICATORS.get(func.__name__) if func.__module__ == momentum.__name__ else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = list(bound.arguments.items())
+            data = arguments[0][1]
+
+            if not isinstance(data, (DataFrame, Series)):
+                return func(*args, **kwargs)
+
+            params = dict(arguments[1:])
+            columns = list(data.columns) if isinstance(data, DataFrame) else [data.name]
+            row_hashes = _row_hashes(data)
+            key = _digest(name, sorted(params.items()), columns, row_hashes.tobytes())
+
+            found, result = self._get(key)
+            if found:
+                return result
+
+            lineage_name = _digest(name, sorted(params.items()), columns, row_hashes[:1].tobytes())
+            lineage = self._lineages.get(lineage_name)
+
+            extended, result, state = self._extend(lineage, row_hashes, indicator, data, params)
+            if extended:
+                self.stats.extensions += 1
+            else:
+                self.stats.misses += 1
+                result = func(*args, **kwargs)
+
+            self._put(key, result)
+            if key in self._entries:
+                self._lineages[lineage_name] = _Lineage(len(data), _digest(row_hashes.tobytes()), key, state)
+
+            return result
+
+        wrapper.__wrapped_by_cache__ = self
+        return wrapper
+
+
+_default_cache: typing.Optional[MemoCache] = None
+_originals: typing.Dict[typing.Tuple[typing.Any, str], typing.Callable[..., typing.Any]] = {}
+
+
+def enable(cache: typing.Optional[MemoCache] = None) -> MemoCache:
+    """ Memoizes the public functions of `momentum` and `key_performance` in place.
+
+        Calls made through the modules go through the cache until `disable` is called. Only those
+        module attributes are replaced, so the ratio KPIs, which compute their parts with `arrays`
+        directly, are cached as a whole rather than per part.
+
+        Args:
+            cache (Optional[MemoCache]): Cache to use. Default is a new `MemoCache()`.
+
+        Returns:
+            (MemoCache) The cache in use.
+    """
+    global _default_cache
+
+    disable()
+    _default_cache = cache if cache is not None else MemoCache()
+
+    targets = [(momentum, name) for name in _STREAMING_INDICATORS] + [(key_performance, name) for name in _KPI_FUNCTIONS]
+    for module, name in targets:
+        original = getattr(module, name)
+        _originals[(module, name)] = original
+        setattr(module, name, _default_cache.wrap(original))
+
+    return _default_cache
+
+
+def disable() -> None:
+    """ Restores the original, uncached functions. """
+    global _default_cache
+
+    for (module, name), original in _originals.items():
+        setattr(module, name, original)
+
+    _originals.clear()
+    _default_cache = None
@@ -0,0 +1,258 @@
+# coding: utf-8
+""" Panel (dates x tickers) versions of the indicators in `momentum`.
+
+    Every function here takes one 2-D block per price field, where the index is the date and
+    each column is a ticker, and computes the indicator for the whole universe in one vectorized
+    pass. The results match the per-ticker functions in `momentum` when they are called on each
+    ticker's own (NaN free) dataframe, including tickers that are NaN padded because they listed
+    or delisted at different dates, or that have gaps in their history.
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+from pandas import DataFrame
+import pandas as pd
+
+from . import momentum
+
+
+Panel = typing.Dict[str, DataFrame]
+
+
+def to_panel(data: typing.Dict[str, DataFrame],
+             columns: typing.Optional[typing.List[str]] = None) -> Panel:
+    """ Converts the per-ticker dataframes returned by a `FinancialPuller` into a panel.
+
+        Args:
+            data (Dict[str, DataFrame]): Dataframes by ticker.
+                Columns - ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+            columns (Optional[List[str]]): Columns to convert. Default is every column of the first dataframe.
+
+        Returns:
+            (Panel) Dates x tickers dataframe for each column, outer joined on the date index and NaN padded.
+    """
+    if not data:
+        return {}
+
+    columns = columns or list(next(iter(data.values())).columns)
+    return {
+        column: pd.concat({ticker: df[column] for ticker, df in data.items()}, axis=1).sort_index()
+        for column in columns
+    }
+
+
+def from_panel(panel: Panel) -> typing.Dict[str, DataFrame]:
+    """ Converts a panel back into per-ticker dataframes, dropping the NaN padded rows.
+
+        Args:
+            panel (Panel): Dates x tickers dataframe for each column.
+
+        Returns:
+            (Dict[str, DataFrame]) Dataframes by ticker with one column per panel field.
+    """
+    if not panel:
+        return {}
+
+    tickers = next(iter(panel.values())).columns
+    return {
+        ticker: DataFrame({column: frame[ticker] for column, frame in panel.items()}).dropna(how='all')
+        for ticker in tickers
+    }
+
+
+class _Compactor:
+    """ Moves the valid rows of each ticker to the top of the block so that windowed and
+        recursive calculations see the same sequence of bars as the per-ticker functions,
+        then scatters the results back onto the original dates.
+    """
+
+    def __init__(self, *frames: DataFrame):
+        self.index = frames[0].index
+        self.columns = frames[0].columns
+
+        for frame in frames[1:]:
+            if not frame.index.equals(self.index) or not frame.columns.equals(self.columns):
+                raise ValueError('All panel fields must share the same dates and tickers')
+
+        values = [frame.to_numpy(dtype=np.float64) for frame in frames]
+        self.valid = np.logical_and.reduce([~np.isnan(value) for value in values])
+        self.dense = bool(self.valid.all())
+
+        if self.dense:
+            self.frames = [DataFrame(value, columns=self.columns) for value in values]
+            return
+
+        self.order = np.argsort(~self.valid, axis=0, kind='stable')
+        sorted_valid = np.take_along_axis(self.valid, self.order, axis=0)
+        self.frames = []
+        for value in values:
+            compacted = np.take_along_axis(value, self.order, axis=0)
+            compacted[~sorted_valid] = np.nan
+            self.frames.append(DataFrame(compacted, columns=self.columns))
+
+    def expand(self, frame: DataFrame) -> DataFrame:
+        """ Scatters a result computed on the compacted block back onto the original dates. """
+        values = frame.to_numpy(dtype=np.float64, copy=True)
+
+        if not self.dense:
+            expanded = np.empty_like(values)
+            np.put_along_axis(expanded, self.order, values, axis=0)
+            values = expanded
+
+        values[~self.valid] = np.nan
+        return DataFrame(values, index=self.index, columns=self.columns)
+
+
+def _ewm(frame: DataFrame, span: int) -> DataFrame:
+    return frame.ewm(span=span, min_periods=span).mean()
+
+
+def _where(condition: DataFrame, frame: DataFrame) -> DataFrame:
+    """ Mirrors `np.where(condition, frame, 0)` from `momentum` while keeping the block a DataFrame. """
+    return DataFrame(np.where(condition, frame, 0), columns=frame.columns)
+
+
+def macd(adj_close: DataFrame, a: int = 12, b: int = 26, c: int = 9) -> Panel:
+    """ Moving Average Convergence Divergence for a panel of tickers.
+
+        Args:
+            adj_close (DataFrame): Dates x tickers adjusted close prices.
+
+        Returns:
+            (Panel) Keys - ['ma_fast', 'ma_slow', 'macd', 'signal']
+    """
+    compactor = _Compactor(adj_close)
+    (close,) = compactor.frames
+
+    ma_fast = _ewm(close, a)
+    ma_slow = _ewm(close, b)
+    macd_ = ma_fast - ma_slow
+    signal = _ewm(macd_, c)
+
+    outputs = {'ma_fast': ma_fast, 'ma_slow': ma_slow, 'macd': macd_, 'signal': signal}
+    return {key: compactor.expand(value) for key, value in outputs.items()}
+
+
+def rsi(adj_close: DataFrame, n: int = 14) -> Panel:
+    """ Relative Strength Index for a panel of tickers.
+
+        Args:
+            adj_close (DataFrame): Dates x tickers adjusted close prices.
+
+        Returns:
+            (Panel) Keys - ['gain', 'loss', 'avg_gain', 'avg_loss', 'relative_strength', 'rsi']
+    """
+    compactor = _Compactor(adj_close)
+    (close,) = compactor.frames
+
+    change = close - close.shift(1)
+    gain = _where(change >= 0, change)
+    loss = _where(change < 0, -1 * change)
+    avg_gain = momentum._rma(gain, n)
+    avg_loss = momentum._rma(loss, n)
+    relative_strength = avg_gain / avg_loss
+    rsi_ = 100 - (100 / (1 + relative_strength))
+
+    outputs = {
+        'gain': gain,
+        'loss': loss,
+        'avg_gain': avg_gain,
+        'avg_loss': avg_loss,
+        'relative_strength': relative_strength,
+        'rsi': rsi_,
+    }
+    return {key: compactor.expand(value) for key, value in outputs.items()}
+
+
+def _average_true_range(high: DataFrame, low: DataFrame, adj_close: DataFrame, n: int) -> DataFrame:
+    """ ATR on an already compacted block. """
+    previous_close = adj_close.shift(1)
+    true_range = np.maximum(np.maximum(high - low, high - previous_close), low - previous_close)
+
+    return _ewm(true_range, n)
+
+
+def average_true_range(high: DataFrame, low: DataFrame, adj_close: DataFrame, n: int = 14) -> DataFrame:
+    """ Average True Range for a panel of tickers.
+
+        Args:
+            high (DataFrame): Dates x tickers high prices.
+            low (DataFrame): Dates x tickers low prices.
+            adj_close (DataFrame): Dates x tickers adjusted close prices.
+
+        Returns:
+            (DataFrame) Dates x tickers ATR values.
+    """
+    compactor = _Compactor(high, low, adj_close)
+
+    return compactor.expand(_average_true_range(*compactor.frames, n))
+
+
+def bbands(adj_close: DataFrame, n: int = 14) -> Panel:
+    """ Bollinger Bands for a panel of tickers.
+
+        Args:
+            adj_close (DataFrame): Dates x tickers adjusted close prices.
+
+        Returns:
+            (Panel) Keys - ['middle_band', 'upper_band', 'lower_band', 'bollinger_band_width']
+    """
+    compactor = _Compactor(adj_close)
+    (close,) = compactor.frames
+
+    rolling = close.rolling(n)
+    middle_band = rolling.mean()
+    std = rolling.std(ddof=0)
+    upper_band = middle_band + 2 * std
+    lower_band = middle_band - 2 * std
+    bollinger_band_width = upper_band - lower_band
+
+    outputs = {
+        'middle_band': middle_band,
+        'upper_band': upper_band,
+        'lower_band': lower_band,
+        'bollinger_band_width': bollinger_band_width,
+    }
+    return {key: compactor.expand(value) for key, value in outputs.items()}
+
+
+def adx(high: DataFrame, low: DataFrame, adj_close: DataFrame, n: int = 20) -> Panel:
+    """ Average Directional Index for a panel of tickers.
+
+        Args:
+            high (DataFrame): Dates x tickers high prices.
+            low (DataFrame): Dates x tickers low prices.
+            adj_close (DataFrame): Dates x tickers adjusted close prices.
+
+        Returns:
+            (Panel) Keys - [
+                'avg_true_range', 'up_move', 'down_move', 'plus_down_move', 'minus_down_move',
+                'plus_directional_indicator', 'minus_directional_indicator', 'adx',
+            ]
+    """
+    compactor = _Compactor(high, low, adj_close)
+    high, low, close = compactor.frames
+
+    avg_true_range = _average_true_range(high, low, close, n)
+    up_move = high - high.shift(1)
+    down_move = low.shift(1) - low
+    plus_down_move = _where((up_move >= down_move) & (up_move > 0), up_move)
+    minus_down_move = _where((down_move >= up_move) & (down_move > 0), down_move)
+    plus_directional_indicator = 100 * _ewm(plus_down_move / avg_true_range, n)
+    minus_directional_indicator = 100 * _ewm(minus_down_move / avg_true_range, n)
+
+    adx_ = 100 * abs(plus_directional_indicator - minus_directional_indicator) / _ewm(plus_directional_indicator + minus_directional_indicator, n)
+
+    outputs = {
+        'avg_true_range': avg_true_range,
+        'up_move': up_move,
+        'down_move': down_move,
+        'plus_down_move': plus_down_move,
+        'minus_down_move': minus_down_move,
+        'plus_directional_indicator': plus_directional_indicator,
+        'minus_directional_indicator': minus_directional_indicator,
+        'adx': adx_,
+    }
+    return {key: compactor.expand(value) for key, value in outputs.items()}
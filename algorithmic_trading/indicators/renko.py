@@ -0,0 +1,210 @@
+# coding: utf-8
+""" Renko bricks.
+
+    Bricks are built from the adjusted close on a grid of `brick_size` steps. A brick in the same
+    direction as the last one is added every time the price moves one more brick beyond it, while a
+    reversal needs the price to move two bricks (i.e. one full brick past the open of the last brick).
+
+    Rather than looping over every bar, the builder jumps from one brick forming bar to the next
+    with vectorized searches over the quantized prices, so bars that stay inside the current brick
+    band cost one array comparison each. The builder keeps its state between calls, so new bars
+    extend the brick series without rebuilding it.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import math
+import typing
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from . import momentum
+from . import panel
+
+
+_INITIAL_SEARCH_WINDOW = 64
+
+
+def _next_event(levels: np.ndarray, start: int, upper: float, lower: float) -> int:
+    """ Index of the first level at or after `start` outside (lower, upper), -1 if there is none.
+
+        The search window doubles until a hit is found, so finding an event `k` bars ahead costs O(k).
+    """
+    step = _INITIAL_SEARCH_WINDOW
+    while start < len(levels):
+        stop = min(start + step, len(levels))
+        window = levels[start:stop]
+        hits = np.flatnonzero((window >= upper) | (window <= lower))
+        if hits.size:
+            return start + int(hits[0])
+
+        start = stop
+        step *= 2
+
+    return -1
+
+
+@dataclass
+class RenkoBuilder:
+    """ Incremental Renko brick builder.
+
+        Attributes:
+            brick_size (float): Price move per brick.
+            base (Optional[float]): Price of grid level 0, set from the first price seen.
+            close_level (int): Grid level of the last brick close.
+            direction (int): Direction of the last brick (1 up, -1 down, 0 before the first brick).
+            brick_count (int): Signed number of consecutive bricks in the last direction.
+    """
+    brick_size: float
+    base: typing.Optional[float] = None
+    close_level: int = 0
+    direction: int = 0
+    brick_count: int = 0
+
+    def __post_init__(self):
+        if not self.brick_size > 0:
+            raise ValueError(f'Invalid brick_size: {self.brick_size}')
+
+    def extend(self, prices: Series) -> DataFrame:
+        """ Consumes new prices and returns the bricks they form.
+
+            Args:
+                prices (Series): Adjusted close prices indexed by date, following the prices already consumed.
+
+            Returns:
+                (DataFrame) Columns - ['date', 'open', 'close', 'direction', 'brick_count']
+        """
+        values = prices.to_numpy(dtype=np.float64)
+        dates = prices.index
+
+        if self.base is None:
+            valid = np.flatnonzero(~np.isnan(values))
+            if not valid.size:
+                return _empty_bricks()
+            self.base = math.floor(values[valid[0]] / self.brick_size) * self.brick_size
+
+        levels = (values - self.base) / self.brick_size
+        previous_direction, previous_count = self.direction, self.brick_count
+
+        event_positions = []
+        brick_closes = []
+        brick_directions = []
+
+        position = 0
+        while True:
+            upper = self.close_level + (2 if self.direction == -1 else 1)
+            lower = self.close_level - (2 if self.direction == 1 else 1)
+
+            position = _next_event(levels, position, upper, lower)
+            if position < 0:
+                break
+
+            level = levels[position]
+            if level >= upper:
+                closes = np.arange(upper, math.floor(level) + 1)
+                self.direction = 1
+            else:
+                closes = np.arange(lower, math.ceil(level) - 1, -1)
+                self.direction = -1
+
+            event_positions.append(np.full(len(closes), position))
+            brick_closes.append(closes)
+            brick_directions.append(np.full(len(closes), self.direction))
+            self.close_level = int(closes[-1])
+            position += 1
+
+        if not brick_closes:
+            return _empty_bricks()
+
+        positions = np.concatenate(event_positions)
+        closes = np.concatenate(brick_closes)
+        directions = np.concatenate(brick_directions)
+
+        # Running count of consecutive bricks, continuing the run left by the previous call
+        new_run = np.concatenate([[True], directions[1:] != directions[:-1]])
+        run_starts = np.flatnonzero(new_run)
+        run_ids = np.cumsum(new_run) - 1
+        counts = np.arange(len(directions)) - run_starts[run_ids] + 1
+        if directions[0] == previous_direction:
+            counts[run_ids == 0] += abs(previous_count)
+        self.brick_count = int(directions[-1] * counts[-1])
+
+        return DataFrame({
+            'date': dates[positions],
+            'open': self.base + (closes - directions) * self.brick_size,
+            'close': self.base + closes * self.brick_size,
+            'direction': directions,
+            'brick_count': directions * counts,
+        })
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """ Serializes the builder state into a JSON compatible dictionary. """
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: typing.Dict[str, typing.Any]) -> RenkoBuilder:
+        """ Restores a builder serialized with `to_dict`. """
+        return cls(**data)
+
+
+def _empty_bricks() -> DataFrame:
+    return DataFrame({
+        'date': pd.DatetimeIndex([]),
+        'open': np.empty(0),
+        'close': np.empty(0),
+        'direction': np.empty(0, dtype=np.int64),
+        'brick_count': np.empty(0, dtype=np.int64),
+    })
+
+
+def renko(df: DataFrame, n: int = 20, brick_size: typing.Optional[float] = None) -> DataFrame:
+    """ Renko bricks for one ticker.
+
+        Without a `brick_size`, a ValueError is raised when ATR(n) has no value, e.g. with fewer than n bars.
+
+        Args:
+            df (DataFrame): Columns - ['high', 'low', 'adj_close']
+            n (int): ATR length used to derive the brick size. Default is 20.
+            brick_size (Optional[float]): Fixed brick size. Default is the last ATR(n) value.
+
+        Returns:
+            (DataFrame) Columns - ['date', 'open', 'close', 'direction', 'brick_count']
+    """
+    if not brick_size:
+        atr = momentum.average_true_range(df, n).dropna()
+        if atr.empty:
+            raise ValueError(f'Cannot derive a brick size: ATR({n}) has no value for {len(df)} bars')
+
+        brick_size = atr.iloc[-1]
+
+    return RenkoBuilder(brick_size).extend(df['adj_close'])
+
+
+def renko_for_tickers(data: typing.Dict[str, DataFrame],
+                      n: int = 20,
+                      brick_size: typing.Optional[float] = None) -> typing.Tuple[typing.Dict[str, DataFrame], typing.Dict[str, RenkoBuilder]]:
+    """ Renko bricks for many tickers, with the ATR brick sizes computed in one panel pass.
+
+        Args:
+            data (Dict[str, DataFrame]): Dataframes by ticker. Columns - ['high', 'low', 'adj_close']
+            n (int): ATR length used to derive the brick sizes. Default is 20.
+            brick_size (Optional[float]): Fixed brick size for every ticker. Default is each ticker's last ATR(n) value.
+
+        Returns:
+            (Tuple[Dict[str, DataFrame], Dict[str, RenkoBuilder]]) Bricks by ticker, with columns
+                ['date', 'open', 'close', 'direction', 'brick_count'], and the builders to extend them with.
+                Tickers whose ATR(n) has no value (fewer than n bars, or no prices) are left out of both.
+    """
+    if brick_size is None:
+        prices = panel.to_panel(data, ['high', 'low', 'adj_close'])
+        brick_sizes = panel.average_true_range(prices['high'], prices['low'], prices['adj_close'], n).ffill().iloc[-1]
+        brick_sizes = brick_sizes.dropna()
+    else:
+        brick_sizes = Series(brick_size, index=list(data))
+
+    builders = {ticker: RenkoBuilder(float(brick_sizes[ticker])) for ticker in data if ticker in brick_sizes.index}
+    bricks = {ticker: builders[ticker].extend(data[ticker]['adj_close']) for ticker in builders}
+
+    return bricks, builders
@@ -0,0 +1,164 @@
+# coding: utf-8
+""" Rolling window versions of the indicators in `key_performance`.
+
+    The value at each row is the KPI of the `window` returns ending at that row, i.e. the same as
+    calling the `key_performance` function on `returns_df.iloc[i - window + 1:i + 1]` where
+    `returns_df` is the dataframe with the 'return' column from `utils.finance.get_return_from_adj_close`.
+    Every function runs in O(n) for a series of n rows regardless of the window size.
+"""
+from __future__ import annotations
+
+import typing
+
+from pandas import DataFrame, Series
+import numpy as np
+
+from .key_performance import _num_periods
+from .. import utils
+
+
+def _get_returns(df: DataFrame) -> Series:
+    if 'return' in df.columns:
+        return df['return']
+
+    return utils.finance.get_return_from_adj_close(df[['adj_close']])['return']
+
+
+def rolling_cagr(df: DataFrame, window: int = 252, period: typing.Optional[str] = None) -> Series:
+    """ Calculates the rolling Compound Annual Growth Rate (CAGR) for the given dataframe.
+
+        Args:
+            df (DataFrame): Columns - ['return'] or ['adj_close']
+            window (int): Number of rows in each window. Default is 252.
+            period (Optional[str]): Period of the stock prices. Default is 'day'.
+
+        Returns:
+            (Series) CAGR of the window ending at each row, NaN for the first `window - 1` rows.
+    """
+    num_periods = _num_periods(period)
+    n = window / num_periods
+
+    log_growth = np.log1p(_get_returns(df)).rolling(window).sum()
+
+    return (np.exp(log_growth)**(1/n) - 1).rename('cagr')
+
+
+def rolling_volatility(df: DataFrame, window: int = 252, period: typing.Optional[str] = None) -> Series:
+    """ Calculates the rolling volatility for the given dataframe.
+
+        Args:
+            df (DataFrame): Columns - ['return'] or ['adj_close']
+            window (int): Number of rows in each window. Default is 252.
+            period (Optional[str]): Period of the stock prices. Default is 'day'.
+
+        Returns:
+            (Series) Volatility of the window ending at each row, NaN for the first `window - 1` rows.
+    """
+    num_periods = _num_periods(period)
+
+    return (_get_returns(df).rolling(window).std() * np.sqrt(num_periods)).rename('volatility')
+
+
+def rolling_sharpe_ratio(df: DataFrame,
+                         window: int = 252,
+                         rf: float = 0.03,
+                         period: typing.Optional[str] = None) -> Series:
+    """ Calculates the rolling Sharpe Ratio for the given dataframe.
+
+        Args:
+            df (DataFrame): Columns - ['return'] or ['adj_close']
+            window (int): Number of rows in each window. Default is 252.
+            rf (float): Risk free rate. Default is 0.03.
+            period (Optional[str]): Period of the stock prices. Default is 'day'.
+
+        Returns:
+            (Series) Sharpe Ratio of the window ending at each row, NaN for the first `window - 1` rows.
+    """
+    returns_df = DataFrame({'return': _get_returns(df)})
+
+    ratio = (rolling_cagr(returns_df, window, period) - rf) / rolling_volatility(returns_df, window, period)
+
+    return ratio.rename('sharpe_ratio')
+
+
+def rolling_sortino_ratio(df: DataFrame,
+                          window: int = 252,
+                          rf: float = 0.03,
+                          period: typing.Optional[str] = None) -> Series:
+    """ Calculates the rolling Sortino Ratio for the given dataframe.
+
+        Args:
+            df (DataFrame): Columns - ['return'] or ['adj_close']
+            window (int): Number of rows in each window. Default is 252.
+            rf (float): Risk free rate. Default is 0.03.
+            period (Optional[str]): Period of the stock prices. Default is 'day'.
+
+        Returns:
+            (Series) Sortino Ratio of the window ending at each row, NaN for the first `window - 1` rows.
+    """
+    num_periods = _num_periods(period)
+    returns_df = DataFrame({'return': _get_returns(df)})
+
+    neg_return = returns_df['return'].where(returns_df['return'] < 0)
+    neg_volatility = neg_return.rolling(window, min_periods=2).std() * np.sqrt(num_periods)
+    neg_volatility.iloc[:window - 1] = np.nan
+
+    ratio = (rolling_cagr(returns_df, window, period) - rf) / neg_volatility
+
+    return ratio.rename('sortino_ratio')
+
+
+def _rolling_max_drop(log_growth: np.ndarray, window: int) -> np.ndarray:
+    """ Largest fall `log_growth[s] - log_growth[t]` with `s <= t` inside each window.
+
+        The series is cut into blocks of `window` rows, so every window is a suffix of one block
+        followed by a prefix of the next. The (max, min, max drop) aggregate of every block prefix and
+        suffix is built with cumulative max/min passes and the two halves are merged per window,
+        giving O(n) work in total (van Herk / Gil-Werman).
+    """
+    n = len(log_growth)
+    drop = np.full(n, np.nan)
+    if n < window:
+        return drop
+
+    num_blocks = -(-n // window)
+    padded = np.full(num_blocks * window, np.nan)
+    padded[:n] = log_growth
+    blocks = padded.reshape(num_blocks, window)
+
+    prefix_max = np.maximum.accumulate(blocks, axis=1)
+    prefix_min = np.minimum.accumulate(blocks, axis=1).ravel()
+    prefix_drop = np.maximum.accumulate(prefix_max - blocks, axis=1).ravel()
+
+    reversed_blocks = blocks[:, ::-1]
+    suffix_max = np.maximum.accumulate(reversed_blocks, axis=1)[:, ::-1].ravel()
+    reversed_drop = reversed_blocks - np.minimum.accumulate(reversed_blocks, axis=1)
+    suffix_drop = np.maximum.accumulate(reversed_drop, axis=1)[:, ::-1].ravel()
+
+    end = np.arange(window - 1, n)
+    start = end - window + 1
+
+    merged = np.maximum(np.maximum(suffix_drop[start], prefix_drop[end]), suffix_max[start] - prefix_min[end])
+    aligned = start % window == 0
+    merged[aligned] = prefix_drop[end[aligned]]
+
+    drop[window - 1:] = merged
+    return drop
+
+
+def rolling_maximum_drawdown(df: DataFrame, window: int = 252) -> Series:
+    """ Calculates the rolling Maximum Drawdown for the given dataframe.
+
+        Args:
+            df (DataFrame): Columns - ['return'] or ['adj_close']
+            window (int): Number of rows in each window. Default is 252.
+
+        Returns:
+            (Series) Max Drawdown of the window ending at each row, NaN for the first `window - 1` rows.
+    """
+    returns = _get_returns(df)
+    log_growth = np.cumsum(np.log1p(returns.to_numpy(dtype=np.float64)))
+
+    drawdown = -np.expm1(-_rolling_max_drop(log_growth, window))
+
+    return Series(drawdown, index=returns.index, name='maximum_drawdown')
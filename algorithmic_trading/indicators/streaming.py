@@ -0,0 +1,495 @@
+# coding: utf-8
+""" Stateful, O(1) per bar versions of the indicators in `momentum`.
+
+    Each indicator is seeded from a history dataframe and then updated one bar at a time,
+    producing the same values as the batch function run over the full history. The state can be
+    dumped with `to_dict` (JSON compatible) and restored with `from_dict` so a restarted process
+    can continue from where it left off without replaying the history.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import asdict, dataclass, field
+import math
+import typing
+
+import numpy as np
+from pandas import DataFrame, Series
+
+from . import arrays
+
+
+Bar = typing.Mapping[str, float]
+
+_NAN = float('nan')
+
+
+@dataclass
+class _Ewm:
+    """ Exponentially weighted mean with `adjust=True` and `ignore_na=False`, mirroring the
+        recursion pandas uses for `Series.ewm(...).mean()`.
+    """
+    alpha: float
+    min_periods: int
+    weighted: float = _NAN
+    old_wt: float = 1.0
+    nobs: int = 0
+
+    @classmethod
+    def from_span(cls, span: int) -> _Ewm:
+        com = (span - 1) / 2.0
+        return cls(alpha=1.0 / (1.0 + com), min_periods=span)
+
+    @classmethod
+    def from_alpha(cls, alpha: float, min_periods: int) -> _Ewm:
+        com = 1.0 / alpha - 1.0
+        return cls(alpha=1.0 / (1.0 + com), min_periods=min_periods)
+
+    def update(self, value: float) -> float:
+        is_observation = value == value
+        self.nobs += is_observation
+
+        if self.weighted == self.weighted:
+            self.old_wt *= 1.0 - self.alpha
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + value) / (self.old_wt + 1.0)
+                self.old_wt += 1.0
+        elif is_observation:
+            self.weighted = value
+
+        return self.weighted if self.nobs >= self.min_periods else _NAN
+
+    def absorb(self, values: np.ndarray) -> None:
+        """ Puts a fresh mean in the state `update` reaches after `values`, with array operations.
+
+            The weight of an observation decays once per later value (NaN or not), so the state is the
+            weighted mean of the observations and the sum of their weights.
+        """
+        positions = np.flatnonzero(~np.isnan(values))
+        if not len(positions):
+            return
+
+        self.nobs = len(positions)
+        decay = 1.0 - self.alpha
+        last = positions[-1]
+
+        # Weights are taken relative to the last observation, so that they cannot all underflow, and
+        # the observations whose weight is below 2**-60 of it are left out as they cannot change the sums
+        if decay > 0:
+            horizon = int(math.ceil(-60 * math.log(2) / math.log(decay))) if decay < 1 else len(values)
+            positions = positions[positions >= last - horizon]
+        else:
+            positions = positions[-1:]
+        weights = decay ** (last - positions).astype(np.float64)
+        total = weights.sum()
+
+        self.weighted = float(weights @ values[positions] / total)
+        self.old_wt = float(total * decay ** (len(values) - 1 - last))
+
+
+@dataclass
+class _RollingMoments:
+    """ Rolling mean and population variance over the last `n` values (Welford add/remove).
+
+        NaN values take a place in the window but are left out of the moments, and the output is NaN
+        until the window holds `n` valid values again, as `Series.rolling(n)` does.
+    """
+    n: int
+    window: typing.List[float] = field(default_factory=list)
+    mean: float = 0.0
+    ssqdm: float = 0.0
+
+    def __post_init__(self):
+        self.window = deque(self.window, maxlen=self.n)
+        # Derived from the window rather than stored, so the persisted state stays the same
+        self.nobs = sum(1 for value in self.window if value == value)
+
+    def update(self, value: float) -> typing.Tuple[float, float]:
+        if len(self.window) == self.n:
+            self._remove(self.window[0])
+        self.window.append(value)
+        self._add(value)
+
+        if self.nobs < self.n:
+            return _NAN, _NAN
+
+        return self.mean, max(self.ssqdm / self.nobs, 0.0)
+
+    def _add(self, value: float) -> None:
+        if value != value:
+            return
+
+        self.nobs += 1
+        delta = value - self.mean
+        self.mean += delta / self.nobs
+        self.ssqdm += delta * (value - self.mean)
+
+    def _remove(self, value: float) -> None:
+        if value != value:
+            return
+
+        self.nobs -= 1
+        if self.nobs == 0:
+            self.mean = self.ssqdm = 0.0
+            return
+
+        delta = value - self.mean
+        self.mean -= delta / self.nobs
+        self.ssqdm -= delta * (value - self.mean)
+
+
+class StreamingIndicator(ABC):
+    """ Base class for the streaming indicators.
+
+        Subclasses list the bar fields they consume in `COLUMNS`, the output columns of the batch
+        function in `OUTPUT_COLUMNS` (None for a single Series output) and the state attributes that
+        must be persisted in `_STATE`.
+    """
+
+    COLUMNS: typing.List[str] = []
+    OUTPUT_COLUMNS: typing.Optional[typing.List[str]] = None
+    _STATE: typing.List[str] = []
+
+    @abstractmethod
+    def _step(self, *values: float) -> typing.Any:
+        """ Consumes the bar fields (in `COLUMNS` order) and returns the latest output. """
+
+    def update(self, bar: Bar) -> typing.Any:
+        """ Consumes one new bar and returns the latest indicator value(s).
+
+            Args:
+                bar (Mapping[str, float]): Bar with (at least) the fields in `COLUMNS`,
+                    e.g. a row of a puller dataframe.
+
+            Returns:
+                The indicator value(s) for the bar, in the same layout as the batch function.
+        """
+        return self._step(*(float(bar[column]) for column in self.COLUMNS))
+
+    def seed(self, df: DataFrame) -> typing.Any:
+        """ Feeds every row of the history dataframe through the indicator.
+
+            Args:
+                df (DataFrame): Columns - `COLUMNS`
+
+            Returns:
+                The indicator value(s) for the last row, or None if the dataframe is empty.
+        """
+        output = None
+        for values in _rows(df, self.COLUMNS):
+            output = self._step(*values)
+
+        return output
+
+    def extend(self, df: DataFrame) -> typing.Union[DataFrame, Series]:
+        """ Feeds every row of the dataframe through the indicator and returns all the outputs.
+
+            Args:
+                df (DataFrame): Columns - `COLUMNS`
+
+            Returns:
+                (Union[DataFrame, Series]) Outputs indexed like `df`, in the layout of the batch function.
+        """
+        values = self._extend_values(df)
+
+        if self.OUTPUT_COLUMNS is None:
+            return Series(values, index=df.index, name='atr')
+
+        return DataFrame(values, index=df.index, columns=self.OUTPUT_COLUMNS)
+
+    def _extend_values(self, df: DataFrame) -> np.ndarray:
+        """ Outputs of `extend` as a float array, (rows,) or (rows x output columns). """
+        outputs = [self._step(*values) for values in _rows(df, self.COLUMNS)]
+        if self.OUTPUT_COLUMNS is None:
+            return np.array(outputs, dtype=float)
+
+        rows = [[output[column] for column in self.OUTPUT_COLUMNS] for output in outputs]
+        return np.array(rows, dtype=float).reshape(len(rows), len(self.OUTPUT_COLUMNS))
+
+    def _restore(self, df: DataFrame, output: typing.Union[DataFrame, Series]) -> None:
+        """ Puts the fresh indicator in the state it reaches after `df`, given the batch output for `df`.
+            Subclasses override it with array operations, the default replays the rows.
+        """
+        self.seed(df)
+
+    @classmethod
+    def from_batch(cls, df: DataFrame, output: typing.Union[DataFrame, Series], **params) -> StreamingIndicator:
+        """ Creates the indicator in the state it reaches after the history dataframe, from the output
+            the batch function produced for it, without feeding the rows one at a time.
+
+            Args:
+                df (DataFrame): Columns - `COLUMNS`
+                output (Union[DataFrame, Series]): Output of the batch function for `df`.
+                params: Parameters of the indicator, as in the batch function.
+
+            Returns:
+                The indicator, ready to `update` with the rows following `df`.
+        """
+        indicator = cls(**params)
+        if len(df):
+            indicator._restore(df, output)
+        return indicator
+
+    @classmethod
+    def from_history(cls, df: DataFrame, **params) -> StreamingIndicator:
+        """ Creates the indicator and seeds it from the history dataframe.
+
+            Args:
+                df (DataFrame): Columns - `COLUMNS`
+                params: Parameters of the indicator, as in the batch function.
+
+            Returns:
+                The seeded indicator.
+        """
+        indicator = cls(**params)
+        indicator.seed(df)
+        return indicator
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """ Serializes the indicator state into a JSON compatible dictionary. """
+        state = {}
+        for name in self._STATE:
+            value = getattr(self, name)
+            if isinstance(value, (_Ewm, _RollingMoments)):
+                value = asdict(value)
+                if 'window' in value:
+                    value['window'] = list(value['window'])
+            state[name] = value
+
+        return {'type': type(self).__name__, 'state': state}
+
+    @classmethod
+    def from_dict(cls, data: typing.Dict[str, typing.Any]) -> StreamingIndicator:
+        """ Restores an indicator that was serialized with `to_dict`.
+
+            Args:
+                data (Dict[str, Any]): Serialized indicator.
+
+            Returns:
+                The restored indicator.
+        """
+        if data.get('type') != cls.__name__:
+            raise ValueError(f'Cannot restore {data.get("type")} state into {cls.__name__}')
+
+        indicator = cls.__new__(cls)
+        for name, value in data['state'].items():
+            if isinstance(value, dict):
+                value = _RollingMoments(**value) if 'window' in value else _Ewm(**value)
+            setattr(indicator, name, value)
+
+        return indicator
+
+
+class StreamingMACD(StreamingIndicator):
+    """ Streaming Moving Average Convergence Divergence, see `momentum.macd`.
+
+        `update` returns a dictionary with the keys ['ma_fast', 'ma_slow', 'macd', 'signal'].
+    """
+
+    COLUMNS = ['adj_close']
+    OUTPUT_COLUMNS = ['ma_fast', 'ma_slow', 'macd', 'signal']
+    _STATE = ['fast', 'slow', 'signal']
+
+    def __init__(self, a: int = 12, b: int = 26, c: int = 9):
+        self.fast = _Ewm.from_span(a)
+        self.slow = _Ewm.from_span(b)
+        self.signal = _Ewm.from_span(c)
+
+    def _step(self, adj_close: float) -> typing.Dict[str, float]:
+        ma_fast = self.fast.update(adj_close)
+        ma_slow = self.slow.update(adj_close)
+        macd = ma_fast - ma_slow
+
+        return {'ma_fast': ma_fast, 'ma_slow': ma_slow, 'macd': macd, 'signal': self.signal.update(macd)}
+
+    def _restore(self, df: DataFrame, output: DataFrame) -> None:
+        adj_close = df['adj_close'].to_numpy(dtype=np.float64)
+        self.fast.absorb(adj_close)
+        self.slow.absorb(adj_close)
+        self.signal.absorb(output['macd'].to_numpy(dtype=np.float64))
+
+
+class StreamingRSI(StreamingIndicator):
+    """ Streaming Relative Strength Index, see `momentum.rsi`.
+
+        `update` returns a dictionary with the keys
+        ['gain', 'loss', 'avg_gain', 'avg_loss', 'relative_strength', 'rsi'].
+    """
+
+    COLUMNS = ['adj_close']
+    OUTPUT_COLUMNS = ['gain', 'loss', 'avg_gain', 'avg_loss', 'relative_strength', 'rsi']
+    _STATE = ['previous_close', 'avg_gain', 'avg_loss']
+
+    def __init__(self, n: int = 14):
+        self.previous_close = _NAN
+        self.avg_gain = _Ewm.from_alpha(1 / n, n)
+        self.avg_loss = _Ewm.from_alpha(1 / n, n)
+
+    def _step(self, adj_close: float) -> typing.Dict[str, float]:
+        change = adj_close - self.previous_close
+        self.previous_close = adj_close
+
+        gain = change if change >= 0 else 0.0
+        loss = -1 * change if change < 0 else 0.0
+        avg_gain = self.avg_gain.update(gain)
+        avg_loss = self.avg_loss.update(loss)
+        relative_strength = _divide(avg_gain, avg_loss)
+
+        return {
+            'gain': gain,
+            'loss': loss,
+            'avg_gain': avg_gain,
+            'avg_loss': avg_loss,
+            'relative_strength': relative_strength,
+            'rsi': 100 - (100 / (1 + relative_strength)),
+        }
+
+    def _restore(self, df: DataFrame, output: DataFrame) -> None:
+        self.previous_close = float(df['adj_close'].iloc[-1])
+        self.avg_gain.absorb(output['gain'].to_numpy(dtype=np.float64))
+        self.avg_loss.absorb(output['loss'].to_numpy(dtype=np.float64))
+
+
+class StreamingAverageTrueRange(StreamingIndicator):
+    """ Streaming Average True Range, see `momentum.average_true_range`.
+
+        `update` returns the ATR value.
+    """
+
+    COLUMNS = ['high', 'low', 'adj_close']
+    _STATE = ['previous_close', 'atr']
+
+    def __init__(self, n: int = 14):
+        self.previous_close = _NAN
+        self.atr = _Ewm.from_span(n)
+
+    def _step(self, high: float, low: float, adj_close: float) -> float:
+        true_range = _true_range(high, low, self.previous_close)
+        self.previous_close = adj_close
+
+        return self.atr.update(true_range)
+
+    def _restore(self, df: DataFrame, output: Series) -> None:
+        self.previous_close = float(df['adj_close'].iloc[-1])
+        self.atr.absorb(_true_ranges(df))
+
+
+class StreamingBBands(StreamingIndicator):
+    """ Streaming Bollinger Bands, see `momentum.bbands`.
+
+        `update` returns a dictionary with the keys
+        ['middle_band', 'upper_band', 'lower_band', 'bollinger_band_width'].
+    """
+
+    COLUMNS = ['adj_close']
+    OUTPUT_COLUMNS = ['middle_band', 'upper_band', 'lower_band', 'bollinger_band_width']
+    _STATE = ['moments']
+
+    def __init__(self, n: int = 14):
+        self.moments = _RollingMoments(n)
+
+    def _step(self, adj_close: float) -> typing.Dict[str, float]:
+        middle_band, variance = self.moments.update(adj_close)
+        std = math.sqrt(variance) if variance == variance else _NAN
+        upper_band = middle_band + 2 * std
+        lower_band = middle_band - 2 * std
+
+        return {
+            'middle_band': middle_band,
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'bollinger_band_width': upper_band - lower_band,
+        }
+
+    def _restore(self, df: DataFrame, output: DataFrame) -> None:
+        # Only the values still in the window matter
+        self.seed(df.iloc[-self.moments.n:])
+
+
+class StreamingADX(StreamingIndicator):
+    """ Streaming Average Directional Index, see `momentum.adx`.
+
+        `update` returns a dictionary with the keys [
+            'avg_true_range', 'up_move', 'down_move', 'plus_down_move', 'minus_down_move',
+            'plus_directional_indicator', 'minus_directional_indicator', 'adx',
+        ].
+    """
+
+    COLUMNS = ['high', 'low', 'adj_close']
+    OUTPUT_COLUMNS = [
+        'avg_true_range', 'up_move', 'down_move', 'plus_down_move', 'minus_down_move',
+        'plus_directional_indicator', 'minus_directional_indicator', 'adx',
+    ]
+    _STATE = ['previous_high', 'previous_low', 'previous_close', 'atr', 'plus', 'minus', 'total']
+
+    def __init__(self, n: int = 20):
+        self.previous_high = _NAN
+        self.previous_low = _NAN
+        self.previous_close = _NAN
+        self.atr = _Ewm.from_span(n)
+        self.plus = _Ewm.from_span(n)
+        self.minus = _Ewm.from_span(n)
+        self.total = _Ewm.from_span(n)
+
+    def _step(self, high: float, low: float, adj_close: float) -> typing.Dict[str, float]:
+        avg_true_range = self.atr.update(_true_range(high, low, self.previous_close))
+        up_move = high - self.previous_high
+        down_move = self.previous_low - low
+        self.previous_high, self.previous_low, self.previous_close = high, low, adj_close
+
+        plus_down_move = up_move if up_move >= down_move and up_move > 0 else 0.0
+        minus_down_move = down_move if down_move >= up_move and down_move > 0 else 0.0
+        plus_directional_indicator = 100 * self.plus.update(_divide(plus_down_move, avg_true_range))
+        minus_directional_indicator = 100 * self.minus.update(_divide(minus_down_move, avg_true_range))
+        directional_total = self.total.update(plus_directional_indicator + minus_directional_indicator)
+
+        return {
+            'avg_true_range': avg_true_range,
+            'up_move': up_move,
+            'down_move': down_move,
+            'plus_down_move': plus_down_move,
+            'minus_down_move': minus_down_move,
+            'plus_directional_indicator': plus_directional_indicator,
+            'minus_directional_indicator': minus_directional_indicator,
+            'adx': 100 * _divide(abs(plus_directional_indicator - minus_directional_indicator), directional_total),
+        }
+
+    def _restore(self, df: DataFrame, output: DataFrame) -> None:
+        self.previous_high, self.previous_low, self.previous_close = (float(df[column].iloc[-1]) for column in self.COLUMNS)
+        avg_true_range = output['avg_true_range'].to_numpy(dtype=np.float64)
+
+        self.atr.absorb(_true_ranges(df))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.plus.absorb(output['plus_down_move'].to_numpy(dtype=np.float64) / avg_true_range)
+            self.minus.absorb(output['minus_down_move'].to_numpy(dtype=np.float64) / avg_true_range)
+        self.total.absorb((output['plus_directional_indicator'] + output['minus_directional_indicator']).to_numpy(dtype=np.float64))
+
+
+def _rows(df: DataFrame, columns: typing.List[str]) -> typing.List[typing.List[float]]:
+    """ Rows of the columns as lists of floats, selecting the columns one by one (cheaper than `df[columns]`). """
+    return np.column_stack([df[column].to_numpy(dtype=float) for column in columns]).tolist()
+
+
+def _true_ranges(df: DataFrame) -> np.ndarray:
+    """ True range of every row of a history dataframe, see `_true_range`. """
+    return arrays.true_range(*(df[column].to_numpy(dtype=np.float64) for column in ['high', 'low', 'adj_close']))
+
+
+def _true_range(high: float, low: float, previous_close: float) -> float:
+    """ True range of a bar, NaN when there is no previous close (as in `momentum.average_true_range`). """
+    if previous_close != previous_close:
+        return _NAN
+
+    return max(high - low, high - previous_close, low - previous_close)
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """ Float division with the pandas semantics for zero denominators. """
+    if denominator == 0:
+        if numerator != numerator or numerator == 0:
+            return _NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+
+    return numerator / denominator
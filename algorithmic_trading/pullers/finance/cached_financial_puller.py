@@ -0,0 +1,217 @@
+# coding: utf-8
+import datetime as dt
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from .financial_puller import DownloadError, FinancialPuller
+from ... import utils
+
+
+_DAILY = 'daily'
+_MONTHLY = 'monthly'
+
+
+class CachedFinancialPuller(FinancialPuller):
+    """ Decorates any `FinancialPuller` with a persistent local cache.
+
+        Cleaned frames are stored on disk in a columnar format (one `.npz` file per ticker and
+        interval, holding one array per column plus the date index and the covered date range).
+        Prices are float64 and the volume int64, as the pullers return them, so cached and freshly
+        pulled frames have the same dtypes (a volume with missing values stays float64).
+        A request that falls inside the covered range is served from disk; otherwise only the
+        missing range before and/or after it is pulled from the wrapped puller and merged in.
+        The last covered day is always pulled again, since it may have been an incomplete bar.
+
+        Only the tickers the wrapped puller returned have their covered range extended: a ticker
+        that failed (or was left out of its result) is retried on the next call. It is left out of
+        the result, and if the wrapped puller raised a `DownloadError`, the tickers pulled
+        successfully are still cached and a `DownloadError` holding them is raised.
+
+        Args:
+            puller (FinancialPuller): Puller used to fetch the data that is not cached yet.
+            cache_dir (Union[str, Path]): Directory holding the cached files.
+    """
+
+    def __init__(self, puller: FinancialPuller, cache_dir: Union[str, Path]):
+        self.puller = puller
+        self.cache_dir = Path(cache_dir)
+
+    def get_daily_for_tickers(self,
+                              tickers: List[str],
+                              start: Optional[utils.types.DateType] = None,
+                              end: Optional[utils.types.DateType] = None) -> Dict[str, DataFrame]:
+        """ Gets historical data from the corresponding tickers, using the cache where possible.
+
+            Args:
+                tickers (List[str]): List of tickers for the companies to retrieve historical data
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+
+            Returns
+                Dictionary of dataframes for the corresponding Tickers with the following index and columns
+                index: 'date'
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        return self._get_for_tickers(_DAILY, tickers, start, end)
+
+    def get_monthly_for_tickers(self,
+                                tickers: List[str],
+                                start: Optional[utils.types.DateType] = None,
+                                end: Optional[utils.types.DateType] = None) -> Dict[str, DataFrame]:
+        """ Gets monthly historical data from the corresponding tickers, using the cache where possible.
+
+            Args:
+                tickers (List[str]): List of tickers for the companies to retrieve historical data
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+
+            Returns
+                Dictionary of dataframes for the corresponding Tickers with the following index and columns
+                index: 'date'
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        return self._get_for_tickers(_MONTHLY, tickers, start, end)
+
+    def clear(self, tickers: Optional[List[str]] = None) -> None:
+        """ Removes the cached files for the given tickers (or every ticker).
+
+            Args:
+                tickers (Optional[List[str]]): Tickers to remove. Default is every cached ticker.
+        """
+        for interval in (_DAILY, _MONTHLY):
+            directory = self.cache_dir / interval
+            if not directory.exists():
+                continue
+
+            paths = directory.glob('*.npz') if tickers is None else (self._path(interval, ticker) for ticker in tickers)
+            for path in paths:
+                path.unlink(missing_ok=True)
+
+    def _get_for_tickers(self,
+                         interval: str,
+                         tickers: List[str],
+                         start: Optional[utils.types.DateType],
+                         end: Optional[utils.types.DateType]) -> Dict[str, DataFrame]:
+        start = pd.Timestamp(start or dt.datetime.today() - dt.timedelta(3650)).normalize()
+        end = pd.Timestamp(end or dt.datetime.today()).normalize()
+
+        cached = {ticker: self._load(interval, ticker) for ticker in tickers}
+
+        # Tickers missing the same range are pulled together in one call
+        missing_ranges: Dict[Tuple[pd.Timestamp, pd.Timestamp], List[str]] = {}
+        for ticker, (_, coverage) in cached.items():
+            for missing_range in self._missing_ranges(coverage, start, end):
+                missing_ranges.setdefault(missing_range, []).append(ticker)
+
+        pulled: Dict[str, List[DataFrame]] = {}
+        pulled_ranges: Dict[str, List[Tuple[pd.Timestamp, pd.Timestamp]]] = {}
+        failures: Dict[str, Exception] = {}
+        raised = False
+        for (missing_start, missing_end), missing_tickers in missing_ranges.items():
+            try:
+                data = self._pull(interval, missing_tickers, missing_start, missing_end)
+            except DownloadError as error:
+                data = error.data
+                failures.update(error.failures)
+                raised = True
+
+            # A ticker left out of the pull is not covered, so the next call tries it again
+            for ticker in missing_tickers:
+                if ticker in data:
+                    pulled.setdefault(ticker, []).append(data[ticker])
+                    pulled_ranges.setdefault(ticker, []).append((missing_start, missing_end))
+                else:
+                    failures.setdefault(ticker, LookupError(f'No data pulled for {ticker}'))
+
+        result = {}
+        for ticker, (dataframe, coverage) in cached.items():
+            if ticker in pulled:
+                dataframe = self._merge(dataframe, pulled[ticker])
+                for pulled_start, pulled_end in pulled_ranges[ticker]:
+                    coverage = (pulled_start, pulled_end) if coverage is None else (min(coverage[0], pulled_start), max(coverage[1], pulled_end))
+                self._save(interval, ticker, dataframe, coverage)
+
+            if ticker not in failures:
+                result[ticker] = dataframe.loc[start:end + pd.Timedelta(days=1) - pd.Timedelta(1)]
+
+        if raised:
+            raise DownloadError(result, failures)
+
+        return result
+
+    @staticmethod
+    def _missing_ranges(coverage: Optional[Tuple[pd.Timestamp, pd.Timestamp]],
+                        start: pd.Timestamp,
+                        end: pd.Timestamp) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """ Ranges to pull so that the covered range stays contiguous and includes [start, end]. """
+        if coverage is None:
+            return [(start, end)]
+
+        covered_start, covered_end = coverage
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        if end > covered_end:
+            ranges.append((covered_end, end))
+
+        return ranges
+
+    def _pull(self, interval: str, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> Dict[str, DataFrame]:
+        get_for_tickers = self.puller.get_daily_for_tickers if interval == _DAILY else self.puller.get_monthly_for_tickers
+        return get_for_tickers(tickers, start=start.to_pydatetime(), end=end.to_pydatetime())
+
+    def _with_dtypes(self, dataframe: DataFrame) -> DataFrame:
+        """ Casts the prices to float64 and the volume to int64, unless it has missing values. """
+        dtypes = {column: np.float64 for column in self.DAILY_COLUMNS}
+        if dataframe['volume'].notna().all():
+            dtypes['volume'] = np.int64
+        return dataframe[self.DAILY_COLUMNS].astype(dtypes)
+
+    def _merge(self, dataframe: DataFrame, new_dataframes: List[DataFrame]) -> DataFrame:
+        merged = pd.concat([dataframe, *new_dataframes])
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        merged.index = pd.DatetimeIndex(merged.index).rename('date')
+        return self._with_dtypes(merged)
+
+    def _empty(self) -> DataFrame:
+        return self._with_dtypes(DataFrame({column: np.empty(0) for column in self.DAILY_COLUMNS},
+                                           index=pd.DatetimeIndex([], name='date')))
+
+    def _path(self, interval: str, ticker: str) -> Path:
+        return self.cache_dir / interval / f'{quote(ticker, safe="")}.npz'
+
+    def _load(self, interval: str, ticker: str) -> Tuple[DataFrame, Optional[Tuple[pd.Timestamp, pd.Timestamp]]]:
+        path = self._path(interval, ticker)
+        if not path.exists():
+            return self._empty(), None
+
+        with np.load(path) as arrays:
+            # Older files hold the dates as int64 nanoseconds, newer ones as datetime64 in the puller's unit
+            dates = arrays['date']
+            index = pd.DatetimeIndex(dates.astype('datetime64[ns]') if dates.dtype.kind == 'i' else dates, name='date')
+            # Older files hold a float64 volume
+            dataframe = self._with_dtypes(DataFrame({column: arrays[column] for column in self.DAILY_COLUMNS}, index=index))
+            coverage = tuple(pd.Timestamp(value) for value in arrays['coverage'].astype('datetime64[ns]'))
+
+        return dataframe, coverage
+
+    def _save(self, interval: str, ticker: str, dataframe: DataFrame, coverage: Tuple[pd.Timestamp, pd.Timestamp]) -> None:
+        path = self._path(interval, ticker)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Each array keeps its column's dtype
+        arrays = {column: dataframe[column].to_numpy() for column in self.DAILY_COLUMNS}
+        arrays['date'] = dataframe.index.to_numpy()
+        arrays['coverage'] = np.array([value.value for value in coverage], dtype=np.int64)
+
+        # Written to a temporary file first so an interrupted run never leaves a truncated cache file
+        temporary_path = path.with_name(f'{path.name}.tmp')
+        with open(temporary_path, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temporary_path, path)
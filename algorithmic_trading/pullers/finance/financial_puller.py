@@ -8,6 +8,20 @@ from pandas import DataFrame
 from ... import utils
 
 
+class DownloadError(Exception):
+    """ Raised when the data for one or more tickers could not be pulled.
+
+        Attributes:
+            data (Dict[str, DataFrame]): Dataframes of the tickers that were pulled successfully.
+            failures (Dict[str, Exception]): Last error raised for each ticker that failed.
+    """
+
+    def __init__(self, data: Dict[str, DataFrame], failures: Dict[str, Exception]):
+        super().__init__(f'Failed to pull {len(failures)} ticker(s): {", ".join(failures)}')
+        self.data = data
+        self.failures = failures
+
+
 class FinancialPuller(ABC):
 
     DAILY_COLUMNS: List[str] = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
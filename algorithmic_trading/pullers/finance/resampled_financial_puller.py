@@ -0,0 +1,85 @@
+# coding: utf-8
+from typing import Dict, List, Optional
+
+from pandas import DataFrame
+
+from .financial_puller import FinancialPuller
+from . import resampling
+from ... import utils
+
+
+class ResampledFinancialPuller(FinancialPuller):
+    """ Decorates any `FinancialPuller` so that every period is derived from its daily bars.
+
+        Only the daily data is ever pulled: monthly, weekly and custom period bars are resampled
+        locally (see `resampling`), so wrapping a `CachedFinancialPuller` serves them all from the
+        cached daily data, without the second download of the wrapped puller's monthly bars.
+
+        The first and last period bars only cover the days between `start` and `end`.
+
+        Args:
+            puller (FinancialPuller): Puller used to fetch the daily data.
+    """
+
+    def __init__(self, puller: FinancialPuller):
+        self.puller = puller
+
+    def get_daily_for_tickers(self,
+                              tickers: List[str],
+                              start: Optional[utils.types.DateType] = None,
+                              end: Optional[utils.types.DateType] = None) -> Dict[str, DataFrame]:
+        """ Gets historical data from the corresponding tickers, from the wrapped puller
+
+            Args:
+                tickers (List[str]): List of tickers for the companies to retrieve historical data
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+
+            Returns
+                Dictionary of dataframes for the corresponding Tickers with the following index and columns
+                index: 'date'
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        return self.puller.get_daily_for_tickers(tickers, start, end)
+
+    def get_monthly_for_tickers(self,
+                                tickers: List[str],
+                                start: Optional[utils.types.DateType] = None,
+                                end: Optional[utils.types.DateType] = None) -> Dict[str, DataFrame]:
+        """ Gets monthly historical data from the corresponding tickers, resampled from the daily bars
+
+            Args:
+                tickers (List[str]): List of tickers for the companies to retrieve historical data
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+
+            Returns
+                Dictionary of dataframes for the corresponding Tickers with the following index and columns
+                index: 'date' (first day of the month)
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        return self.get_for_tickers(tickers, 'month', start, end)
+
+    def get_for_tickers(self,
+                        tickers: List[str],
+                        period: str,
+                        start: Optional[utils.types.DateType] = None,
+                        end: Optional[utils.types.DateType] = None) -> Dict[str, DataFrame]:
+        """ Gets historical data from the corresponding tickers for any period, resampled from the daily bars
+
+            Args:
+                tickers (List[str]): List of tickers for the companies to retrieve historical data
+                period (str): 'day', 'week', 'month', 'quarter', 'year' or a pandas offset alias, e.g. '2W-MON'
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+
+            Returns
+                Dictionary of dataframes for the corresponding Tickers with the following index and columns
+                index: 'date' (first day of the period)
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        daily = self.get_daily_for_tickers(tickers, start, end)
+        if period == 'day':
+            return daily
+
+        return resampling.resample_for_tickers(daily, period)
@@ -0,0 +1,214 @@
+# coding: utf-8
+""" Resampling of daily OHLCV bars into weekly, monthly or custom period bars.
+
+    Bars are aggregated with the usual OHLCV rules (first open, highest high, lowest low, last close
+    and adjusted close, summed volume). Every period is closed on the left and labelled with its
+    start, like the monthly bars of `FinancialPuller.get_monthly_for_tickers`. The universe is
+    resampled as (dates x tickers) panels, one vectorized pass per column whatever the number of tickers.
+"""
+from __future__ import annotations
+
+import typing
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from ...indicators import panel
+
+
+Panel = typing.Dict[str, DataFrame]
+
+PERIODS: typing.Dict[str, str] = {
+    'week': 'W-MON',
+    'month': 'MS',
+    'quarter': 'QS',
+    'year': 'YS',
+}
+
+AGGREGATIONS: typing.Dict[str, str] = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'adj_close': 'last',
+    'volume': 'sum',
+}
+
+
+def _rule(period: str) -> str:
+    """ Pandas offset alias of a period name ('week', 'month', 'quarter', 'year') or of a custom alias, e.g. '2W-MON'. """
+    return PERIODS.get(period, period)
+
+
+def _aggregate(frame: typing.Union[DataFrame, Series], column: str, period: str) -> typing.Union[DataFrame, Series]:
+    """ Aggregates the bars of each period with the rule of the column, empty periods being NaN (even for volume). """
+    resampler = frame.resample(_rule(period), label='left', closed='left')
+    aggregation = AGGREGATIONS[column]
+
+    if aggregation == 'sum':
+        return resampler.sum(min_count=1)
+    return getattr(resampler, aggregation)()
+
+
+def _with_dtypes(frame: DataFrame, dtypes: Series) -> DataFrame:
+    """ Casts the columns of `frame` back to their integer `dtypes` (e.g. the daily volume's) when they hold no NaN. """
+    integer = {column: dtype for column, dtype in dtypes.items()
+               if column in frame.columns and dtype.kind in 'iu' and frame[column].dtype != dtype}
+    integer = {column: dtype for column, dtype in integer.items() if frame[column].notna().all()}
+
+    return frame.astype(integer) if integer else frame
+
+
+def _overlay(new: DataFrame, old: DataFrame) -> DataFrame:
+    """ Same as `new.combine_first(old)`, in one vectorized pass rather than one per column. """
+    index = old.index.union(new.index)
+    columns = old.columns.union(new.columns, sort=False)
+
+    new_values = new.reindex(index=index, columns=columns).to_numpy(dtype=np.float64)
+    old_values = old.reindex(index=index, columns=columns).to_numpy(dtype=np.float64)
+
+    overlaid = DataFrame(np.where(np.isnan(new_values), old_values, new_values), index=index, columns=columns)
+    return _with_dtypes(overlaid, new.dtypes)
+
+
+def resample_panel(panels: Panel, period: str = 'month') -> Panel:
+    """ Resamples daily panels into period bars for every ticker at once.
+
+        Args:
+            panels (Panel): Dates x tickers dataframe by column, e.g. from `indicators.panel.to_panel`.
+                Columns among ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+            period (str): 'week', 'month', 'quarter', 'year' or a pandas offset alias. Default is 'month'.
+
+        Returns:
+            (Panel) Period x tickers dataframe by column, labelled with the start of each period.
+                Periods without any bar are dropped, tickers without a bar in a period are NaN.
+    """
+    resampled = {
+        column: _aggregate(frame, column, period).rename_axis('date')
+        for column, frame in panels.items() if column in AGGREGATIONS
+    }
+    if not resampled:
+        return resampled
+
+    has_bars = pd.concat([frame.notna().any(axis=1) for frame in resampled.values()], axis=1).any(axis=1)
+    return {column: frame.loc[has_bars] for column, frame in resampled.items()}
+
+
+def resample(df: DataFrame, period: str = 'month') -> DataFrame:
+    """ Resamples one ticker's daily bars into period bars.
+
+        Args:
+            df (DataFrame): Columns - ['open', 'high', 'low', 'close', 'adj_close', 'volume'] (any subset)
+            period (str): 'week', 'month', 'quarter', 'year' or a pandas offset alias. Default is 'month'.
+
+        Returns:
+            (DataFrame) Bars labelled with the start of each period, with the columns of `df`.
+    """
+    resampled = DataFrame({column: _aggregate(df[column], column, period) for column in df.columns if column in AGGREGATIONS})
+    return resampled.dropna(how='all').rename_axis('date')
+
+
+def resample_for_tickers(data: typing.Dict[str, DataFrame], period: str = 'month') -> typing.Dict[str, DataFrame]:
+    """ Resamples the daily dataframes of many tickers, vectorized across tickers.
+
+        Args:
+            data (Dict[str, DataFrame]): Dataframes by ticker, e.g. from `FinancialPuller.get_daily_for_tickers`.
+                Columns - ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+            period (str): 'week', 'month', 'quarter', 'year' or a pandas offset alias. Default is 'month'.
+
+        Returns:
+            (Dict[str, DataFrame]) Period bars by ticker, with the column dtypes of `resample`.
+    """
+    bars = panel.from_panel(resample_panel(panel.to_panel(data), period))
+    return {ticker: _with_dtypes(frame, data[ticker].dtypes) for ticker, frame in bars.items()}
+
+
+class BarResampler:
+    """ Incremental resampler: keeps the period bars of a universe up to date as daily bars arrive.
+
+        Only the daily bars of the last (still open) period are kept, so each update costs the new
+        bars plus at most one period, and replaces the last period bar with its updated version.
+
+        Args:
+            period (str): 'week', 'month', 'quarter', 'year' or a pandas offset alias. Default is 'month'.
+
+        Attributes:
+            panels (Panel): Period x tickers bars by column, the last period possibly incomplete.
+    """
+
+    def __init__(self, period: str = 'month'):
+        self.period = period
+        self.panels: Panel = {}
+        self._open_period: Panel = {}
+        self._open_start: typing.Optional[pd.Timestamp] = None
+        self._dtypes: typing.Dict[str, Series] = {}
+
+    def update_panel(self, panels: Panel) -> Panel:
+        """ Adds daily bars given as panels.
+
+            Args:
+                panels (Panel): Dates x tickers daily bars by column. They may start inside the open period
+                    (bars for dates already seen replace the previous values) but not before it.
+
+            Returns:
+                (Panel) The period bars that were added or changed.
+        """
+        panels = {column: frame for column, frame in panels.items() if column in AGGREGATIONS}
+        if not panels or not len(next(iter(panels.values()))):
+            return {}
+
+        daily = panels
+        if self._open_start is not None:
+            if next(iter(panels.values())).index[0] < self._open_start:
+                raise ValueError(f'Bars before the open period starting {self._open_start} cannot be added')
+
+            daily = {column: _overlay(frame, self._open_period[column]) if column in self._open_period else frame
+                     for column, frame in panels.items()}
+
+        changed = resample_panel(daily, self.period)
+        if not changed or not len(next(iter(changed.values()))):
+            return {}
+
+        # The open period is kept as floats, so the bars get the dtypes of the new daily bars back
+        changed = {column: _with_dtypes(frame, panels[column].dtypes) for column, frame in changed.items()}
+
+        # The open period keeps a (NaN) row at its start, so that multiples of calendar periods such
+        # as '2W-MON' stay anchored on it rather than on the first bar of the next update
+        self._open_start = next(iter(changed.values())).index[-1]
+        self._open_period = {}
+        for column, frame in daily.items():
+            frame = frame.loc[frame.index >= self._open_start]
+            self._open_period[column] = frame.reindex(frame.index.union([self._open_start]))
+
+        for column, frame in changed.items():
+            previous = self.panels.get(column)
+            if previous is None:
+                self.panels[column] = frame
+            else:
+                kept = previous.loc[previous.index < frame.index[0]]
+                self.panels[column] = pd.concat([kept, frame]).rename_axis('date')
+
+        return changed
+
+    def update(self, data: typing.Dict[str, DataFrame]) -> typing.Dict[str, DataFrame]:
+        """ Adds daily bars given as per-ticker dataframes, e.g. from `FinancialPuller.get_daily_for_tickers`.
+
+            Args:
+                data (Dict[str, DataFrame]): Daily dataframes by ticker.
+
+            Returns:
+                (Dict[str, DataFrame]) The period bars that were added or changed, by ticker.
+        """
+        self._dtypes.update((ticker, df.dtypes) for ticker, df in data.items())
+        return self._by_ticker(self.update_panel(panel.to_panel(data)))
+
+    def bars(self) -> typing.Dict[str, DataFrame]:
+        """ Period bars so far, by ticker. """
+        return self._by_ticker(self.panels)
+
+    def _by_ticker(self, panels: Panel) -> typing.Dict[str, DataFrame]:
+        """ Per-ticker bars of panels, with the column dtypes of the ticker's daily bars like `resample_for_tickers`. """
+        bars = panel.from_panel(panels)
+        return {ticker: _with_dtypes(frame, self._dtypes[ticker]) if ticker in self._dtypes else frame
+                for ticker, frame in bars.items()}
@@ -0,0 +1,327 @@
+# coding: utf-8
+import datetime as dt
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import zlib
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from .financial_puller import FinancialPuller
+from . import resampling
+from ... import utils
+
+
+# Bars are indexed by business day from a fixed origin (a Monday), and generated in blocks of `_BLOCK_BARS`
+_ORIGIN = np.datetime64('2000-01-03', 'D')
+_BLOCK_BARS = 256
+
+
+def _block_key(block: int) -> int:
+    """ Non-negative seed key of a block, the blocks before the origin having negative indices. """
+    return 2 * block if block >= 0 else -2 * block - 1
+
+
+class SyntheticFinancialPuller(FinancialPuller):
+    """ Financial puller generating seeded synthetic market data, for offline tests and benchmarks.
+
+        Daily log returns follow a one factor model: every ticker loads on a shared market shock with
+        the given pairwise `correlation`, plus its own shock and optional compound Poisson jumps, on
+        top of a geometric Brownian motion drift. Each bar opens with an overnight gap from the
+        previous close, and its high and low extend past the open and close by a random fraction of
+        the daily volatility, so low <= open, close <= high always holds. Volume is lognormal and
+        rises with the size of the move. There are no corporate actions, so 'adj_close' equals 'close'.
+
+        The bars are indexed by business day from a fixed origin (2000-01-03), forwards and backwards,
+        and generated in blocks of 256 bars, each with its own random streams seeded from `seed`, the
+        ticker symbol and the block. The sum of the shocks of every block is drawn first, so the price
+        level at the start of a block is known without generating the bars in between, and the bars of
+        the block are then drawn conditionally on that sum. A bar therefore only depends on the seed,
+        the ticker and its date: not on the requested window, the other tickers or the chunk size (up
+        to floating point rounding). The market streams are seeded from `seed` alone.
+
+        Args:
+            seed (int): Seed of the random streams. Default is 0.
+            drift (float): Annual expected return. Default is 0.07.
+            volatility (float): Annual volatility of the diffusion part. Default is 0.25.
+            correlation (float): Pairwise correlation of the diffusion shocks, in [0, 1]. Default is 0.3.
+            jump_intensity (float): Expected number of jumps per year. Default is 0 (no jumps).
+            jump_mean (float): Mean log size of a jump. Default is -0.03.
+            jump_volatility (float): Standard deviation of the log size of a jump. Default is 0.05.
+            initial_price (float): Median price of the tickers at the origin, 2000-01-03. Default is 100.
+            chunk_size (int): Number of bars generated at a time. Default is 252.
+    """
+
+    def __init__(self,
+                 seed: int = 0,
+                 drift: float = 0.07,
+                 volatility: float = 0.25,
+                 correlation: float = 0.3,
+                 jump_intensity: float = 0.0,
+                 jump_mean: float = -0.03,
+                 jump_volatility: float = 0.05,
+                 initial_price: float = 100.0,
+                 chunk_size: int = 252):
+        if not 0 <= correlation <= 1:
+            raise ValueError(f'Invalid correlation: {correlation}')
+        if volatility < 0 or jump_intensity < 0 or jump_volatility < 0:
+            raise ValueError('Volatilities and the jump intensity must be non-negative')
+        if initial_price <= 0:
+            raise ValueError(f'Invalid initial_price: {initial_price}')
+        if chunk_size < 1:
+            raise ValueError(f'Invalid chunk_size: {chunk_size}')
+
+        self.seed = seed
+        self.drift = drift
+        self.volatility = volatility
+        self.correlation = correlation
+        self.jump_intensity = jump_intensity
+        self.jump_mean = jump_mean
+        self.jump_volatility = jump_volatility
+        self.initial_price = initial_price
+        self.chunk_size = chunk_size
+
+    def _daily_parameters(self) -> Tuple[float, float, float]:
+        """ Time step, volatility and drift of the log returns of one bar. """
+        step = 1 / utils.finance.TRADING_DAYS_PER_YEAR
+        return step, self.volatility * np.sqrt(step), (self.drift - 0.5 * self.volatility**2) * step
+
+    def _block_totals(self, keys: List[int], first_block: int, last_block: int) -> Dict[str, np.ndarray]:
+        """ Shock sums, jumps and starting log price of the blocks from `first_block` to `last_block`.
+
+            The values cover the blocks from the origin to the requested ones, as (blocks x tickers) arrays
+            with the first row at `offset` blocks from the origin. Each stream draws one value per block,
+            moving away from the origin, so the values of a block do not depend on the blocks requested.
+        """
+        step, daily_volatility, daily_drift = self._daily_parameters()
+        tickers = len(keys)
+        lowest, highest = min(first_block, 0), max(last_block, -1)
+        before, after = -lowest, highest + 1
+
+        def draw(sample: Callable[[np.random.Generator, int], np.ndarray], *key: int) -> np.ndarray:
+            forward = sample(np.random.default_rng([self.seed, *key, 0]), after)
+            backward = sample(np.random.default_rng([self.seed, *key, 1]), before)
+            return np.concatenate([backward[::-1], forward])
+
+        def normals(stream: np.random.Generator, size: int) -> np.ndarray:
+            return stream.standard_normal(size)
+
+        def poisson(stream: np.random.Generator, size: int) -> np.ndarray:
+            return stream.poisson(self.jump_intensity * step * _BLOCK_BARS, size)
+
+        market = draw(normals, 0) * np.sqrt(_BLOCK_BARS)
+        own = np.empty((before + after, tickers))
+        counts = np.zeros((before + after, tickers))
+        jump_totals = np.zeros((before + after, tickers))
+        initial_price = np.empty(tickers)
+        base_volume = np.empty(tickers)
+
+        for column, key in enumerate(keys):
+            ticker_stream = np.random.default_rng([self.seed, 2, key])
+            initial_price[column] = self.initial_price * np.exp(0.5 * ticker_stream.standard_normal())
+            base_volume[column] = np.exp(ticker_stream.normal(13, 1))
+
+            own[:, column] = draw(normals, 1, key) * np.sqrt(_BLOCK_BARS)
+            if self.jump_intensity:
+                counts[:, column] = draw(poisson, 3, key)
+                jump_noise = draw(normals, 4, key)
+                jump_totals[:, column] = counts[:, column] * self.jump_mean + np.sqrt(counts[:, column]) * self.jump_volatility * jump_noise
+
+        block_returns = (_BLOCK_BARS * daily_drift
+                         + daily_volatility * (np.sqrt(self.correlation) * market[:, None] + np.sqrt(1 - self.correlation) * own)
+                         + jump_totals)
+        cumulative = np.vstack([np.zeros((1, tickers)), np.cumsum(block_returns, axis=0)])
+        levels = np.log(initial_price) + cumulative[:-1] - cumulative[before]
+
+        return {
+            'offset': lowest,
+            'market': market,
+            'own': own,
+            'counts': counts,
+            'jump_totals': jump_totals,
+            'levels': levels,
+            'base_volume': base_volume,
+        }
+
+    def _generate_block(self, keys: List[int], block: int, totals: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """ Generates the bars of a block for every ticker, as (bars x tickers) arrays. """
+        step, daily_volatility, daily_drift = self._daily_parameters()
+
+        # Independent draws shifted to the block's sum: jointly, they are again independent standard normals
+        row = block - totals['offset']
+        market_noise = np.random.default_rng([self.seed, 6, _block_key(block)]).standard_normal(_BLOCK_BARS)
+        market_shocks = market_noise - market_noise.mean() + totals['market'][row] / _BLOCK_BARS
+
+        shocks = np.empty((6, _BLOCK_BARS, len(keys)))
+        jumps = np.zeros((_BLOCK_BARS, len(keys)))
+        for column, key in enumerate(keys):
+            stream = np.random.default_rng([self.seed, 5, key, _block_key(block)])
+            shocks[:, :, column] = stream.standard_normal((_BLOCK_BARS, 6)).T
+
+            count = int(totals['counts'][row, column])
+            if count:
+                # The block's jumps are spread over its bars, with their sizes conditioned on the block's total
+                bar_counts = stream.multinomial(count, np.full(_BLOCK_BARS, 1 / _BLOCK_BARS))
+                noise = np.sqrt(bar_counts) * self.jump_volatility * shocks[5, :, column]
+                noise += bar_counts / count * (totals['jump_totals'][row, column] - count * self.jump_mean - noise.sum())
+                jumps[:, column] = bar_counts * self.jump_mean + noise
+
+        own, gap, high_noise, low_noise, volume_noise, _ = shocks
+        own = own - own.mean(axis=0) + totals['own'][row] / _BLOCK_BARS
+
+        log_returns = (daily_drift
+                       + daily_volatility * (np.sqrt(self.correlation) * market_shocks[:, None] + np.sqrt(1 - self.correlation) * own)
+                       + jumps)
+
+        level = totals['levels'][row]
+        log_close = level + np.cumsum(log_returns, axis=0)
+        log_previous_close = np.vstack([level[None, :], log_close[:-1]])
+        log_open = log_previous_close + 0.3 * log_returns + 0.2 * daily_volatility * gap
+
+        close = np.exp(log_close)
+        open_ = np.exp(log_open)
+        high = np.maximum(open_, close) * np.exp(0.5 * daily_volatility * np.abs(high_noise))
+        low = np.minimum(open_, close) * np.exp(-0.5 * daily_volatility * np.abs(low_noise))
+
+        surprise = np.abs(log_returns - daily_drift) / max(daily_volatility, 1e-12)
+        volume = np.round(totals['base_volume'] * np.exp(0.3 * volume_noise + 0.25 * np.minimum(surprise, 10))).astype(np.int64)
+
+        return {'open': open_, 'high': high, 'low': low, 'close': close, 'adj_close': close, 'volume': volume}
+
+    @staticmethod
+    def _split_panels(tickers: List[str], panels: Dict[str, DataFrame]) -> Dict[str, DataFrame]:
+        """ Splits NaN free (dates x tickers) panels into per-ticker dataframes sharing the panels' memory. """
+        dates = panels['close'].index
+        fields = {name: panel.to_numpy() for name, panel in panels.items()}
+
+        return {
+            ticker: DataFrame({name: values[:, column] for name, values in fields.items()}, index=dates, copy=False)
+            for column, ticker in enumerate(tickers)
+        }
+
+    def iter_daily_panels(self,
+                          tickers: List[str],
+                          start: Optional[utils.types.DateType] = None,
+                          end: Optional[utils.types.DateType] = None,
+                          chunk_size: Optional[int] = None) -> Iterator[Dict[str, DataFrame]]:
+        """ Generates the daily data lazily as (dates x tickers) panels, one chunk of business days at a time.
+
+            This is the cheapest form to stream very large universes through the `indicators.panel`
+            functions, as no per-ticker dataframe is built. Only one chunk is held in memory.
+
+            Args:
+                tickers (List[str]): List of tickers to generate data for
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+                chunk_size (Optional[int]): Number of bars per chunk. Default is the puller's `chunk_size`.
+
+            Yields:
+                Dictionary of dates x tickers dataframes by column, covering consecutive date ranges,
+                for the columns ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        start = start or dt.datetime.today() - dt.timedelta(3650)
+        end = end or dt.datetime.today()
+        chunk_size = chunk_size or self.chunk_size
+        dates = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), name='date')
+        columns = pd.Index(tickers, name='ticker')
+        if not len(dates):
+            return
+
+        # Negative before the origin, where `busday_count` counts backwards
+        first_bar = int(np.busday_count(_ORIGIN, dates[0].to_datetime64().astype('datetime64[D]')))
+        keys = [zlib.crc32(ticker.encode()) for ticker in tickers]
+        totals = self._block_totals(keys, first_bar // _BLOCK_BARS, (first_bar + len(dates) - 1) // _BLOCK_BARS)
+        block: Optional[int] = None
+        block_fields: Dict[str, np.ndarray] = {}
+
+        for offset in range(0, len(dates), chunk_size):
+            chunk_dates = dates[offset:offset + chunk_size]
+            low_bar = first_bar + offset
+            high_bar = low_bar + len(chunk_dates)
+
+            parts = []
+            for chunk_block in range(low_bar // _BLOCK_BARS, (high_bar - 1) // _BLOCK_BARS + 1):
+                if chunk_block != block:
+                    block, block_fields = chunk_block, self._generate_block(keys, chunk_block, totals)
+                block_start = block * _BLOCK_BARS
+                rows = slice(max(low_bar, block_start) - block_start, min(high_bar, block_start + _BLOCK_BARS) - block_start)
+                parts.append({name: values[rows] for name, values in block_fields.items()})
+            fields = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+            yield {name: DataFrame(values, index=chunk_dates, columns=columns, copy=False) for name, values in fields.items()}
+
+    def iter_daily_for_tickers(self,
+                               tickers: List[str],
+                               start: Optional[utils.types.DateType] = None,
+                               end: Optional[utils.types.DateType] = None,
+                               chunk_size: Optional[int] = None) -> Iterator[Dict[str, DataFrame]]:
+        """ Generates the daily data lazily, one chunk of consecutive business days at a time.
+
+            Only one chunk is held in memory, so histories far larger than memory can be streamed
+            through the rest of the library.
+
+            Args:
+                tickers (List[str]): List of tickers to generate data for
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+                chunk_size (Optional[int]): Number of bars per chunk. Default is the puller's `chunk_size`.
+
+            Yields:
+                Dictionary of dataframes for the corresponding Tickers, covering consecutive date ranges,
+                with the following index and columns
+                index: 'date'
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        for panels in self.iter_daily_panels(tickers, start, end, chunk_size):
+            yield self._split_panels(tickers, panels)
+
+    def get_daily_for_tickers(self,
+                              tickers: List[str],
+                              start: Optional[utils.types.DateType] = None,
+                              end: Optional[utils.types.DateType] = None) -> Dict[str, DataFrame]:
+        """ Gets historical data from the corresponding tickers
+
+            Args:
+                tickers (List[str]): List of tickers for the companies to retrieve historical data
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+
+            Returns
+                Dictionary of dataframes for the corresponding Tickers with the following index and columns
+                index: 'date'
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        chunks = list(self.iter_daily_for_tickers(tickers, start, end))
+        if not chunks:
+            return {ticker: DataFrame(columns=self.DAILY_COLUMNS, index=pd.DatetimeIndex([], name='date')) for ticker in tickers}
+
+        return {ticker: pd.concat([chunk[ticker] for chunk in chunks]) for ticker in tickers}
+
+    def get_monthly_for_tickers(self,
+                                tickers: List[str],
+                                start: Optional[utils.types.DateType] = None,
+                                end: Optional[utils.types.DateType] = None) -> Dict[str, DataFrame]:
+        """ Gets monthly historical data from the corresponding tickers, aggregated from the daily bars
+
+            Each chunk is aggregated as it is generated, so the daily history is never held in full.
+
+            Args:
+                tickers (List[str]): List of tickers for the companies to retrieve historical data
+                start (Optional[DateType]): Start date (inclusive) for the historical data
+                end (Optional[DateType]): End date (inclusive) for the historical data
+
+            Returns
+                Dictionary of dataframes for the corresponding Tickers with the following index and columns
+                index: 'date' (first day of the month)
+                columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+        """
+        resampler = resampling.BarResampler('month')
+        for panels in self.iter_daily_panels(tickers, start, end):
+            resampler.update_panel(panels)
+
+        if not resampler.panels:
+            return {ticker: DataFrame(columns=self.DAILY_COLUMNS, index=pd.DatetimeIndex([], name='date')) for ticker in tickers}
+
+        # Every ticker has a bar on every business day, so no month has NaN bars and the volume stays integral
+        panels = dict(resampler.panels, volume=resampler.panels['volume'].astype(np.int64))
+        return self._split_panels(tickers, panels)
@@ -1,15 +1,100 @@
 # coding: utf-8
+from concurrent.futures import ThreadPoolExecutor
 import datetime as dt
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Callable, Dict, List, Optional
 
 from pandas import DataFrame
-import yfinance as yf
 
-from .financial_puller  import FinancialPuller
+from .financial_puller  import DownloadError, FinancialPuller
 from ... import utils
 
 
+_HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def _yfinance_download() -> Callable[..., DataFrame]:
+    """ Downloader with the keyword signature of `yf.download`, built on `yf.Ticker(ticker).history`.
+
+        `yf.download` resets module level state of yfinance on every call, so concurrent calls from
+        the worker threads could clobber each other's results. `Ticker.history` keeps its state on
+        the `Ticker` object, and the columns are laid out as `yf.download` lays them out for one ticker.
+    """
+    import yfinance as yf
+
+    def download(tickers: str, interval: str, start: utils.types.DateType, end: utils.types.DateType) -> DataFrame:
+        dataframe = yf.Ticker(tickers).history(interval=interval, start=start, end=end, auto_adjust=False, raise_errors=True)
+        if dataframe.empty:
+            return dataframe
+
+        if dataframe.index.tz is not None:
+            dataframe.index = dataframe.index.tz_localize(None)
+        return dataframe[_HISTORY_COLUMNS]
+
+    return download
+
+
+class _RateLimiter:
+    """ Thread safe limiter spacing calls at least `1 / requests_per_second` seconds apart. """
+
+    def __init__(self, requests_per_second: Optional[float] = None):
+        self.interval = 1 / requests_per_second if requests_per_second else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            call_time = max(now, self._next_time)
+            self._next_time = call_time + self.interval
+
+        if call_time > now:
+            time.sleep(call_time - now)
+
+
 class YFinanceFinancialPuller(FinancialPuller):
+    """ Financial puller backed by Yahoo Finance.
+
+        Each ticker is downloaded on its own; with `max_workers > 1` the downloads run concurrently
+        on a thread pool, since the time is spent waiting on the network. A download that returns an
+        empty frame, or a frame that cannot be cleaned, counts as failed and is retried.
+
+        Args:
+            max_workers (int): Number of concurrent downloads. Default is 1 (sequential).
+            requests_per_second (Optional[float]): Maximum download rate across all workers. Default is unlimited.
+            retries (int): Number of retries for a failed download. Default is 0.
+            backoff (float): Seconds to wait before the first retry, doubled on each following retry. Default is 1.
+            raise_on_failure (bool): Raise a `DownloadError` (holding the successful frames) when any ticker
+                fails. If False, the failed tickers are left out of the result. Default is True.
+            downloader (Optional[Callable[..., DataFrame]]): Function with the keyword signature of `yf.download`
+                returning one ticker's frame, e.g. a local stub for tests. Default is a thread safe downloader built
+                on `yf.Ticker(ticker).history`, with yfinance imported on first use.
+
+        Attributes:
+            failures (Dict[str, Exception]): Errors of the tickers that failed in the last pull.
+    """
+
+    def __init__(self,
+                 max_workers: int = 1,
+                 requests_per_second: Optional[float] = None,
+                 retries: int = 0,
+                 backoff: float = 1.0,
+                 raise_on_failure: bool = True,
+                 downloader: Optional[Callable[..., DataFrame]] = None):
+        if max_workers < 1:
+            raise ValueError(f'Invalid max_workers: {max_workers}')
+
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.raise_on_failure = raise_on_failure
+        self.downloader = downloader or _yfinance_download()
+        self.failures: Dict[str, Exception] = {}
+        self._rate_limiter = _RateLimiter(requests_per_second)
 
     def _clean_daily_dataframe(self, dataframe: DataFrame) -> DataFrame:
         """ Cleans the dataframe to ensure that the index is the date and the columns are the following:
@@ -18,7 +103,7 @@ class YFinanceFinancialPuller(FinancialPuller):
 
             Args:
                 dataframe (DataFrame): Dataframe to clean
-            
+
             Returns:
                 Cleaned dataframe
         """
@@ -28,6 +113,63 @@ class YFinanceFinancialPuller(FinancialPuller):
 
         return dataframe
 
+    def _download(self, ticker: str, interval: str, start: utils.types.DateType, end: utils.types.DateType) -> DataFrame:
+        """ Downloads and cleans the data of one ticker, retrying with exponential backoff.
+
+            Args:
+                ticker (str): Ticker to download
+                interval (str): Interval of the bars, e.g. '1d' or '1mo'
+                start (DateType): Start date (inclusive) for the historical data
+                end (DateType): End date (inclusive) for the historical data
+
+            Returns:
+                Cleaned dataframe
+        """
+        for attempt in range(self.retries + 1):
+            self._rate_limiter.wait()
+            try:
+                dataframe = self.downloader(tickers=ticker, interval=interval, start=start, end=end)
+                # Yahoo Finance usually reports a failed download with an empty frame rather than an error
+                if dataframe is None or dataframe.empty:
+                    raise ValueError(f'No data downloaded for {ticker}')
+                return self._clean_daily_dataframe(dataframe)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2**attempt)
+
+    def _download_for_tickers(self,
+                              tickers: List[str],
+                              interval: str,
+                              start: Optional[utils.types.DateType],
+                              end: Optional[utils.types.DateType]) -> Dict[str, DataFrame]:
+        """ Downloads every ticker, concurrently if `max_workers > 1`, and records the failures. """
+        start = start or dt.datetime.today() - dt.timedelta(3650)
+        end = end or dt.datetime.today()
+        data = {}
+        failures = {}
+
+        def download(ticker: str) -> None:
+            try:
+                data[ticker] = self._download(ticker, interval, start, end)
+            except Exception as error:
+                failures[ticker] = error
+
+        if self.max_workers == 1:
+            for ticker in tickers:
+                download(ticker)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(download, tickers))
+
+        data = {ticker: data[ticker] for ticker in tickers if ticker in data}
+        self.failures = {ticker: failures[ticker] for ticker in tickers if ticker in failures}
+
+        if self.failures and self.raise_on_failure:
+            raise DownloadError(data, self.failures)
+
+        return data
+
     def get_daily_for_tickers(self,
                               tickers: List[str],
                               start: Optional[utils.types.DateType] = None,
@@ -44,15 +186,7 @@ class YFinanceFinancialPuller(FinancialPuller):
                 index: 'date'
                 columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
         """
-        start = start or dt.datetime.today() - dt.timedelta(3650)
-        end = end or dt.datetime.today()
-        data = {}
-
-        for ticker in tickers:
-            dataframe: DataFrame = yf.download(tickers=ticker, interval='1d', start=start, end=end)
-            data[ticker] = self._clean_daily_dataframe(dataframe)
-
-        return data
+        return self._download_for_tickers(tickers, '1d', start, end)
 
     def get_monthly_for_tickers(self,
                                 tickers: List[str],
@@ -64,18 +198,10 @@ class YFinanceFinancialPuller(FinancialPuller):
                 tickers (List[str]): List of tickers for the companies to retrieve historical data
                 start (Optional[DateType]): Start date (inclusive) for the historical data
                 end (Optional[DateType]): End date (inclusive) for the historical data
-            
+
             Returns
                 Dictionary of dataframes for the corresponding Tickers with the following index and columns
                 index: 'date'
                 columns: ['open', 'high', 'low', 'close', 'adj_close', 'volume']
         """
-        start = start or dt.datetime.today() - dt.timedelta(3650)
-        end = end or dt.datetime.today()
-        data = {}
-
-        for ticker in tickers:
-            dataframe = yf.download(tickers=ticker, interval='1mo', start=start, end=end)
-            data[ticker] = self._clean_daily_dataframe(dataframe)
-
-        return data
+        return self._download_for_tickers(tickers, '1mo', start, end)
@@ -0,0 +1,14 @@
+# coding: utf-8
+import typing
+
+from .. import _lazy
+
+if typing.TYPE_CHECKING:
+    from . import price_store
+
+
+__all__ = [
+    'price_store',
+]
+
+__getattr__, __dir__ = _lazy.submodules(__name__, __all__)
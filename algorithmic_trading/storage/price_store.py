@@ -0,0 +1,208 @@
+# coding: utf-8
+""" Memory-mapped columnar price store.
+
+    A store is a directory holding one `<field>.npy` float64 array per price field, all of shape
+    (dates x tickers) and stored column-major so each ticker's history is contiguous on disk, plus
+    the shared sorted date index (`dates.npy`) and the ticker to column map (`tickers.json`).
+    Opening a store only maps the files; pages are read from disk when they are touched.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import typing
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from ..pullers.finance.financial_puller import FinancialPuller
+from ..utils import types
+
+
+_DATES_FILE = 'dates.npy'
+_TICKERS_FILE = 'tickers.json'
+
+
+class PriceStore:
+    """ Read access to a memory-mapped price store written with `PriceStore.write`.
+
+        Date range slices, single tickers and runs of adjacent tickers are returned as NumPy views
+        of the mapped files (no copy). Any other ticker subset has to be gathered into a new array.
+
+        Attributes:
+            path (Path): Directory of the store.
+            dates (pd.DatetimeIndex): Shared sorted date index.
+            tickers (List[str]): Tickers, in column order.
+            columns (Dict[str, int]): Column of each ticker.
+            fields (List[str]): Price fields in the store.
+    """
+
+    def __init__(self, path: typing.Union[str, Path]):
+        self.path = Path(path)
+
+        dates = np.load(self.path / _DATES_FILE)
+        self.dates = pd.DatetimeIndex(dates.astype('datetime64[ns]'), name='date')
+
+        with open(self.path / _TICKERS_FILE) as file:
+            metadata = json.load(file)
+
+        self.tickers: typing.List[str] = metadata['tickers']
+        self.fields: typing.List[str] = metadata['fields']
+        self.columns = {ticker: column for column, ticker in enumerate(self.tickers)}
+        self._arrays = {field: np.load(self.path / f'{field}.npy', mmap_mode='r') for field in self.fields}
+
+    @classmethod
+    def write(cls,
+              path: typing.Union[str, Path],
+              data: typing.Dict[str, DataFrame],
+              fields: typing.Optional[typing.List[str]] = None) -> PriceStore:
+        """ Writes the per-ticker dataframes into a new store, replacing any existing one.
+
+            Args:
+                path (Union[str, Path]): Directory of the store.
+                data (Dict[str, DataFrame]): Dataframes by ticker, e.g. from `FinancialPuller.get_daily_for_tickers`.
+                    Columns - ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+                fields (Optional[List[str]]): Fields to store. Default is `FinancialPuller.DAILY_COLUMNS`.
+
+            Returns:
+                (PriceStore) The opened store.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        fields = fields or FinancialPuller.DAILY_COLUMNS
+        tickers = list(data)
+
+        dates = pd.DatetimeIndex([])
+        for dataframe in data.values():
+            dates = dates.union(pd.DatetimeIndex(dataframe.index))
+        dates = dates.sort_values()
+
+        positions = {ticker: dates.get_indexer(pd.DatetimeIndex(dataframe.index)) for ticker, dataframe in data.items()}
+
+        for field in fields:
+            array = np.lib.format.open_memmap(path / f'{field}.npy', mode='w+', dtype=np.float64,
+                                              shape=(len(dates), len(tickers)), fortran_order=True)
+            array[:] = np.nan
+            for column, ticker in enumerate(tickers):
+                array[positions[ticker], column] = data[ticker][field].to_numpy(dtype=np.float64)
+            array.flush()
+            del array
+
+        np.save(path / _DATES_FILE, dates.to_numpy(dtype='datetime64[ns]').view(np.int64))
+        with open(path / _TICKERS_FILE, 'w') as file:
+            json.dump({'tickers': tickers, 'fields': fields}, file)
+
+        return cls(path)
+
+    def _date_slice(self, start: typing.Optional[types.DateType], end: typing.Optional[types.DateType]) -> slice:
+        """ Positions of the dates in [start, end] as a slice of the date index. """
+        first = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side='left')
+        last = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side='right')
+        return slice(first, last)
+
+    def _ticker_index(self, tickers: typing.Optional[typing.List[str]]) -> typing.Union[slice, typing.List[int]]:
+        """ Columns of the tickers, as a slice whenever they are adjacent so the result stays a view. """
+        if tickers is None:
+            return slice(None)
+
+        columns = [self.columns[ticker] for ticker in tickers]
+        if columns and columns == list(range(columns[0], columns[0] + len(columns))):
+            return slice(columns[0], columns[0] + len(columns))
+
+        return columns
+
+    def array(self,
+              field: str,
+              start: typing.Optional[types.DateType] = None,
+              end: typing.Optional[types.DateType] = None,
+              tickers: typing.Optional[typing.List[str]] = None) -> np.ndarray:
+        """ Gets the (dates x tickers) block of one field.
+
+            Args:
+                field (str): Price field, e.g. 'adj_close'.
+                start (Optional[DateType]): Start date (inclusive). Default is the first date.
+                end (Optional[DateType]): End date (inclusive). Default is the last date.
+                tickers (Optional[List[str]]): Tickers to include. Default is every ticker.
+
+            Returns:
+                (np.ndarray) Read-only view of the mapped file, or a copy for non adjacent tickers.
+        """
+        return self._arrays[field][self._date_slice(start, end), self._ticker_index(tickers)]
+
+    def series(self,
+               ticker: str,
+               field: str,
+               start: typing.Optional[types.DateType] = None,
+               end: typing.Optional[types.DateType] = None) -> np.ndarray:
+        """ Gets the contiguous history of one field for one ticker.
+
+            Args:
+                ticker (str): Ticker symbol.
+                field (str): Price field, e.g. 'adj_close'.
+                start (Optional[DateType]): Start date (inclusive). Default is the first date.
+                end (Optional[DateType]): End date (inclusive). Default is the last date.
+
+            Returns:
+                (np.ndarray) Read-only view of the mapped file, NaN where the ticker has no bar.
+        """
+        return self._arrays[field][self._date_slice(start, end), self.columns[ticker]]
+
+    def panel(self,
+              field: str,
+              start: typing.Optional[types.DateType] = None,
+              end: typing.Optional[types.DateType] = None,
+              tickers: typing.Optional[typing.List[str]] = None) -> DataFrame:
+        """ Gets the (dates x tickers) dataframe of one field, as used by `indicators.panel`.
+
+            Args:
+                field (str): Price field, e.g. 'adj_close'.
+                start (Optional[DateType]): Start date (inclusive). Default is the first date.
+                end (Optional[DateType]): End date (inclusive). Default is the last date.
+                tickers (Optional[List[str]]): Tickers to include. Default is every ticker.
+
+            Returns:
+                (DataFrame) Index - 'date', Columns - tickers. Backed by the mapped file when possible.
+        """
+        dates = self.dates[self._date_slice(start, end)]
+        columns = self.tickers if tickers is None else tickers
+
+        return DataFrame(self.array(field, start, end, tickers), index=dates, columns=columns, copy=False)
+
+    def frame(self,
+              ticker: str,
+              start: typing.Optional[types.DateType] = None,
+              end: typing.Optional[types.DateType] = None,
+              fields: typing.Optional[typing.List[str]] = None) -> DataFrame:
+        """ Builds the dataframe of one ticker in the `FinancialPuller` layout.
+
+            Args:
+                ticker (str): Ticker symbol.
+                start (Optional[DateType]): Start date (inclusive). Default is the first date.
+                end (Optional[DateType]): End date (inclusive). Default is the last date.
+                fields (Optional[List[str]]): Fields to include. Default is every field in the store.
+
+            Returns:
+                (DataFrame) Index - 'date', Columns - fields, without the dates the ticker has no bar for.
+        """
+        fields = fields or self.fields
+        dates = self.dates[self._date_slice(start, end)]
+        dataframe = DataFrame({field: self.series(ticker, field, start, end) for field in fields}, index=dates)
+
+        return dataframe.dropna(axis=0, how='any')
+
+    def to_dict(self,
+                start: typing.Optional[types.DateType] = None,
+                end: typing.Optional[types.DateType] = None,
+                tickers: typing.Optional[typing.List[str]] = None) -> typing.Dict[str, DataFrame]:
+        """ Builds the dataframes by ticker, as returned by `FinancialPuller.get_daily_for_tickers`.
+
+            Args:
+                start (Optional[DateType]): Start date (inclusive). Default is the first date.
+                end (Optional[DateType]): End date (inclusive). Default is the last date.
+                tickers (Optional[List[str]]): Tickers to include. Default is every ticker.
+
+            Returns:
+                (Dict[str, DataFrame]) Dataframes by ticker.
+        """
+        return {ticker: self.frame(ticker, start, end) for ticker in (tickers or self.tickers)}
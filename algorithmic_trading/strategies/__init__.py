@@ -0,0 +1,16 @@
+# coding: utf-8
+import typing
+
+from .. import _lazy
+
+if typing.TYPE_CHECKING:
+    from . import portfolio_rebalance
+    from . import resistance_breakout
+
+
+__all__ = [
+    'portfolio_rebalance',
+    'resistance_breakout',
+]
+
+__getattr__, __dir__ = _lazy.submodules(__name__, __all__)
@@ -0,0 +1,205 @@
+# coding: utf-8
+""" Portfolio rebalance: a cross-sectional rotation through a universe of tickers.
+
+    The portfolio holds `m` equally weighted tickers. At the end of every period the `x` worst
+    performers of the period are dropped and replaced by the best performers among the tickers
+    not held, so the holdings only rotate where the ranking says so. With `x=None` the whole
+    portfolio is re-ranked instead, holding the top `m` of each period during the next one.
+
+    Everything runs on a (periods x tickers) return matrix: each rebalance is one `argpartition`
+    top-k / bottom-k selection over the universe (all periods at once when `x=None`), so thousands
+    of tickers over decades of monthly data take well under a second.
+
+        result = portfolio_rebalance.rebalance_for_tickers(puller, m=6, x=3)
+        result.summary()        # key_performance metrics of the strategy and of the equal weight universe
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import typing
+
+import numpy as np
+from pandas import DataFrame, Series
+
+from ..indicators import key_performance
+from ..indicators import panel
+from ..utils import finance
+from ..utils import types
+
+
+@dataclass
+class RebalanceResult:
+    """ Result of a portfolio rebalance run.
+
+        Attributes:
+            dates (pd.Index): Periods of the return matrix.
+            tickers (pd.Index): Tickers of the return matrix.
+            holdings (np.ndarray): (periods x tickers) booleans, the tickers held during each period.
+            turnover (np.ndarray): (periods,) fraction of the portfolio traded when entering each period.
+            returns (Series): Return of the portfolio in each period, after commissions, named 'return'.
+                NaN for the first period, during which nothing is held yet.
+            universe_returns (Series): Return of the equal weight universe in each period, named 'return'.
+    """
+    dates: typing.Any
+    tickers: typing.Any
+    holdings: np.ndarray
+    turnover: np.ndarray
+    returns: Series
+    universe_returns: Series
+
+    def holdings_frame(self) -> DataFrame:
+        """ Holdings as a (periods x tickers) dataframe of booleans. """
+        return DataFrame(self.holdings, index=self.dates, columns=self.tickers)
+
+    def summary(self, rf: float = 0.03, period: typing.Optional[str] = 'month') -> DataFrame:
+        """ Key performance indicators of the strategy and of the equal weight universe.
+
+            Args:
+                rf (float): Risk free rate used by the Sharpe and Sortino ratios. Default is 0.03.
+                period (Optional[str]): Period of the return matrix. Default is 'month'.
+
+            Returns:
+                (DataFrame) Index - ['portfolio', 'universe'], Columns - the `key_performance.performance_summary` metrics.
+        """
+        returns = {
+            'portfolio': self.returns.iloc[1:].to_frame(),
+            'universe': self.universe_returns.iloc[1:].to_frame(),
+        }
+        return key_performance.performance_summary(returns, rf=rf, period=period)
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """ Columns of the `k` highest scores of a row, ignoring -inf (so fewer if there are not enough). """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    columns = np.argpartition(-scores, k - 1)[:k]
+    return columns[scores[columns] > -np.inf]
+
+
+def _rotate(values: np.ndarray, m: int, x: int) -> np.ndarray:
+    """ Holdings when the `x` worst held tickers are swapped for the best tickers not held. """
+    periods, count = values.shape
+    holdings = np.zeros((periods, count), dtype=bool)
+    valid = ~np.isnan(values)
+
+    held = np.zeros(count, dtype=bool)
+    for row in range(periods - 1):
+        period_returns = values[row]
+
+        # Held tickers without a return (e.g. delisted) rank below every other one
+        worst_scores = np.where(held, -np.where(valid[row], period_returns, -np.inf), -np.inf)
+        held[_top(worst_scores, x)] = False
+
+        best_scores = np.where(~held & valid[row], period_returns, -np.inf)
+        held[_top(best_scores, m - np.count_nonzero(held))] = True
+
+        holdings[row + 1] = held
+
+    return holdings
+
+
+def _reselect(values: np.ndarray, m: int) -> np.ndarray:
+    """ Holdings when the top `m` tickers of each period are held during the next one. """
+    periods, count = values.shape
+    holdings = np.zeros((periods, count), dtype=bool)
+    if periods < 2 or not count:
+        return holdings
+
+    k = min(m, count)
+    scores = np.where(np.isnan(values[:-1]), -np.inf, values[:-1])
+    columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    selected = np.zeros((periods - 1, count), dtype=bool)
+    np.put_along_axis(selected, columns, True, axis=1)
+    holdings[1:] = selected & (scores > -np.inf)
+
+    return holdings
+
+
+def rebalance(returns: DataFrame, m: int = 6, x: typing.Optional[int] = 3, commission_rate: float = 0.0) -> RebalanceResult:
+    """ Runs the portfolio rebalance over a return matrix.
+
+        Args:
+            returns (DataFrame): (periods x tickers) returns, e.g. monthly returns from `returns_matrix`.
+                NaN where a ticker has no return (not listed yet or delisted).
+            m (int): Number of tickers held. Default is 6.
+            x (Optional[int]): Number of worst performers replaced at each rebalance. None re-ranks the
+                whole portfolio every period. Default is 3.
+            commission_rate (float): Commission as a fraction of the traded value. Default is 0.
+
+        Returns:
+            (RebalanceResult) Holdings, turnover and returns of the strategy.
+    """
+    if m < 1:
+        raise ValueError(f'Invalid m: {m}')
+    if x is not None and not 0 <= x <= m:
+        raise ValueError(f'Invalid x: {x}, must be between 0 and m')
+
+    values = returns.to_numpy(dtype=np.float64)
+    holdings = _reselect(values, m) if x is None else _rotate(values, m, x)
+
+    counts = holdings.sum(axis=1)
+    weights = np.divide(holdings, counts[:, None], out=np.zeros(holdings.shape), where=counts[:, None] > 0)
+    turnover = 0.5 * np.abs(np.diff(weights, axis=0, prepend=0)).sum(axis=1)
+
+    # A held ticker without a return in a period (e.g. delisted) is left out of that period's average
+    held_values = np.where(holdings, values, np.nan)
+    held_valid = np.count_nonzero(~np.isnan(held_values), axis=1)
+    gross = np.divide(np.nansum(held_values, axis=1), held_valid, out=np.zeros(len(values)), where=held_valid > 0)
+    net = gross - commission_rate * 2 * turnover
+    net[:1] = np.nan
+
+    universe_valid = np.count_nonzero(~np.isnan(values), axis=1)
+    universe = np.divide(np.nansum(values, axis=1), universe_valid, out=np.zeros(len(values)), where=universe_valid > 0)
+    universe[:1] = np.nan
+
+    return RebalanceResult(dates=returns.index,
+                           tickers=returns.columns,
+                           holdings=holdings,
+                           turnover=turnover,
+                           returns=Series(net, index=returns.index, name='return'),
+                           universe_returns=Series(universe, index=returns.index, name='return'))
+
+
+def returns_matrix(data: typing.Dict[str, DataFrame]) -> DataFrame:
+    """ (periods x tickers) returns of the adjusted close of each ticker's bars.
+
+        Args:
+            data (Dict[str, DataFrame]): Dataframes by ticker, e.g. from `FinancialPuller.get_monthly_for_tickers`.
+                Columns - ['adj_close']
+
+        Returns:
+            (DataFrame) Returns, NaN before a ticker's second bar and after its last one.
+    """
+    prices = panel.to_panel(data, ['adj_close'])['adj_close']
+    return prices.pct_change(fill_method=None)
+
+
+def rebalance_for_tickers(puller: typing.Any,
+                          tickers: typing.Optional[typing.List[types.TickerType]] = None,
+                          start: typing.Optional[types.DateType] = None,
+                          end: typing.Optional[types.DateType] = None,
+                          m: int = 6,
+                          x: typing.Optional[int] = 3,
+                          commission_rate: float = 0.0) -> RebalanceResult:
+    """ Pulls the monthly bars of the universe and runs the portfolio rebalance on them.
+
+        Args:
+            puller (FinancialPuller): Puller of the monthly bars, e.g. a `ResampledFinancialPuller` to derive
+                them from cached daily bars.
+            tickers (Optional[List[TickerType]]): Universe. Default is the Dow Jones Industrial Average tickers.
+            start (Optional[DateType]): Start date (inclusive) for the historical data
+            end (Optional[DateType]): End date (inclusive) for the historical data
+            m (int): Number of tickers held. Default is 6.
+            x (Optional[int]): Number of worst performers replaced each month. None re-ranks every month. Default is 3.
+            commission_rate (float): Commission as a fraction of the traded value. Default is 0.
+
+        Returns:
+            (RebalanceResult) Holdings, turnover and monthly returns of the strategy.
+    """
+    tickers = tickers or finance.get_dow_jones_tickers()
+    data = puller.get_monthly_for_tickers(tickers, start, end)
+
+    return rebalance(returns_matrix(data), m, x, commission_rate)
@@ -0,0 +1,317 @@
+# coding: utf-8
+""" Resistance breakout: trades the breakouts of a range confirmed by a volume surge.
+
+    A ticker goes long when its high reaches the highest high of the previous `n` bars (the
+    resistance) while its volume exceeds `volume_factor` times the largest volume of those bars,
+    and short on the symmetrical breakdown below the support. A position is closed by a trailing
+    ATR stop, which starts `atr_multiple` ATRs away from the previous close and only ever moves
+    in the trade's favour, or reversed by a breakout in the other direction.
+
+    All the prices are on the adjusted close basis: when the raw close is given, the highs and lows
+    are scaled by `adj_close / close`, so the breakouts, the stop hits, the stop levels and the fills
+    compare prices adjusted the same way across splits and dividends.
+
+    The range, volume and ATR statistics are computed for the whole (dates x tickers) panel at
+    once. The positions depend on the previous ones, so each ticker is then simulated in one
+    carry-state pass that jumps from event to event: the stop of an open trade is scanned with
+    NumPy over growing blocks of bars, so the cost grows with the number of trades rather than
+    with the number of bars, and intraday histories stay cheap.
+
+        result = resistance_breakout.resistance_breakout(puller.get_daily_for_tickers(tickers))
+        result.trades['AAPL']           # one row per trade
+        result.equity                   # equally weighted across the tickers
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import typing
+
+import numpy as np
+from pandas import DataFrame, Series
+
+from ..indicators import key_performance
+from ..indicators import panel
+
+
+_TRADE_COLUMNS = ['entry_date', 'exit_date', 'direction', 'entry_price', 'exit_price', 'return', 'exit_reason']
+
+_INITIAL_SCAN = 64
+
+
+@dataclass
+class BreakoutResult:
+    """ Result of a resistance breakout run.
+
+        Attributes:
+            entries (DataFrame): Dates x tickers breakout signals, 1 long, -1 short, 0 none.
+            positions (DataFrame): Dates x tickers position held during each bar, 1 long, -1 short, 0 flat.
+            stops (DataFrame): Dates x tickers trailing stop in force during each bar, NaN when flat.
+            returns (DataFrame): Dates x tickers return of each ticker's position during each bar.
+            trades (Dict[str, DataFrame]): Trades by ticker. Columns - [
+                'entry_date', 'exit_date', 'direction', 'entry_price', 'exit_price', 'return', 'exit_reason',
+            ] where the exit reason is 'stop', 'reversal' or 'open' (still open on the last bar).
+            equity (Series): Equity of the strategy with the capital split equally across the tickers.
+            starting_cash (float): Starting cash of the equity curve.
+    """
+    entries: DataFrame
+    positions: DataFrame
+    stops: DataFrame
+    returns: DataFrame
+    trades: typing.Dict[str, DataFrame]
+    equity: Series
+    starting_cash: float
+
+    def summary(self, rf: float = 0.03, period: typing.Optional[str] = None) -> DataFrame:
+        """ Key performance indicators of the strategy and of each ticker.
+
+            Args:
+                rf (float): Risk free rate used by the Sharpe and Sortino ratios. Default is 0.03.
+                period (Optional[str]): Period of the bars. Default is 'day'.
+
+            Returns:
+                (DataFrame) Index - ['strategy', *tickers], Columns - the `key_performance.performance_summary` metrics.
+        """
+        strategy_returns = self.equity.pct_change(fill_method=None).fillna(0).rename('return')
+        returns = {'strategy': strategy_returns.to_frame()}
+        returns.update({ticker: self.returns[ticker].rename('return').to_frame() for ticker in self.returns.columns})
+
+        return key_performance.performance_summary(returns, rf=rf, period=period)
+
+
+def signals(high: DataFrame,
+            low: DataFrame,
+            volume: DataFrame,
+            n: int = 20,
+            volume_factor: float = 1.5) -> DataFrame:
+    """ Breakout signals of a panel of tickers.
+
+        Args:
+            high (DataFrame): Dates x tickers high prices.
+            low (DataFrame): Dates x tickers low prices.
+            volume (DataFrame): Dates x tickers volumes.
+            n (int): Number of previous bars defining the range. Default is 20.
+            volume_factor (float): Volume surge needed, as a multiple of the range's largest volume. Default is 1.5.
+
+        Returns:
+            (DataFrame) Dates x tickers signals: 1 for a breakout above the range, -1 below it, 0 otherwise.
+                A bar breaking out both ways is a long signal.
+    """
+    resistance = high.rolling(n).max().shift(1)
+    support = low.rolling(n).min().shift(1)
+    surge = volume > volume_factor * volume.rolling(n).max().shift(1)
+
+    long_entry = ((high >= resistance) & surge).to_numpy()
+    short_entry = ((low <= support) & surge).to_numpy()
+
+    return DataFrame(np.where(long_entry, 1, np.where(short_entry, -1, 0)).astype(np.int8), index=high.index, columns=high.columns)
+
+
+def _exit(direction: int,
+          entry: int,
+          low: np.ndarray,
+          high: np.ndarray,
+          stop_levels: np.ndarray,
+          entries: np.ndarray,
+          stops: np.ndarray) -> typing.Tuple[int, str]:
+    """ Finds the bar closing the trade entered at the close of `entry`, writing its stops.
+
+        Returns:
+            (Tuple[int, str]) Exit bar and reason ('stop' or 'reversal'), or the last bar and 'open'.
+    """
+    bars = len(low)
+    accumulate = np.fmax.accumulate if direction == 1 else np.fmin.accumulate
+    running = np.nan
+
+    start = entry + 1
+    size = _INITIAL_SCAN
+    while start < bars:
+        end = min(bars, start + size)
+
+        # The stop of bar s comes from the previous close and ATR, and trails the trade's best level
+        trailing = accumulate(np.concatenate([[running], stop_levels[start - 1:end - 1]]))[1:]
+        stops[start:end] = trailing
+
+        stopped = low[start:end] < trailing if direction == 1 else high[start:end] > trailing
+        reversed_ = entries[start:end] == -direction
+        events = stopped | reversed_
+        if events.any():
+            offset = int(np.argmax(events))
+            stops[start + offset + 1:end] = np.nan
+            return start + offset, 'stop' if stopped[offset] else 'reversal'
+
+        running = trailing[-1]
+        start = end
+        size *= 2
+
+    return bars - 1, 'open'
+
+
+def _simulate(high: np.ndarray,
+              low: np.ndarray,
+              close: np.ndarray,
+              atr: np.ndarray,
+              entries: np.ndarray,
+              atr_multiple: float,
+              allow_short: bool) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, typing.List[typing.Tuple[typing.Any, ...]]]:
+    """ Carry-state pass of one ticker, from one trade to the next.
+
+        Returns:
+            (Tuple) Positions, stops and returns by bar, and the trades as
+                (entry bar, exit bar, direction, entry price, exit price, exit reason) tuples.
+    """
+    bars = len(close)
+    positions = np.zeros(bars, dtype=np.int8)
+    stops = np.full(bars, np.nan)
+    exit_prices = np.full(bars, np.nan)
+    trades = []
+
+    long_levels = close - atr_multiple * atr
+    short_levels = close + atr_multiple * atr
+    candidates = np.flatnonzero(entries if allow_short else entries == 1)
+
+    bar = int(candidates[0]) if len(candidates) else bars
+    direction = int(entries[bar]) if bar < bars else 0
+    while bar < bars - 1:
+        stop_levels = long_levels if direction == 1 else short_levels
+        exit_bar, reason = _exit(direction, bar, low, high, stop_levels, entries, stops)
+
+        positions[bar + 1:exit_bar + 1] = direction
+        exit_price = stops[exit_bar] if reason == 'stop' else close[exit_bar]
+        exit_prices[exit_bar] = exit_price
+        trades.append((bar, exit_bar, direction, close[bar], exit_price, reason))
+
+        if reason == 'reversal' and allow_short:
+            bar, direction = exit_bar, -direction
+            continue
+
+        # After a stop (or a short signal closing a long only trade), the next entry is on a later bar
+        following = candidates[np.searchsorted(candidates, exit_bar, side='right'):]
+        bar = int(following[0]) if len(following) else bars
+        direction = int(entries[bar]) if bar < bars else 0
+
+    # The bar closing a trade on its stop returns up to the stop rather than to the close
+    marks = np.where(np.isnan(exit_prices), close, exit_prices)
+    previous = np.concatenate([[np.nan], close[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(positions != 0, positions * (marks / previous - 1), 0.0)
+
+    return positions, stops, np.nan_to_num(returns), trades
+
+
+def _trade_frame(dates: typing.Any, trades: typing.List[typing.Tuple[typing.Any, ...]]) -> DataFrame:
+    """ Trades of one ticker as a dataframe, the bar numbers taken into the dates at once. """
+    entries, exits, directions, entry_prices, exit_prices, reasons = (list(column) for column in zip(*trades)) if trades else ([],) * 6
+    directions = np.asarray(directions, dtype=np.int8)
+    entry_prices = np.asarray(entry_prices, dtype=np.float64)
+    exit_prices = np.asarray(exit_prices, dtype=np.float64)
+
+    return DataFrame({
+        'entry_date': dates.take(np.asarray(entries, dtype=np.intp)),
+        'exit_date': dates.take(np.asarray(exits, dtype=np.intp)),
+        'direction': directions,
+        'entry_price': entry_prices,
+        'exit_price': exit_prices,
+        'return': directions * (exit_prices / entry_prices - 1),
+        'exit_reason': np.asarray(reasons, dtype=object),
+    }, columns=_TRADE_COLUMNS)
+
+
+def resistance_breakout_panel(high: DataFrame,
+                              low: DataFrame,
+                              adj_close: DataFrame,
+                              volume: DataFrame,
+                              n: int = 20,
+                              volume_factor: float = 1.5,
+                              atr_n: int = 20,
+                              atr_multiple: float = 1.0,
+                              allow_short: bool = True,
+                              starting_cash: float = 1.0,
+                              close: typing.Optional[DataFrame] = None) -> BreakoutResult:
+    """ Runs the resistance breakout over a panel of tickers.
+
+        Entries and reversals fill at the adjusted close of the signal bar, stops at the stop level.
+        The highs and lows are scaled by `adj_close / close` onto the adjusted basis when `close` is
+        given; otherwise they must already be adjusted like `adj_close`.
+
+        Args:
+            high (DataFrame): Dates x tickers high prices.
+            low (DataFrame): Dates x tickers low prices.
+            adj_close (DataFrame): Dates x tickers adjusted close prices.
+            volume (DataFrame): Dates x tickers volumes.
+            n (int): Number of previous bars defining the range. Default is 20.
+            volume_factor (float): Volume surge needed, as a multiple of the range's largest volume. Default is 1.5.
+            atr_n (int): Length of the ATR used by the stops. Default is 20.
+            atr_multiple (float): Distance of the stops from the close, in ATRs. Default is 1.
+            allow_short (bool): Whether to go short on breakdowns. Otherwise they only close longs. Default is True.
+            starting_cash (float): Starting cash of the equity curve. Default is 1.
+            close (Optional[DataFrame]): Dates x tickers raw close prices, the basis of `high` and `low`.
+                Default is None (`high` and `low` already adjusted).
+
+        Returns:
+            (BreakoutResult) Signals, positions, stops, returns, trades and equity curve.
+    """
+    if n < 1:
+        raise ValueError(f'Invalid n: {n}')
+    if atr_multiple <= 0:
+        raise ValueError(f'Invalid atr_multiple: {atr_multiple}, must be positive')
+
+    if close is not None:
+        adjustment = adj_close / close
+        high = high * adjustment
+        low = low * adjustment
+
+    entries = signals(high, low, volume, n, volume_factor)
+    atr = panel.average_true_range(high, low, adj_close, atr_n)
+
+    dates = adj_close.index
+    shape = adj_close.shape
+    positions = np.zeros(shape, dtype=np.int8)
+    stops = np.full(shape, np.nan)
+    returns = np.zeros(shape)
+    trades: typing.Dict[str, DataFrame] = {}
+
+    high_values = high.to_numpy(dtype=np.float64)
+    low_values = low.to_numpy(dtype=np.float64)
+    close_values = adj_close.to_numpy(dtype=np.float64)
+    atr_values = atr.to_numpy(dtype=np.float64)
+    entry_values = entries.to_numpy()
+
+    for column, ticker in enumerate(adj_close.columns):
+        positions[:, column], stops[:, column], returns[:, column], ticker_trades = _simulate(
+            high_values[:, column], low_values[:, column], close_values[:, column], atr_values[:, column],
+            entry_values[:, column], atr_multiple, allow_short)
+
+        trades[ticker] = _trade_frame(dates, ticker_trades)
+
+    equity = starting_cash * np.cumprod(1 + returns.mean(axis=1)) if shape[1] else np.full(shape[0], starting_cash)
+
+    return BreakoutResult(entries=entries,
+                          positions=DataFrame(positions, index=dates, columns=adj_close.columns),
+                          stops=DataFrame(stops, index=dates, columns=adj_close.columns),
+                          returns=DataFrame(returns, index=dates, columns=adj_close.columns),
+                          trades=trades,
+                          equity=Series(equity, index=dates, name='equity'),
+                          starting_cash=starting_cash)
+
+
+def resistance_breakout(data: typing.Dict[str, DataFrame], **kwargs: typing.Any) -> BreakoutResult:
+    """ Runs the resistance breakout over the dataframes returned by a `FinancialPuller`.
+
+        Args:
+            data (Dict[str, DataFrame]): Dataframes by ticker. Columns - ['high', 'low', 'close', 'adj_close', 'volume'],
+                the highs and lows are put on the adjusted basis with 'close' when every dataframe has it.
+            kwargs: Parameters of `resistance_breakout_panel`.
+
+        Returns:
+            (BreakoutResult) Signals, positions, stops, returns, trades and equity curve.
+    """
+    if not data:
+        raise ValueError('No data to run the resistance breakout on')
+
+    columns = ['high', 'low', 'adj_close', 'volume']
+    if all('close' in df.columns for df in data.values()):
+        columns.append('close')
+
+    prices = panel.to_panel(data, columns)
+    return resistance_breakout_panel(prices['high'], prices['low'], prices['adj_close'], prices['volume'],
+                                     close=prices.get('close'), **kwargs)
@@ -1,10 +1,18 @@
 # coding: utf-8
+import typing
 
-from . import finance
-from . import types
+from .. import _lazy
+
+if typing.TYPE_CHECKING:
+    from . import finance
+    from . import instrumentation
+    from . import types
 
 
 __all__ = [
     'finance',
+    'instrumentation',
     'types',
 ]
+
+__getattr__, __dir__ = _lazy.submodules(__name__, __all__)
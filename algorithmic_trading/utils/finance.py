@@ -4,12 +4,14 @@ from __future__ import annotations
 
 import typing
 
+import numpy as np
 import pandas as pd
 
 from . import types
 
 
 TRADING_DAYS_PER_YEAR: int = 252
+TRADING_WEEKS_PER_YEAR: int = 52
 TRADING_MONTHS_PER_YEAR: int = 12
 
 
@@ -41,13 +43,38 @@ def get_return_from_adj_close(dataframe: pd.DataFrame,
             (DataFrame) DataFrame with `return` column added
                 Return Columns: [..., 'adj_close', 'return']
     """
-    dataframe_copy = dataframe.copy()
-    dataframe_copy['return'] = dataframe_copy['adj_close'].pct_change()
-    dataframe_copy.fillna(fill_na, inplace=True)
+    dataframe_copy = dataframe.fillna(fill_na)
+    dataframe_copy['return'] = get_return_array_from_adj_close(dataframe['adj_close'].to_numpy(dtype=np.float64), fill_na)
 
     return dataframe_copy
 
 
+def get_return_array_from_adj_close(adj_close: np.ndarray,
+                                    fill_na: types.NumericType = 0,
+                                    out: typing.Optional[np.ndarray] = None) -> np.ndarray:
+    """ Gets the return from an array of adjusted close prices, without building a dataframe.
+
+        Args:
+            adj_close (np.ndarray): Adjusted close prices (float64)
+            fill_na (NumericType): Fill NA values with this value. Default is 0.
+            out (Optional[np.ndarray]): Float64 buffer of the same length to write the returns into.
+
+        Returns:
+            (np.ndarray) Returns, the first one (and any next to a NaN price) being `fill_na`
+    """
+    returns = np.empty(len(adj_close)) if out is None else out
+    if not len(adj_close):
+        return returns
+
+    returns[0] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(adj_close[1:], adj_close[:-1], out=returns[1:])
+    np.subtract(returns, 1, out=returns)
+    returns[np.isnan(returns)] = fill_na
+
+    return returns
+
+
 # TODO: This ticker changes over time, so I need to figure out how to handle this
 def get_dow_jones_tickers() -> typing.List[str]:
     """ Returns the list of tickers for the Dow Jones Industrial Average
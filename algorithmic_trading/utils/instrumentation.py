@@ -0,0 +1,285 @@
+# coding: utf-8
+""" Opt-in per-call instrumentation of the pullers, indicators and portfolio.
+
+    `enable` wraps the public functions of the `indicators` modules, the finance pullers' methods and
+    the `Portfolio` trading methods in place, recording the calls, wall time, rows processed and
+    (optionally) peak traced memory of each one. Nothing is wrapped until `enable` is called and
+    `disable` restores the original functions, so there is no overhead while it is off.
+
+        profiler = instrumentation.enable(trace_memory=True)
+        run_nightly_job()
+        instrumentation.disable()
+        print(profiler.to_frame())      # one row per function, slowest first
+        profiler.to_json('profile.json')
+
+    Times are inclusive: a KPI calling another KPI counts the inner call's time in both. Memory is
+    traced with `tracemalloc`, which slows the calls down, so it is off by default.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import functools
+import importlib
+import inspect
+import json
+from pathlib import Path
+import threading
+import time
+import tracemalloc
+import typing
+
+from pandas import DataFrame, Series
+
+
+_FUNCTION_MODULES: typing.List[str] = [
+    'algorithmic_trading.indicators.graph',
+    'algorithmic_trading.indicators.key_performance',
+    'algorithmic_trading.indicators.momentum',
+    'algorithmic_trading.indicators.panel',
+    'algorithmic_trading.indicators.renko',
+    'algorithmic_trading.indicators.rolling_performance',
+    'algorithmic_trading.pullers.finance.resampling',
+    'algorithmic_trading.utils.finance',
+]
+
+_METHODS: typing.Dict[str, typing.Dict[str, typing.List[str]]] = {
+    'algorithmic_trading.entities.portfolio': {
+        'Portfolio': ['buy', 'sell', 'update_prices', 'record'],
+    },
+    'algorithmic_trading.indicators.covariance': {
+        'CovarianceEngine': ['update', 'extend', 'covariance', 'correlation', 'portfolio_variance'],
+    },
+    'algorithmic_trading.pullers.finance.yfinance_financial_puller': {
+        'YFinanceFinancialPuller': ['get_daily_for_tickers', 'get_monthly_for_tickers', '_download', '_clean_daily_dataframe'],
+    },
+    'algorithmic_trading.pullers.finance.cached_financial_puller': {
+        'CachedFinancialPuller': ['get_daily_for_tickers', 'get_monthly_for_tickers'],
+    },
+    'algorithmic_trading.pullers.finance.resampled_financial_puller': {
+        'ResampledFinancialPuller': ['get_daily_for_tickers', 'get_monthly_for_tickers', 'get_for_tickers'],
+    },
+    'algorithmic_trading.pullers.finance.synthetic_financial_puller': {
+        'SyntheticFinancialPuller': ['get_daily_for_tickers', 'get_monthly_for_tickers'],
+    },
+}
+
+
+@dataclass
+class CallStats:
+    """ Aggregated measurements of one instrumented function.
+
+        Attributes:
+            calls (int): Number of calls.
+            total_seconds (float): Total wall time.
+            max_seconds (float): Longest call.
+            rows (int): Total rows of the frames processed (the first frame argument, or else the result).
+            peak_bytes (int): Largest traced memory growth during a call, 0 unless memory is traced.
+    """
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    peak_bytes: int = 0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+
+def _rows(value: typing.Any) -> typing.Optional[int]:
+    """ Rows of a frame, or of a dictionary of frames, None for anything else. """
+    if isinstance(value, (DataFrame, Series)):
+        return len(value)
+    if isinstance(value, dict) and value and all(isinstance(item, (DataFrame, Series)) for item in value.values()):
+        return sum(len(item) for item in value.values())
+    return None
+
+
+class _MemoryFrame:
+    """ Traced memory at the start of a call and the highest traced memory seen during it. """
+
+    def __init__(self, base: int):
+        self.base = base
+        self.peak = base
+
+
+class Profiler:
+    """ Collects the `CallStats` of the functions it wraps.
+
+        Args:
+            trace_memory (bool): Whether to trace the peak memory of each call. Default is False.
+
+        Attributes:
+            stats (Dict[str, CallStats]): Measurements by qualified function name.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stats: typing.Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+        self._memory_frames = threading.local()
+
+    def reset(self) -> None:
+        """ Clears the measurements. """
+        with self._lock:
+            self.stats = {}
+
+    def _enter_memory(self) -> None:
+        stack = self._memory_frames.__dict__.setdefault('stack', [])
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        stack.append(_MemoryFrame(current))
+
+    def _exit_memory(self) -> int:
+        stack = self._memory_frames.stack
+        _, peak = tracemalloc.get_traced_memory()
+        frame = stack.pop()
+        frame.peak = max(frame.peak, peak)
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, frame.peak)
+        tracemalloc.reset_peak()
+        return frame.peak - frame.base
+
+    def _record(self, name: str, seconds: float, rows: int, peak_bytes: int) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(name, CallStats())
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows
+            stats.peak_bytes = max(stats.peak_bytes, peak_bytes)
+
+    def wrap(self, func: typing.Callable[..., typing.Any], name: typing.Optional[str] = None) -> typing.Callable[..., typing.Any]:
+        """ Wraps a function so its calls are measured.
+
+            Args:
+                func (Callable): Function to measure.
+                name (Optional[str]): Name of its measurements. Default is the qualified name of the function.
+
+            Returns:
+                (Callable) Measured function with the same signature.
+        """
+        name = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.trace_memory:
+                self._enter_memory()
+
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                peak_bytes = self._exit_memory() if self.trace_memory else 0
+
+            rows = next((count for count in map(_rows, args) if count is not None), None)
+            if rows is None:
+                rows = _rows(result) or 0
+
+            self._record(name, seconds, rows, peak_bytes)
+            return result
+
+        wrapper.__wrapped_by_profiler__ = self
+        return wrapper
+
+    def to_frame(self) -> DataFrame:
+        """ Summary table of the measurements.
+
+            Returns:
+                (DataFrame) One row per function, slowest total first.
+                    Columns - ['calls', 'total_seconds', 'mean_seconds', 'max_seconds', 'rows', 'peak_bytes']
+        """
+        columns = ['calls', 'total_seconds', 'mean_seconds', 'max_seconds', 'rows', 'peak_bytes']
+        with self._lock:
+            rows = {name: {**asdict(stats), 'mean_seconds': stats.mean_seconds} for name, stats in self.stats.items()}
+
+        frame = DataFrame.from_dict(rows, orient='index', columns=columns).rename_axis('function')
+        return frame.sort_values('total_seconds', ascending=False)
+
+    def to_json(self, path: typing.Optional[typing.Union[str, Path]] = None) -> str:
+        """ Exports the measurements as JSON.
+
+            Args:
+                path (Optional[Union[str, Path]]): File to write the JSON to, if any.
+
+            Returns:
+                (str) JSON object of the measurements by function name.
+        """
+        with self._lock:
+            data = {name: {**asdict(stats), 'mean_seconds': stats.mean_seconds} for name, stats in self.stats.items()}
+
+        text = json.dumps(data, indent=2)
+        if path is not None:
+            Path(path).write_text(text)
+
+        return text
+
+
+_profiler: typing.Optional[Profiler] = None
+_started_tracing = False
+_originals: typing.List[typing.Tuple[typing.Any, str, typing.Any]] = []
+
+
+def _import_optional(module_name: str) -> typing.Optional[typing.Any]:
+    """ Imports a module to instrument, skipping it if one of its optional dependencies is missing. """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+
+def enable(trace_memory: bool = False, profiler: typing.Optional[Profiler] = None) -> Profiler:
+    """ Instruments the pullers, the indicator and KPI functions and the `Portfolio` methods in place.
+
+        Args:
+            trace_memory (bool): Whether to trace the peak memory of each call. Default is False.
+            profiler (Optional[Profiler]): Profiler to record into. Default is a new `Profiler(trace_memory)`.
+
+        Returns:
+            (Profiler) The profiler recording the calls.
+    """
+    global _profiler, _started_tracing
+
+    disable()
+    _profiler = profiler if profiler is not None else Profiler(trace_memory)
+    if _profiler.trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+
+    for module_name in _FUNCTION_MODULES:
+        module = importlib.import_module(module_name)
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            if not name.startswith('_') and func.__module__ == module.__name__:
+                _originals.append((module, name, func))
+                setattr(module, name, _profiler.wrap(func))
+
+    for module_name, classes in _METHODS.items():
+        module = _import_optional(module_name)
+        if module is None:
+            continue
+
+        for class_name, method_names in classes.items():
+            cls = getattr(module, class_name)
+            for method_name in method_names:
+                method = cls.__dict__[method_name]
+                _originals.append((cls, method_name, method))
+                setattr(cls, method_name, _profiler.wrap(method, f'{module_name}.{class_name}.{method_name}'))
+
+    return _profiler
+
+
+def disable() -> None:
+    """ Restores the original functions. The measurements stay available on the profiler. """
+    global _profiler, _started_tracing
+
+    for owner, name, original in reversed(_originals):
+        setattr(owner, name, original)
+    _originals.clear()
+
+    if _started_tracing:
+        tracemalloc.stop()
+        _started_tracing = False
+    _profiler = None
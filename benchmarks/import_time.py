@@ -0,0 +1,97 @@
+# coding: utf-8
+""" Measures the import time of the package entry points and checks which heavy dependencies they load.
+
+    Every import runs in a fresh interpreter, repeated a few times, keeping the fastest run.
+
+        python -m benchmarks.import_time
+        python -m benchmarks.import_time --check     # exits non-zero if a light entry point loads a heavy dependency
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import typing
+
+
+HEAVY_MODULES: typing.List[str] = ['matplotlib', 'yfinance']
+
+# Entry points that must not load any of the heavy modules
+LIGHT_TARGETS: typing.List[str] = [
+    'algorithmic_trading',
+    'algorithmic_trading.indicators',
+    'algorithmic_trading.indicators.momentum',
+    'algorithmic_trading.indicators.key_performance',
+    'algorithmic_trading.analysis',
+    'algorithmic_trading.analysis.visualization',
+    'algorithmic_trading.pullers.finance.yfinance_financial_puller',
+]
+
+TARGETS: typing.List[str] = LIGHT_TARGETS + [
+    'algorithmic_trading.entities.portfolio',
+    'algorithmic_trading.backtest',
+    'algorithmic_trading.backtest.sweep',
+]
+
+_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+try:
+    import {module}
+    error = None
+except ImportError as exception:
+    error = str(exception)
+seconds = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": seconds, "modules": len(sys.modules), "heavy": heavy, "error": error}}))
+'''
+
+
+def measure(module: str, repeats: int = 5) -> typing.Dict[str, typing.Any]:
+    """ Imports `module` in `repeats` fresh interpreters.
+
+        Args:
+            module (str): Module to import.
+            repeats (int): Number of interpreters to start. Default is 5.
+
+        Returns:
+            (Dict[str, Any]) {'module', 'seconds' (fastest run), 'modules' (loaded in total), 'heavy' (heavy modules
+                loaded), 'error' (message if the import failed, e.g. on a missing dependency)}
+    """
+    runs = []
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                   capture_output=True, text=True, check=True)
+        runs.append(json.loads(completed.stdout))
+
+    fastest = min(runs, key=lambda run: run['seconds'])
+    return {'module': module, **fastest}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--check', action='store_true', help='Fail if a light entry point loads a heavy module')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    results = [measure(module, args.repeats) for module in TARGETS]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            heavy = ', '.join(result['heavy']) or '-'
+            error = f"  error: {result['error']}" if result['error'] else ''
+            print(f"{result['module']:<65} {result['seconds'] * 1e3:>8.1f} ms {result['modules']:>6} modules  heavy: {heavy}{error}")
+
+    violations = [result for result in results if result['module'] in LIGHT_TARGETS and result['heavy']]
+    if args.check and violations:
+        for result in violations:
+            print(f"{result['module']} loads {', '.join(result['heavy'])}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# coding: utf-8
+""" Replays a synthetic trade tape through `Portfolio` and `FixedPointLedger` and compares them.
+
+    python -m benchmarks.ledger_replay --trades 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+from decimal import Decimal
+import time
+import typing
+
+import numpy as np
+
+from algorithmic_trading.entities import fast_ledger
+from algorithmic_trading.entities import portfolio
+
+
+def trade_tape(trades: int, tickers: int, seed: int = 0) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Random buys and sells in whole shares at cent prices, never selling a ticker that is not held. """
+    rng = np.random.default_rng(seed)
+    names = np.array([f'T{index:04d}' for index in range(tickers)])
+    columns = rng.integers(0, tickers, trades)
+    shares = rng.integers(1, 100, trades)
+    prices = np.round(rng.uniform(5, 500, trades), 2)
+
+    # Sell exactly what a buy added, on the next trade of the same ticker, so every sell is valid
+    order = np.argsort(columns, kind='stable')
+    is_buy = np.ones(trades, dtype=bool)
+    is_buy[order[1::2]] = columns[order[1::2]] != columns[order[:-1:2]]
+    shares[order[1::2]] = np.where(is_buy[order[1::2]], shares[order[1::2]], shares[order[:-1:2]])
+
+    return names[columns], shares.astype(np.float64), prices, is_buy
+
+
+def _portfolio() -> portfolio.Portfolio:
+    return portfolio.Portfolio(name='benchmark',
+                               description=None,
+                               start_date=dt.date(2000, 1, 1),
+                               end_date=None,
+                               starting_cash=Decimal('1000000.00'),
+                               available_cash=Decimal('1000000.00'),
+                               positions={},
+                               transactions={})
+
+
+def run(trades: int, tickers: int) -> typing.Dict[str, float]:
+    names, shares, prices, is_buy = trade_tape(trades, tickers)
+    decimal_shares = [Decimal(int(value)) for value in shares]
+    decimal_prices = [Decimal(f'{value:.2f}') for value in prices]
+
+    decimal_portfolio = _portfolio()
+    start = time.perf_counter()
+    for ticker, share, price, buy in zip(names.tolist(), decimal_shares, decimal_prices, is_buy.tolist()):
+        if buy:
+            decimal_portfolio.buy(ticker, share, price, price)
+        else:
+            decimal_portfolio.update_prices({ticker: price})
+            decimal_portfolio.sell(ticker, share)
+    decimal_total = decimal_portfolio.total_value
+    decimal_seconds = time.perf_counter() - start
+
+    ledger = fast_ledger.FixedPointLedger.from_portfolio(_portfolio())
+    start = time.perf_counter()
+    ledger.replay(names, shares, prices, is_buy)
+    ledger_total = ledger.total_value
+    ledger_seconds = time.perf_counter() - start
+
+    if ledger_total != decimal_total:
+        raise AssertionError(f'Totals differ: {ledger_total} != {decimal_total}')
+
+    return {
+        'trades': trades,
+        'decimal_seconds': decimal_seconds,
+        'ledger_seconds': ledger_seconds,
+        'speedup': decimal_seconds / ledger_seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trades', type=int, default=1_000_000)
+    parser.add_argument('--tickers', type=int, default=500)
+    args = parser.parse_args()
+
+    result = run(args.trades, args.tickers)
+    print(f"{result['trades']:,} trades: Portfolio {result['decimal_seconds']:.3f}s, "
+          f"FixedPointLedger {result['ledger_seconds']:.3f}s ({result['speedup']:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
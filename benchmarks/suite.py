@@ -0,0 +1,389 @@
+# coding: utf-8
+""" Benchmark suite for the indicators, KPIs and portfolio operations.
+
+    Every case runs on seeded synthetic data, so the suite is offline and reproducible. Each case is
+    timed over several repeats, then run once more under `tracemalloc` for its peak memory and the
+    number of memory blocks it retained (still allocated once it returned, e.g. caches or leaks).
+
+    The results are written as JSON and compared against a baseline report of the same machine,
+    flagging the cases whose median time or peak memory grew more than the tolerance allows. Timings
+    only compare on the machine that produced them, so baselines are not committed: the default one is
+    kept per machine under `benchmarks/baselines/`. Cases faster than `MIN_COMPARED_SECONDS` are too
+    noisy to time reliably and only have their memory compared. Regressions are reported, and only
+    fail the run with `--fail-on-regression`.
+
+        python -m benchmarks.suite                                  # quick profile, compared to this machine's baseline
+        python -m benchmarks.suite --profile full --output report.json
+        python -m benchmarks.suite --save-baseline                  # store this machine's baseline
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass
+import datetime as dt
+from decimal import Decimal
+import gc
+import json
+from pathlib import Path
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import typing
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from algorithmic_trading.entities import fast_ledger
+from algorithmic_trading.entities import portfolio
+from algorithmic_trading.indicators import arrays
+from algorithmic_trading.indicators import key_performance
+from algorithmic_trading.indicators import memoize
+from algorithmic_trading.indicators import momentum
+from algorithmic_trading.indicators import panel
+from algorithmic_trading.utils import finance
+
+
+BASELINE_DIR = Path(__file__).parent / 'baselines'
+
+MIN_COMPARED_SECONDS = 0.05
+
+PROFILES: typing.Dict[str, typing.Dict[str, typing.List[int]]] = {
+    'quick': {'bars': [1_000, 100_000], 'tickers': [1, 100], 'trades': [10_000]},
+    'full': {'bars': [1_000, 100_000, 1_000_000, 10_000_000], 'tickers': [1, 100, 1_000, 5_000], 'trades': [10_000, 1_000_000]},
+}
+
+UNIVERSE_BARS = 1_000
+
+
+@dataclass
+class Result:
+    """ Measurements of one case at one size. """
+    name: str
+    size: int
+    seconds: float
+    seconds_median: float
+    repeats: int
+    peak_bytes: int
+    retained_blocks: int
+
+
+@dataclass
+class Case:
+    """ A benchmarked call: `setup(size)` builds the arguments once, `run(*arguments)` is measured. """
+    name: str
+    axis: str
+    setup: typing.Callable[[int], typing.Tuple[typing.Any, ...]]
+    run: typing.Callable[..., typing.Any]
+
+
+def synthetic_prices(bars: int, seed: int = 0) -> DataFrame:
+    """ One ticker's OHLCV bars from a seeded geometric random walk.
+
+        Minute bars are used past 50,000 rows so the index stays within the pandas timestamp range.
+    """
+    rng = np.random.default_rng(seed)
+    freq = 'B' if bars <= 50_000 else 'min'
+    index = pd.date_range('2000-01-03', periods=bars, freq=freq, name='date')
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    spread = np.abs(rng.normal(0, 0.005, bars)) * close
+    open_ = np.concatenate([[close[0]], close[:-1]])
+
+    return DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'adj_close': close,
+        'volume': rng.integers(1_000, 1_000_000, bars).astype(np.float64),
+    }, index=index)
+
+
+def synthetic_universe(tickers: int, bars: int = UNIVERSE_BARS) -> typing.Dict[str, DataFrame]:
+    return {f'T{index:04d}': synthetic_prices(bars, seed=index) for index in range(tickers)}
+
+
+def _panel_arguments(tickers: int) -> typing.Tuple[typing.Any, ...]:
+    prices = panel.to_panel(synthetic_universe(tickers), ['high', 'low', 'adj_close'])
+    return prices['high'], prices['low'], prices['adj_close']
+
+
+def _empty_portfolio() -> portfolio.Portfolio:
+    return portfolio.Portfolio(name='benchmark',
+                               description=None,
+                               start_date=dt.date(2000, 1, 1),
+                               end_date=None,
+                               starting_cash=Decimal('1000000.00'),
+                               available_cash=Decimal('1000000.00'),
+                               positions={},
+                               transactions={})
+
+
+def _trades(count: int) -> typing.Tuple[typing.List[str], typing.List[Decimal], typing.List[Decimal]]:
+    rng = np.random.default_rng(0)
+    tickers = [f'T{index:03d}' for index in rng.integers(0, 100, count)]
+    shares = [Decimal(int(value)) for value in rng.integers(1, 100, count)]
+    prices = [Decimal(f'{value:.2f}') for value in rng.uniform(5, 500, count)]
+    return tickers, shares, prices
+
+
+def _portfolio_buy_sell(tickers: typing.List[str], shares: typing.List[Decimal], prices: typing.List[Decimal]) -> portfolio.Portfolio:
+    """ Buys every trade, then sells it back, through the Decimal `Portfolio`. """
+    book = _empty_portfolio()
+    for ticker, share, price in zip(tickers, shares, prices):
+        book.buy(ticker, share, price, price)
+    for ticker, share in zip(tickers, shares):
+        book.sell(ticker, share)
+    return book
+
+
+def _ledger_replay(tickers: np.ndarray, shares: np.ndarray, prices: np.ndarray, is_buy: np.ndarray) -> fast_ledger.FixedPointLedger:
+    ledger = fast_ledger.FixedPointLedger('benchmark', None, dt.date(2000, 1, 1), None, Decimal('1000000.00'))
+    ledger.replay(tickers, shares, prices, is_buy)
+    return ledger
+
+
+def _ledger_arguments(count: int) -> typing.Tuple[typing.Any, ...]:
+    tickers, shares, prices = _trades(count)
+    return (np.array(tickers + tickers),
+            np.array([float(value) for value in shares + shares]),
+            np.array([float(value) for value in prices + prices]),
+            np.repeat([True, False], count))
+
+
+def _single(bars: int) -> typing.Tuple[DataFrame]:
+    return (synthetic_prices(bars),)
+
+
+def _arrays(bars: int) -> typing.Tuple[np.ndarray, ...]:
+    """ High, low and adjusted close arrays, plus 8 preallocated output buffers. """
+    prices = synthetic_prices(bars)
+    buffers = tuple(np.empty(bars) for _ in range(8))
+    return prices['high'].to_numpy(), prices['low'].to_numpy(), prices['adj_close'].to_numpy(), buffers
+
+
+def _arrays_adx(high: np.ndarray, low: np.ndarray, adj_close: np.ndarray, buffers: typing.Tuple[np.ndarray, ...]) -> typing.Tuple[np.ndarray, ...]:
+    return arrays.adx(high, low, adj_close, out=buffers)
+
+
+def _arrays_maximum_drawdown(high: np.ndarray, low: np.ndarray, adj_close: np.ndarray, buffers: typing.Tuple[np.ndarray, ...]) -> float:
+    return arrays.maximum_drawdown(finance.get_return_array_from_adj_close(adj_close, out=buffers[0]))
+
+
+_APPENDED_CALLS = 32
+
+
+def _growing_history(bars: int, step: int = 1) -> typing.Tuple[typing.Callable[[], typing.Any]]:
+    """ A memoized ADX primed with `bars` bars, and a call running it on a history `step` bars longer each time.
+
+        One bar at a time is extended from the cached result, while steps past `memoize._MAX_APPENDED_ROWS` are
+        recomputed, which compares the two paths under the same hashing overhead.
+    """
+    prices = synthetic_prices(bars + step * _APPENDED_CALLS)
+    adx = memoize.MemoCache().wrap(momentum.adx)
+    adx(prices.iloc[:bars])
+    lengths = iter(range(bars + step, bars + step * _APPENDED_CALLS + 1, step))
+
+    return (lambda: adx(prices.iloc[:next(lengths)]),)
+
+
+def _call(func: typing.Callable[[], typing.Any]) -> typing.Any:
+    return func()
+
+
+CASES: typing.List[Case] = [
+    Case('momentum.macd', 'bars', _single, momentum.macd),
+    Case('momentum.rsi', 'bars', _single, momentum.rsi),
+    Case('momentum.average_true_range', 'bars', _single, momentum.average_true_range),
+    Case('momentum.bbands', 'bars', _single, momentum.bbands),
+    Case('momentum.adx', 'bars', _single, momentum.adx),
+    Case('key_performance.cagr', 'bars', _single, key_performance.cagr),
+    Case('key_performance.volatility', 'bars', _single, key_performance.volatility),
+    Case('key_performance.sharpe_ratio', 'bars', _single, key_performance.sharpe_ratio),
+    Case('key_performance.sortino_ratio', 'bars', _single, key_performance.sortino_ratio),
+    Case('key_performance.maximum_drawdown', 'bars', _single, key_performance.maximum_drawdown),
+    Case('key_performance.calmar_ratio', 'bars', _single, key_performance.calmar_ratio),
+    Case('arrays.adx', 'bars', _arrays, _arrays_adx),
+    Case('memoize.adx_append', 'bars', _growing_history, _call),
+    Case('memoize.adx_recompute', 'bars', lambda bars: _growing_history(bars, memoize._MAX_APPENDED_ROWS + 1), _call),
+    Case('arrays.maximum_drawdown', 'bars', _arrays, _arrays_maximum_drawdown),
+    Case('panel.macd', 'tickers', lambda tickers: _panel_arguments(tickers)[2:], panel.macd),
+    Case('panel.rsi', 'tickers', lambda tickers: _panel_arguments(tickers)[2:], panel.rsi),
+    Case('panel.average_true_range', 'tickers', _panel_arguments, panel.average_true_range),
+    Case('panel.adx', 'tickers', _panel_arguments, panel.adx),
+    Case('key_performance.performance_summary', 'tickers', lambda tickers: (synthetic_universe(tickers),), key_performance.performance_summary),
+    Case('portfolio.buy_sell', 'trades', _trades, _portfolio_buy_sell),
+    Case('fast_ledger.replay', 'trades', _ledger_arguments, _ledger_replay),
+]
+
+
+def measure(case: Case, size: int, min_seconds: float = 0.5, max_repeats: int = 20) -> Result:
+    """ Times a case until `min_seconds` have been spent (at least twice), then traces its memory once.
+
+        The traced run reports the peak traced memory and the number of memory blocks still allocated
+        after the call compared to before it. tracemalloc only sees live blocks, so this is the count
+        the call retained, not the count of allocations it made along the way.
+    """
+    arguments = case.setup(size)
+
+    timings = []
+    while len(timings) < 2 or (sum(timings) < min_seconds and len(timings) < max_repeats):
+        gc.collect()
+        start = time.perf_counter()
+        case.run(*arguments)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = case.run(*arguments)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+
+    return Result(name=case.name,
+                  size=size,
+                  seconds=min(timings),
+                  seconds_median=statistics.median(timings),
+                  repeats=len(timings),
+                  peak_bytes=peak_bytes,
+                  retained_blocks=retained_blocks)
+
+
+def run(profile: str = 'quick', pattern: typing.Optional[str] = None) -> typing.Dict[str, typing.Any]:
+    """ Runs the cases of a profile.
+
+        Args:
+            profile (str): 'quick' or 'full'. Default is 'quick'.
+            pattern (Optional[str]): Only run the cases whose name contains this string.
+
+        Returns:
+            (Dict[str, Any]) Report with the environment under 'environment' and a list of results under 'results'.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f'Invalid profile: {profile}')
+
+    results = []
+    for case in CASES:
+        if pattern and pattern not in case.name:
+            continue
+        for size in PROFILES[profile][case.axis]:
+            result = measure(case, size)
+            results.append(asdict(result))
+            print(f'{case.name:<40} {case.axis:>7}={size:<10,} {result.seconds * 1e3:>10.2f} ms '
+                  f'{result.peak_bytes / 2**20:>10.1f} MiB {result.retained_blocks:>8} retained blocks', flush=True)
+
+    return {
+        'environment': {
+            'created': dt.datetime.now().isoformat(timespec='seconds'),
+            'profile': profile,
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'machine': machine_key(),
+        },
+        'results': results,
+    }
+
+
+def machine_key() -> str:
+    """ Identifies the machine and interpreter a report was produced on, e.g. 'host-Linux-x86_64-py3.11'. """
+    python = '.'.join(platform.python_version_tuple()[:2])
+    return f'{platform.node() or "unknown"}-{platform.system()}-{platform.machine()}-py{python}'
+
+
+def default_baseline() -> Path:
+    """ Baseline report of this machine. """
+    return BASELINE_DIR / f'{machine_key()}.json'
+
+
+def compare(report: typing.Dict[str, typing.Any],
+            baseline: typing.Dict[str, typing.Any],
+            tolerance: float = 0.2,
+            min_seconds: float = MIN_COMPARED_SECONDS) -> typing.List[str]:
+    """ Compares a report against a baseline report.
+
+        Times are compared on their medians, and only for the cases whose baseline median takes at
+        least `min_seconds`: shorter timings vary by more than the tolerance from run to run.
+
+        Args:
+            report (Dict[str, Any]): Report from `run`.
+            baseline (Dict[str, Any]): Baseline report from `run`.
+            tolerance (float): Allowed relative slowdown or memory growth. Default is 0.2 (20%).
+            min_seconds (float): Shortest baseline median whose time is compared. Default is `MIN_COMPARED_SECONDS`.
+
+        Returns:
+            (List[str]) Description of every regression, empty if there is none.
+    """
+    previous = {(result['name'], result['size']): result for result in baseline['results']}
+
+    regressions = []
+    for result in report['results']:
+        reference = previous.get((result['name'], result['size']))
+        if reference is None:
+            continue
+
+        metrics = ['peak_bytes']
+        if reference['seconds_median'] >= min_seconds:
+            metrics.append('seconds_median')
+
+        for metric in metrics:
+            if reference[metric] and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{result['name']} (size {result['size']:,}): {metric} "
+                                   f"{reference[metric]:.4g} -> {result[metric]:.4g} "
+                                   f"(+{result[metric] / reference[metric] - 1:.0%})")
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', choices=list(PROFILES), default='quick')
+    parser.add_argument('--filter', dest='pattern', help='Only run the cases whose name contains this string')
+    parser.add_argument('--output', type=Path, help='Write the JSON report to this path')
+    parser.add_argument('--baseline', type=Path, default=None, help="Baseline report to compare against. Default is this machine's")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the report as this machine's baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 when a regression is found')
+    args = parser.parse_args()
+
+    baseline = args.baseline or default_baseline()
+    report = run(args.profile, args.pattern)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps(report, indent=2))
+        print(f'Stored the baseline at {baseline}')
+        return
+
+    if not baseline.exists():
+        print(f'WARNING no baseline at {baseline}, nothing was compared '
+              f'(store one with --save-baseline)', file=sys.stderr)
+        return
+
+    reference = json.loads(baseline.read_text())
+    if reference['environment'].get('machine') != report['environment']['machine']:
+        print(f"WARNING the baseline comes from {reference['environment'].get('machine', 'another machine')}, "
+              f"its timings may not compare", file=sys.stderr)
+
+    regressions = compare(report, reference, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()